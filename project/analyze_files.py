@@ -1,59 +1,74 @@
 import openpyxl
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
-# 分析真味道&好汤面.xlsx
-print("=" * 60)
-print("分析: 真味道&好汤面.xlsx")
-print("=" * 60)
-
-wb = openpyxl.load_workbook(r'c:\Users\宇宙无敌智慧大将军\Desktop\test\data_processing\project\真味道&好汤面.xlsx')
-print(f'Sheet names: {wb.sheetnames}')
-
-for sheet in wb.sheetnames:
-    ws = wb[sheet]
-    print(f'\n=== {sheet} ===')
-    print(f'Rows: {ws.max_row}, Cols: {ws.max_column}')
-    for i, row in enumerate(ws.iter_rows(max_row=min(15, ws.max_row), values_only=True)):
-        print(f'Row {i+1}: {row}')
-
-print("\n" + "=" * 60)
-print("分析: 香爆脆本月目标进度.xlsx")
-print("=" * 60)
-
-wb2 = openpyxl.load_workbook(r'c:\Users\宇宙无敌智慧大将军\Desktop\test\data_processing\project\香爆脆本月目标进度.xlsx')
-print(f'Sheet names: {wb2.sheetnames}')
-
-for sheet in wb2.sheetnames:
-    ws = wb2[sheet]
-    print(f'\n=== {sheet} ===')
-    print(f'Rows: {ws.max_row}, Cols: {ws.max_column}')
-    for i, row in enumerate(ws.iter_rows(max_row=min(15, ws.max_row), values_only=True)):
-        print(f'Row {i+1}: {row}')
-
-print("\n" + "=" * 60)
-print("分析: 香爆脆追踪表客户别.xlsx")
-print("=" * 60)
-
-wb3 = openpyxl.load_workbook(r'c:\Users\宇宙无敌智慧大将军\Desktop\test\data_processing\project\香爆脆追踪表客户别.xlsx')
-print(f'Sheet names: {wb3.sheetnames}')
-
-for sheet in wb3.sheetnames:
-    ws = wb3[sheet]
-    print(f'\n=== {sheet} ===')
-    print(f'Rows: {ws.max_row}, Cols: {ws.max_column}')
-    for i, row in enumerate(ws.iter_rows(max_row=min(15, ws.max_row), values_only=True)):
-        print(f'Row {i+1}: {row}')
-
-print("\n" + "=" * 60)
-print("分析: 香爆脆追踪表部所别05.31.xlsx")
-print("=" * 60)
-
-wb4 = openpyxl.load_workbook(r'c:\Users\宇宙无敌智慧大将军\Desktop\test\data_processing\project\香爆脆追踪表部所别05.31.xlsx')
-print(f'Sheet names: {wb4.sheetnames}')
-
-for sheet in wb4.sheetnames:
-    ws = wb4[sheet]
-    print(f'\n=== {sheet} ===')
-    print(f'Rows: {ws.max_row}, Cols: {ws.max_column}')
-    for i, row in enumerate(ws.iter_rows(max_row=min(15, ws.max_row), values_only=True)):
-        print(f'Row {i+1}: {row}')
+from parse_cache import add_cache_argument, cached_call
+
+
+def read_head(path, max_rows=15):
+    """以只读流式模式读取每个工作表的尺寸和前max_rows行，返回 {sheet: (rows, cols, head)}"""
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheets = {}
+        for sheet in wb.sheetnames:
+            ws = wb[sheet]
+            # 只读模式下max_row/max_column来自dimension记录，缺失时需要扫描一次
+            if ws.max_row is None:
+                ws.calculate_dimension(force=True)
+            head = list(ws.iter_rows(max_row=max_rows, values_only=True))
+            sheets[sheet] = (ws.max_row, ws.max_column, head)
+        return sheets
+    finally:
+        wb.close()
+
+
+def cached_read_head(path, max_rows=15, use_cache=True):
+    """带磁盘缓存的read_head，文件内容不变时直接加载上次的解析结果"""
+    return cached_call(read_head, path, max_rows, use_cache=use_cache)
+
+
+def dump_head(sheets):
+    """打印每个工作表的尺寸和前几行"""
+    print(f'Sheet names: {list(sheets)}')
+    for sheet, (rows, cols, head) in sheets.items():
+        print(f'\n=== {sheet} ===')
+        print(f'Rows: {rows}, Cols: {cols}')
+        for i, row in enumerate(head):
+            print(f'Row {i+1}: {row}')
+
+
+PROJECT_DIR = r'c:\Users\宇宙无敌智慧大将军\Desktop\test\data_processing\project'
+FILES = [
+    '真味道&好汤面.xlsx',
+    '香爆脆本月目标进度.xlsx',
+    '香爆脆追踪表客户别.xlsx',
+    '香爆脆追踪表部所别05.31.xlsx',
+]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='打印各工作簿每个工作表的前15行')
+    add_cache_argument(parser)
+    parser.add_argument('--jobs', type=int, default=len(FILES),
+                        help='并行解析的进程数；为1时逐个解析，同一时间只打开一个工作簿')
+    args = parser.parse_args()
+    
+    paths = [os.path.join(PROJECT_DIR, name) for name in FILES]
+    read = partial(cached_read_head, use_cache=not args.no_cache)
+    
+    def report(results):
+        for idx, (name, sheets) in enumerate(zip(FILES, results)):
+            print(("\n" if idx else "") + "=" * 60)
+            print(f"分析: {name}")
+            print("=" * 60)
+            dump_head(sheets)
+    
+    if args.jobs <= 1:
+        # 逐个解析：每个工作簿读完即关闭，内存占用不随文件数增长
+        report(map(read, paths))
+    else:
+        # 各工作簿相互独立，用多进程并行解析，再按原顺序输出
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            report(executor.map(read, paths))
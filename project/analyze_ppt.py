@@ -1,37 +1,56 @@
 from pptx import Presentation
 from pptx.util import Inches, Pt
 import os
+import argparse
 
-def analyze_ppt(filepath, name):
+from parse_cache import add_cache_argument, cached_call
+
+
+def analyze_ppt(filepath, name, use_cache=True):
     print("=" * 60)
     print(f"分析PPT: {name}")
     print("=" * 60)
     
+    for line in cached_call(extract, filepath, use_cache=use_cache):
+        print(line)
+
+
+def extract(filepath):
+    """解析PPT，返回待输出的文本行列表"""
+    lines = []
+    out = lines.append
     prs = Presentation(filepath)
-    print(f"幻灯片数量: {len(prs.slides)}")
-    print(f"幻灯片宽度: {prs.slide_width.inches} inches")
-    print(f"幻灯片高度: {prs.slide_height.inches} inches")
+    out(f"幻灯片数量: {len(prs.slides)}")
+    out(f"幻灯片宽度: {prs.slide_width.inches} inches")
+    out(f"幻灯片高度: {prs.slide_height.inches} inches")
     
     for i, slide in enumerate(prs.slides):
-        print(f"\n--- 幻灯片 {i+1} ---")
-        print(f"布局: {slide.slide_layout.name if slide.slide_layout else 'Unknown'}")
+        out(f"\n--- 幻灯片 {i+1} ---")
+        out(f"布局: {slide.slide_layout.name if slide.slide_layout else 'Unknown'}")
         
         for shape in slide.shapes:
-            print(f"  Shape: {shape.shape_type}, Name: {shape.name}")
+            out(f"  Shape: {shape.shape_type}, Name: {shape.name}")
             if shape.has_text_frame:
-                for para in shape.text_frame.paragraphs:
-                    text = para.text.strip()
+                # text_frame.text 一次取出全部段落（以换行分隔），避免逐段落访问XML
+                for text in shape.text_frame.text.split("\n"):
+                    text = text.strip()
                     if text:
-                        print(f"    Text: {text[:100]}{'...' if len(text) > 100 else ''}")
+                        out(f"    Text: {text[:100]}{'...' if len(text) > 100 else ''}")
             if shape.has_table:
                 table = shape.table
-                print(f"    Table: {table.rows.__len__()} rows x {len(table.columns)} cols")
+                out(f"    Table: {len(table.rows)} rows x {len(table.columns)} cols")
                 for row_idx, row in enumerate(table.rows):
                     if row_idx < 5:  # 只显示前5行
                         row_data = [cell.text[:20] for cell in row.cells]
-                        print(f"      Row {row_idx}: {row_data}")
+                        out(f"      Row {row_idx}: {row_data}")
+    return lines
 
-# 分析两个PPT
-analyze_ppt(r'c:\Users\宇宙无敌智慧大将军\Desktop\test\data_processing\project\真味道&好汤面.pptx', '真味道&好汤面.pptx')
-print("\n" * 2)
-analyze_ppt(r'c:\Users\宇宙无敌智慧大将军\Desktop\test\data_processing\project\营运月会专案-香爆脆.pptx', '营运月会专案-香爆脆.pptx')
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='打印PPT每页的形状、文本和表格')
+    add_cache_argument(parser)
+    args = parser.parse_args()
+    
+    # 分析两个PPT
+    analyze_ppt(r'c:\Users\宇宙无敌智慧大将军\Desktop\test\data_processing\project\真味道&好汤面.pptx', '真味道&好汤面.pptx', not args.no_cache)
+    print("\n" * 2)
+    analyze_ppt(r'c:\Users\宇宙无敌智慧大将军\Desktop\test\data_processing\project\营运月会专案-香爆脆.pptx', '营运月会专案-香爆脆.pptx', not args.no_cache)
@@ -0,0 +1,49 @@
+"""
+分析脚本共用的解析结果磁盘缓存
+
+解析结果按文件内容SHA256（加上解析参数）命名，pickle后保存在CACHE_DIR中；
+运行脚本时加 --no-cache 可跳过缓存。
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from pathlib import Path
+
+CACHE_DIR = Path('.cache')
+
+
+def add_cache_argument(parser):
+    """给命令行参数解析器加上 --no-cache 选项"""
+    parser.add_argument('--no-cache', action='store_true', help='不读写解析结果缓存')
+
+
+def cached_call(func, path, *args, use_cache=True):
+    """
+    带磁盘缓存地调用 func(path, *args)，文件内容不变时直接加载上次的结果
+
+    缓存先写临时文件再改名：中断的运行或并行的进程不会留下写了一半的缓存文件；
+    读不出来的缓存文件按未命中处理，重新解析后覆盖。
+    """
+    if not use_cache:
+        return func(path, *args)
+    with open(path, 'rb') as f:
+        digest = hashlib.file_digest(f, 'sha256').hexdigest()
+    cache_file = CACHE_DIR / ('_'.join([digest, *map(str, args)]) + '.pkl')
+    try:
+        with open(cache_file, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        pass  # 没有缓存或缓存损坏时重新解析
+
+    result = func(path, *args)
+    CACHE_DIR.mkdir(exist_ok=True)
+    tmp_file = cache_file.with_name(f'{cache_file.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        tmp_file.unlink(missing_ok=True)  # 缓存写入失败不影响结果
+    return result
@@ -0,0 +1,276 @@
+"""
+数据分析Agent的数值计算内核
+
+功能：为分析工具提供numba编译的数值内核（按列统计、按列摘要、异常值计数、相关系数矩阵、分组求和）
+说明：
+1. 所有内核都用 @njit(签名, parallel=True, cache=True) 编译，多线程执行且不受GIL限制；
+   声明了签名的内核在导入时就编译（或从磁盘缓存加载），第一个任务不再等待JIT编译
+2. 导入时在主线程中用很小的数组把每个内核调用一次（warmup），启动numba的线程层
+3. 没有安装numba时 HAVE_NUMBA 为False，调用方应使用NumPy/pandas的实现
+4. 多个线程同时调用并行内核时需要先获取 KERNEL_LOCK
+"""
+
+import threading
+
+import numpy as np
+
+try:
+    import numba
+    from numba import njit, prange, types
+except ImportError:
+    numba = None
+    njit = None
+    prange = range
+
+HAVE_NUMBA = njit is not None
+
+# 并行内核可用的线程数；只有一个线程时，按列统计用NumPy的C实现更快
+KERNEL_THREADS = numba.config.NUMBA_NUM_THREADS if HAVE_NUMBA else 1
+
+# numba的workqueue线程层不支持多个线程同时调用并行内核（会直接终止进程），
+# 工具可能在线程池中并行执行，调用并行内核时需要加锁
+KERNEL_LOCK = threading.Lock()
+
+# 异常值计数内核每个线程一次处理的行数
+OUTLIER_BLOCK_ROWS = 4096
+
+# describe风格统计结果的行顺序
+STAT_NAMES = ("count", "mean", "std", "min", "25%", "50%", "75%", "max")
+
+# column_summary结果的行顺序
+SUMMARY_NAMES = ("count", "mean", "std", "min", "max", "argmin", "argmax")
+
+
+def _lerp(a, b, t):
+    """a和b之间的线性插值（与np.percentile默认的linear方法逐位一致）"""
+    diff = b - a
+    if t >= 0.5:
+        return b - diff * (1.0 - t)
+    return a + diff * t
+
+
+def column_stats(X):
+    """
+    按列计算count、mean、std(ddof=1)、min、25%、50%、75%、max（忽略NaN）
+
+    参数:
+        X: 形状为 (行数, 列数) 的float64数组，按列连续存放（F顺序）时最快
+
+    返回:
+        形状为 (8, 列数) 的数组，行顺序见STAT_NAMES；没有有效值的列除count外为NaN
+    """
+    n_rows, n_cols = X.shape
+    out = np.full((8, n_cols), np.nan)
+    for j in prange(n_cols):
+        col = X[:, j]
+        values = col[~np.isnan(col)]
+        k = values.size
+        out[0, j] = k
+        if k == 0:
+            continue
+        
+        # 分位数只需要少数几个位置上的值，用np.partition部分排序，不做完整排序
+        pos = np.empty(3)
+        kth = np.empty(8, dtype=np.int64)
+        kth[0] = 0
+        kth[7] = k - 1
+        for i in range(3):
+            pos[i] = (i + 1) * 0.25 * (k - 1)
+            lo = int(np.floor(pos[i]))
+            kth[1 + 2 * i] = lo
+            kth[2 + 2 * i] = min(lo + 1, k - 1)
+        values = np.partition(values, kth)
+        
+        total = 0.0
+        for v in values:
+            total += v
+        mean = total / k
+        out[1, j] = mean
+        if k > 1:
+            ssq = 0.0
+            for v in values:
+                ssq += (v - mean) * (v - mean)
+            out[2, j] = np.sqrt(ssq / (k - 1))
+        out[3, j] = values[0]
+        for i in range(3):
+            out[4 + i, j] = _lerp(values[kth[1 + 2 * i]], values[kth[2 + 2 * i]], pos[i] - kth[1 + 2 * i])
+        out[7, j] = values[k - 1]
+    return out
+
+
+def column_summary(X):
+    """
+    按列计算count、mean、std(ddof=1)、min、max，以及最小值、最大值第一次出现的行号（忽略NaN）
+
+    不需要分位数时使用：不排序，每列只遍历两次
+    （第一次求个数、总和、最值及其位置，第二次求离差平方和）。
+
+    参数:
+        X: 形状为 (行数, 列数) 的float64数组，按列连续存放（F顺序）时最快
+
+    返回:
+        形状为 (7, 列数) 的数组，行顺序见SUMMARY_NAMES；没有有效值的列除count外为NaN
+    """
+    n_rows, n_cols = X.shape
+    out = np.full((7, n_cols), np.nan)
+    for j in prange(n_cols):
+        k = 0
+        total = 0.0
+        lo = 0.0
+        hi = 0.0
+        lo_row = -1
+        hi_row = -1
+        for i in range(n_rows):
+            v = X[i, j]
+            if np.isnan(v):
+                continue
+            k += 1
+            total += v
+            if lo_row < 0 or v < lo:
+                lo = v
+                lo_row = i
+            if hi_row < 0 or v > hi:
+                hi = v
+                hi_row = i
+        out[0, j] = k
+        if k == 0:
+            continue
+        
+        mean = total / k
+        out[1, j] = mean
+        if k > 1:
+            ssq = 0.0
+            for i in range(n_rows):
+                v = X[i, j]
+                if not np.isnan(v):
+                    ssq += (v - mean) * (v - mean)
+            out[2, j] = np.sqrt(ssq / (k - 1))
+        out[3, j] = lo
+        out[4, j] = hi
+        out[5, j] = lo_row
+        out[6, j] = hi_row
+    return out
+
+
+def outlier_counts(arr, lower_bounds, upper_bounds):
+    """
+    统计每列落在 [lower_bounds, upper_bounds] 之外的值的个数
+
+    比较和计数在同一次遍历中完成，不生成中间布尔数组。
+    arr按行连续存放，所以按行分块并行：每块逐行扫描，各块的计数最后再相加。
+    NaN与任何值比较都是False，不会被算作异常值。
+    """
+    n_rows, n_cols = arr.shape
+    n_blocks = (n_rows + OUTLIER_BLOCK_ROWS - 1) // OUTLIER_BLOCK_ROWS
+    partial = np.zeros((n_blocks, n_cols), dtype=np.int64)
+    for b in prange(n_blocks):
+        start = b * OUTLIER_BLOCK_ROWS
+        stop = min(start + OUTLIER_BLOCK_ROWS, n_rows)
+        for i in range(start, stop):
+            for j in range(n_cols):
+                v = arr[i, j]
+                if v < lower_bounds[j] or v > upper_bounds[j]:
+                    partial[b, j] += 1
+    return partial.sum(axis=0)
+
+
+def nan_pearson(X):
+    """
+    成对删除缺失值的Pearson相关系数矩阵（与DataFrame.corr()的结果一致）
+
+    每对列只使用两列都是有限值的行，按Welford方法一次遍历求均值、方差和协方差，
+    计算顺序与pandas相同；不同列对之间相互独立，按行号i并行。
+
+    参数:
+        X: 形状为 (行数, 列数) 的float64数组，按列连续存放（F顺序）时最快
+
+    返回:
+        形状为 (列数, 列数) 的相关系数矩阵；有效值不足或方差为0时为NaN
+    """
+    n_rows, n_cols = X.shape
+    out = np.empty((n_cols, n_cols))
+    for i in prange(n_cols):
+        for j in range(i, n_cols):
+            nobs = 0
+            mean_x = 0.0
+            mean_y = 0.0
+            ssq_x = 0.0
+            ssq_y = 0.0
+            cov_xy = 0.0
+            for k in range(n_rows):
+                vx = X[k, i]
+                vy = X[k, j]
+                if np.isfinite(vx) and np.isfinite(vy):
+                    nobs += 1
+                    dx = vx - mean_x
+                    dy = vy - mean_y
+                    mean_x += 1.0 / nobs * dx
+                    mean_y += 1.0 / nobs * dy
+                    ssq_x += (vx - mean_x) * dx
+                    ssq_y += (vy - mean_y) * dy
+                    cov_xy += (vx - mean_x) * dy
+            divisor = np.sqrt(ssq_x * ssq_y)
+            if nobs > 0 and divisor != 0:
+                r = cov_xy / divisor
+            else:
+                r = np.nan
+            out[i, j] = r
+            out[j, i] = r
+    return out
+
+
+def group_sum(codes, values, n_groups):
+    """
+    按分组编号对values求和（忽略编号为-1的行和NaN，与groupby().sum()一致）
+    
+    参数:
+        codes: 每行的分组编号（pd.factorize的结果，缺失的分组键为-1）
+        values: 每行的值，int64或float64（整数求和结果仍为整数）
+        n_groups: 分组数
+    
+    返回:
+        长度为n_groups的数组，没有有效值的分组为0
+    """
+    out = np.zeros(n_groups, dtype=values.dtype)
+    for i in range(codes.size):
+        code = codes[i]
+        v = values[i]
+        # v == v 对整数恒为True，对浮点数排除NaN
+        if code >= 0 and v == v:
+            out[code] += v
+    return out
+
+
+def warmup():
+    """用很小的数组调用一次每个内核（在主线程中启动numba的线程层，并预先载入编译结果）"""
+    X = np.zeros((2, 2))
+    column_stats(X)
+    column_summary(X)
+    nan_pearson(X)
+    outlier_counts(X, np.zeros(2), np.zeros(2))
+    codes = np.zeros(2, dtype=np.int64)
+    group_sum(codes, np.zeros(2), 1)
+    group_sum(codes, codes, 1)
+
+
+if HAVE_NUMBA:
+    # 声明签名后在导入时立即编译；数组参数不限定内存布局（C/F顺序都可以直接传入）。
+    # 数据数组声明为只读：pandas写时复制、Arrow零拷贝得到的数组是只读的，
+    # 可写数组也能直接传给只读签名（反过来则报 No matching definition）
+    _F2 = types.Array(types.float64, 2, "A", readonly=True)
+    _F1 = types.Array(types.float64, 1, "A", readonly=True)
+    _I1 = types.Array(types.int64, 1, "A", readonly=True)
+    
+    _lerp = njit("float64(float64, float64, float64)", cache=True)(_lerp)
+    column_stats = njit(types.float64[:, :](_F2), parallel=True, cache=True)(column_stats)
+    column_summary = njit(types.float64[:, :](_F2), parallel=True, cache=True)(column_summary)
+    outlier_counts = njit(types.int64[:](_F2, _F1, _F1), parallel=True, cache=True)(outlier_counts)
+    nan_pearson = njit(types.float64[:, :](_F2), parallel=True, cache=True)(nan_pearson)
+    # 按值的类型各编译一个版本；逐行累加到分组上，不并行
+    group_sum = njit(
+        [types.float64[:](_I1, _F1, types.int64), types.int64[:](_I1, _I1, types.int64)], cache=True
+    )(group_sum)
+
+    # numba的线程层（TBB）如果第一次是在非主线程中启动的，进程退出时会卡住；
+    # 工具可能在线程池中执行，所以导入时先在主线程中把内核都调用一次
+    warmup()
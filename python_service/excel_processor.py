@@ -12,10 +12,44 @@ Excel数据处理模块
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional, BinaryIO, Union
 from dataclasses import dataclass
 from io import BytesIO
+from pathlib import Path
+import hashlib
 import os
+import threading
+import time
+
+from openpyxl import load_workbook
+
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
+
+try:
+    import xlsxwriter  # noqa: F401
+    OUTPUT_ENGINE = "xlsxwriter"
+except ImportError:
+    OUTPUT_ENGINE = "openpyxl"
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
+# 处理函数会在线程池中执行，调用并行内核时与Agent工具共用同一把锁
+# （导入agent_kernels时也会在主线程中启动numba的线程层）
+from agent_kernels import KERNEL_LOCK
+
+# 解析结果缓存目录，按文件内容SHA256命名（用于开发时反复处理同一批文件）；
+# 默认为空，不缓存
+EXCEL_CACHE_DIR = os.getenv("EXCEL_CACHE_DIR", "")
+# 缓存文件的保存时间（秒）和最多保存的个数，超出后删除最旧的
+EXCEL_CACHE_TTL = int(os.getenv("EXCEL_CACHE_TTL", "86400"))
+EXCEL_CACHE_MAX_FILES = int(os.getenv("EXCEL_CACHE_MAX_FILES", "64"))
 
 
 @dataclass
@@ -29,9 +63,9 @@ class ProcessingResult:
 
 @dataclass
 class GroupData:
-    """单组数据"""
-    x: pd.Series
-    y: pd.Series
+    """单组数据（已清洗的float64数组）"""
+    x: np.ndarray
+    y: np.ndarray
     name: str
 
 
@@ -40,6 +74,198 @@ class CalculationParams:
     """计算参数"""
     slope_b: float = -0.4823  # B组斜率
     slope_e: float = 0.4557   # E组斜率
+    precision: str = "float64"  # 计算精度，"float32"可减半内存带宽（约7位有效数字）
+
+
+def _clean_pairs_kernel(values, present, pairs, out_x, out_y, out_len):
+    """
+    并行清洗多对x/y列（numba内核）
+    
+    对每一对列，分别跳过原始值为空的单元格，按位置对齐x、y两列的非空值，
+    直到任一列耗尽；对齐后任一侧转换为NaN的点被丢弃，结果紧凑写入out_x/out_y
+    """
+    n_rows = values.shape[0]
+    for k in prange(pairs.shape[0]):
+        xi = pairs[k, 0]
+        yi = pairs[k, 1]
+        ix = 0
+        iy = 0
+        count = 0
+        while True:
+            while ix < n_rows and not present[ix, xi]:
+                ix += 1
+            while iy < n_rows and not present[iy, yi]:
+                iy += 1
+            if ix >= n_rows or iy >= n_rows:
+                break
+            xv = values[ix, xi]
+            yv = values[iy, yi]
+            if not (np.isnan(xv) or np.isnan(yv)):
+                out_x[k, count] = xv
+                out_y[k, count] = yv
+                count += 1
+            ix += 1
+            iy += 1
+        out_len[k] = count
+
+
+if njit is not None:
+    _clean_pairs_kernel = njit(parallel=True, cache=True)(_clean_pairs_kernel)
+
+
+def _group_kernel(x1, y1, x2, y2, sb, se, b):
+    """
+    组计算内核：y3/y5和y4/y6各在一次循环中算完
+    
+    斜率和b作为参数传入（与数组同精度的标量），所有斜率共用同一个编译结果，
+    只按数组精度（float32/float64）各编译一次；
+    返回 (y3, y4, y5, y6)，结果与逐步的NumPy计算逐位一致
+    """
+    y3 = np.empty_like(x1)
+    y5 = np.empty_like(x1)
+    for i in range(x1.shape[0]):
+        y3[i] = sb * x1[i]
+        y5[i] = y1[i] - y3[i]
+    y4 = np.empty_like(x2)
+    y6 = np.empty_like(x2)
+    for i in range(x2.shape[0]):
+        y4[i] = se * x2[i] + b
+        y6[i] = y2[i] - y4[i]
+    return y3, y4, y5, y6
+
+
+if njit is not None:
+    _group_kernel = njit(cache=True)(_group_kernel)
+
+
+def _read_first_sheet(source: Union[bytes, BinaryIO]) -> pd.DataFrame:
+    """
+    读取Excel第一个工作表，第一行作为表头
+    
+    xlsx文件用openpyxl只读模式流式读取单元格值，不构建完整的单元格对象树；
+    其他格式（如xls）交给pd.read_excel处理
+    
+    参数:
+        source: 文件内容（二进制），或可seek的二进制文件对象
+        
+    返回:
+        解析得到的DataFrame，列名规则与pd.read_excel一致
+    """
+    stream = BytesIO(source) if isinstance(source, bytes) else source
+    stream.seek(0)
+    is_xlsx = stream.read(2) == b"PK"
+    stream.seek(0)
+    if not is_xlsx:
+        return _coerce_xy_columns(pd.read_excel(stream, sheet_name=0))
+    
+    wb = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        data = list(rows)
+    finally:
+        wb.close()
+    
+    # 去掉末尾的全空行
+    while data and all(v is None for v in data[-1]):
+        data.pop()
+    
+    width = max([len(header)] + [len(row) for row in data])
+    header += [None] * (width - len(header))
+    
+    # 空表头命名为"Unnamed: i"，重复表头追加".1"、".2"后缀
+    columns = []
+    seen: Dict[Any, int] = {}
+    for i, name in enumerate(header):
+        if name is None or (isinstance(name, str) and not name.strip()):
+            name = f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    
+    return _coerce_xy_columns(pd.DataFrame(data, columns=columns))
+
+
+def _coerce_xy_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    读取时将x/y数据列统一转为float64，后续解析无需再逐对做数值转换
+    
+    含无法转换文本的列保持原样，由_parse_groups按原有规则（先去空再对齐、后转数值）处理
+    """
+    for col in df.columns:
+        if not str(col).lower().startswith(('x', 'y')) or df[col].dtype == np.float64:
+            continue
+        try:
+            df[col] = pd.to_numeric(df[col]).astype(np.float64)
+        except (ValueError, TypeError):
+            pass
+    return df
+
+
+def _cached_read(source: Union[bytes, BinaryIO]) -> pd.DataFrame:
+    """
+    读取Excel第一个工作表，结果按文件内容哈希缓存到磁盘
+    
+    同一文件重复处理时直接加载缓存的DataFrame，跳过Excel解析
+    
+    参数:
+        source: 文件内容（二进制），或可seek的二进制文件对象（分块计算哈希，不整体读入内存）
+        
+    返回:
+        解析得到的DataFrame
+    """
+    if not EXCEL_CACHE_DIR:
+        return _read_first_sheet(source)
+    
+    if isinstance(source, bytes):
+        digest = hashlib.sha256(source).hexdigest()
+    else:
+        source.seek(0)
+        digest = hashlib.file_digest(source, "sha256").hexdigest()
+        source.seek(0)
+    cache_dir = Path(EXCEL_CACHE_DIR)
+    cache_file = cache_dir / f"{digest}.pkl"
+    try:
+        fresh = time.time() - cache_file.stat().st_mtime <= EXCEL_CACHE_TTL
+    except OSError:
+        fresh = False
+    if fresh:
+        try:
+            return pd.read_pickle(cache_file)
+        except Exception:
+            pass  # 缓存损坏时重新解析
+    
+    df = _read_first_sheet(source)
+    # 先写临时文件再改名，并发的请求不会读到写了一半的文件
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        df.to_pickle(tmp_file)
+        os.replace(tmp_file, cache_file)
+        _evict_cache_files(cache_dir)
+    except OSError:
+        tmp_file.unlink(missing_ok=True)  # 缓存写入失败不影响处理
+    return df
+
+
+def _evict_cache_files(cache_dir: Path):
+    """删除过期的缓存文件；剩余文件超过EXCEL_CACHE_MAX_FILES个时再删除最旧的"""
+    now = time.time()
+    entries = []
+    for cache_file in cache_dir.glob("*.pkl"):
+        try:
+            mtime = cache_file.stat().st_mtime
+        except OSError:
+            continue  # 已被其他请求删除
+        entries.append((mtime, cache_file))
+    entries.sort()
+    n_excess = len(entries) - EXCEL_CACHE_MAX_FILES
+    for i, (mtime, cache_file) in enumerate(entries):
+        if i < n_excess or now - mtime > EXCEL_CACHE_TTL:
+            cache_file.unlink(missing_ok=True)
 
 
 class ExcelDataProcessor:
@@ -62,23 +288,35 @@ class ExcelDataProcessor:
         """
         self.params = params or CalculationParams()
         self.groups: List[Tuple[GroupData, GroupData]] = []  # [(B组, E组), ...]
+        
+        # 安装了numba时使用编译的组计算内核
+        self._kernel = _group_kernel if njit is not None else None
     
-    def read_excel(self, file_path: str = None, file_content: bytes = None) -> ProcessingResult:
+    def read_excel(
+        self,
+        file_path: str = None,
+        file_content: bytes = None,
+        file_stream: BinaryIO = None
+    ) -> ProcessingResult:
         """
         读取Excel文件
         
         参数:
             file_path: 文件路径
             file_content: 文件内容（二进制）
+            file_stream: 可seek的二进制文件对象（如上传的临时文件），从头读取，不整体读入内存
             
         返回:
             ProcessingResult: 处理结果
         """
         try:
             if file_content:
-                df = pd.read_excel(BytesIO(file_content), sheet_name=0)
+                df = _cached_read(file_content)
+            elif file_stream is not None:
+                df = _cached_read(file_stream)
             elif file_path:
-                df = pd.read_excel(file_path, sheet_name=0)
+                with open(file_path, 'rb') as f:
+                    df = _cached_read(f)
             else:
                 return ProcessingResult(False, "未提供文件路径或内容")
             
@@ -115,54 +353,38 @@ class ExcelDataProcessor:
         groups = []
         columns = df.columns.tolist()
         
-        # 找出所有的数据列对 (x, y)
+        # 找出所有的数据列对 (x, y)，记录列位置
+        # 规则：x开头的列（跳过空列/unnamed列），其后1~2列内第一个y开头的列与之配对
+        # 用向量化的字符串判断一次算出所有列的标记，不逐列循环
+        names = np.array([str(c).lower() for c in columns], dtype=str)
+        skip = (np.char.find(names, 'unnamed') >= 0) | pd.isna(columns)
+        is_x = np.char.startswith(names, 'x') & ~skip
+        is_y = np.char.startswith(names, 'y')
+        
+        # y_next1[i]: 第i+1列是y列；y_next2[i]: 第i+2列是y列
+        y_next1 = np.zeros(len(columns), dtype=bool)
+        y_next2 = np.zeros(len(columns), dtype=bool)
+        y_next1[:-1] = is_y[1:]
+        y_next2[:-2] = is_y[2:]
+        
+        x_idx = np.flatnonzero(is_x & (y_next1 | y_next2))
+        y_idx = np.where(y_next1[x_idx], x_idx + 1, x_idx + 2)
+        pair_idx = list(zip(x_idx.tolist(), y_idx.tolist()))
+        
+        # 清洗每对数据
+        if njit is not None and len(pair_idx) > 1:
+            cleaned = self._clean_pairs_jit(df, pair_idx)
+        else:
+            cleaned = [
+                self._clean_pair(df.iloc[:, xi].to_numpy(), df.iloc[:, yi].to_numpy())
+                for xi, yi in pair_idx
+            ]
+        
         data_pairs = []
-        i = 0
-        while i < len(columns):
-            col = columns[i]
-            # 跳过空列或unnamed列
-            if 'unnamed' in str(col).lower() or pd.isna(col):
-                i += 1
-                continue
-            
-            # 检查是否是x列
-            col_str = str(col).lower()
-            if col_str.startswith('x'):
-                # 找对应的y列
-                x_col = col
-                y_col = None
-                
-                # 查找下一个y列
-                for j in range(i + 1, min(i + 3, len(columns))):
-                    next_col = str(columns[j]).lower()
-                    if next_col.startswith('y'):
-                        y_col = columns[j]
-                        break
-                
-                if y_col:
-                    # 提取有效数据（去除NaN）
-                    x_data = df[x_col].dropna()
-                    y_data = df[y_col].dropna()
-                    
-                    # 取相同长度
-                    min_len = min(len(x_data), len(y_data))
-                    if min_len > 0:
-                        x_data = x_data.iloc[:min_len].reset_index(drop=True)
-                        y_data = y_data.iloc[:min_len].reset_index(drop=True)
-                        
-                        # 转换为数值类型
-                        x_data = pd.to_numeric(x_data, errors='coerce')
-                        y_data = pd.to_numeric(y_data, errors='coerce')
-                        
-                        # 再次去除NaN
-                        valid_mask = ~(x_data.isna() | y_data.isna())
-                        x_data = x_data[valid_mask].reset_index(drop=True)
-                        y_data = y_data[valid_mask].reset_index(drop=True)
-                        
-                        if len(x_data) > 0:
-                            group_name = f"Group_{len(data_pairs) + 1}"
-                            data_pairs.append(GroupData(x_data, y_data, group_name))
-            i += 1
+        for x_data, y_data in cleaned:
+            if len(x_data) > 0:
+                group_name = f"Group_{len(data_pairs) + 1}"
+                data_pairs.append(GroupData(x_data, y_data, group_name))
         
         # 将数据对组合成(B组, E组)
         # 假设数据是成对出现的：第1对是B组，第2对是E组
@@ -175,6 +397,79 @@ class ExcelDataProcessor:
         
         return groups
     
+    def _clean_pair(self, x_data: np.ndarray, y_data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        清洗一对x/y列数据
+        
+        两列各自去除空值后按位置对齐、截取相同长度，再转换为数值并去掉含NaN的点
+        
+        参数:
+            x_data: x列原始值
+            y_data: y列原始值
+            
+        返回:
+            清洗后的(x, y) float64数组
+        """
+        # 提取有效数据（去除NaN）
+        x_data = x_data[~pd.isna(x_data)]
+        y_data = y_data[~pd.isna(y_data)]
+        
+        # 取相同长度
+        min_len = min(len(x_data), len(y_data))
+        
+        # 转换为数值类型
+        x_data = self._to_float_array(x_data[:min_len])
+        y_data = self._to_float_array(y_data[:min_len])
+        
+        # 再次去除NaN
+        valid_mask = ~(np.isnan(x_data) | np.isnan(y_data))
+        if not valid_mask.all():
+            x_data = x_data[valid_mask]
+            y_data = y_data[valid_mask]
+        return x_data, y_data
+    
+    def _clean_pairs_jit(
+        self, 
+        df: pd.DataFrame, 
+        pair_idx: List[Tuple[int, int]]
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        用numba内核并行清洗多对x/y列，结果与_clean_pair一致
+        
+        参数:
+            df: 原始DataFrame
+            pair_idx: (x列位置, y列位置) 列表
+            
+        返回:
+            清洗后的(x, y) float64数组列表
+        """
+        # 只取用到的列，组装成数值矩阵M和"原始值非空"矩阵P
+        used = sorted({c for pair in pair_idx for c in pair})
+        pos = {c: k for k, c in enumerate(used)}
+        raw = [df.iloc[:, c].to_numpy() for c in used]
+        present = np.column_stack([~pd.isna(v) for v in raw])
+        values = np.column_stack([self._to_float_array(v) for v in raw])
+        pairs = np.array([(pos[xi], pos[yi]) for xi, yi in pair_idx], dtype=np.int64)
+        
+        n_rows = values.shape[0]
+        out_x = np.empty((len(pairs), n_rows), dtype=np.float64)
+        out_y = np.empty((len(pairs), n_rows), dtype=np.float64)
+        out_len = np.zeros(len(pairs), dtype=np.int64)
+        with KERNEL_LOCK:
+            _clean_pairs_kernel(values, present, pairs, out_x, out_y, out_len)
+        
+        return [
+            (out_x[k, :out_len[k]].copy(), out_y[k, :out_len[k]].copy())
+            for k in range(len(pairs))
+        ]
+    
+    @staticmethod
+    def _to_float_array(values: np.ndarray) -> np.ndarray:
+        """将列数据转为float64数组，无法转换的值置为NaN"""
+        if values.dtype.kind in "fiub":
+            return values.astype(np.float64, copy=False)
+        return pd.to_numeric(values, errors='coerce').astype(np.float64, copy=False)
+    
     def process(self) -> ProcessingResult:
         """
         处理所有数据组
@@ -228,12 +523,16 @@ class ExcelDataProcessor:
         返回:
             处理结果字典
         """
-        # B组计算
-        x1 = b_group.x
-        y1 = b_group.y
+        # 直接在ndarray上计算，避免Series逐次运算的索引对齐开销
+        dtype = np.dtype(self.params.precision)
+        x1 = b_group.x.astype(dtype, copy=False)
+        y1 = b_group.y.astype(dtype, copy=False)
+        x2 = e_group.x.astype(dtype, copy=False)
+        y2 = e_group.y.astype(dtype, copy=False)
         
-        # y3 = slope_b * x1
-        y3 = self.params.slope_b * x1
+        # 斜率转成同精度标量，避免运算时被提升回float64
+        slope_b = dtype.type(self.params.slope_b)
+        slope_e = dtype.type(self.params.slope_e)
         
         # 计算b值：使用B组最后一个有效点
         # b = y1_last - y3_last
@@ -247,41 +546,58 @@ class ExcelDataProcessor:
         # 2. 这个y3_last值作为y4在x2起始点的值，用来计算b
         # 即：y3_last = 0.4557 * x2_first + b => b = y3_last - 0.4557 * x2_first
         
-        y3_last = y3.iloc[-1]
-        x2_first = e_group.x.iloc[0]
+        # y3_last只依赖x1最后一个点，直接用标量计算，无需等整个y3数组
+        y3_last = slope_b * x1[-1]
+        x2_first = x2[0]
         
         # 计算b值
-        b = y3_last - self.params.slope_e * x2_first
-        
-        # E组计算
-        x2 = e_group.x
-        y2 = e_group.y
+        b = y3_last - slope_e * x2_first
         
-        # y4 = slope_e * x2 + b
-        y4 = self.params.slope_e * x2 + b
-        
-        # 计算非线性部分
-        y5 = y1 - y3  # B组非线性部分
-        y6 = y2 - y4  # E组非线性部分
+        if self._kernel is not None:
+            # numba内核：一次遍历算出y3/y5和y4/y6
+            y3, y4, y5, y6 = self._kernel(x1, y1, x2, y2, slope_b, slope_e, b)
+        elif ne is not None:
+            # B组计算
+            # y3 = slope_b * x1（输出需要完整的线性部分）
+            y3 = slope_b * x1
+            
+            # numexpr将整条表达式分块融合计算，不产生中间临时数组
+            env = {"x1": x1, "y1": y1, "x2": x2, "y2": y2,
+                   "slope_b": slope_b, "slope_e": slope_e, "b": b}
+            y4 = ne.evaluate("slope_e * x2 + b", local_dict=env)
+            y5 = ne.evaluate("y1 - slope_b * x1", local_dict=env)
+            y6 = ne.evaluate("y2 - (slope_e * x2 + b)", local_dict=env)
+        else:
+            # B组计算
+            # y3 = slope_b * x1（输出需要完整的线性部分）
+            y3 = slope_b * x1
+            
+            # E组计算
+            # y4 = slope_e * x2 + b
+            y4 = slope_e * x2 + b
+            
+            # 计算非线性部分
+            y5 = y1 - y3  # B组非线性部分
+            y6 = y2 - y4  # E组非线性部分
         
         return {
             "group_index": group_idx,
-            "b_value": b,
-            "y3_last": y3_last,
+            "b_value": float(b),
+            "y3_last": float(y3_last),
             "b_group": {
                 "name": b_group.name,
-                "x1": x1.tolist(),
-                "y1": y1.tolist(),
-                "y3": y3.tolist(),
-                "y5": y5.tolist(),
+                "x1": x1,
+                "y1": y1,
+                "y3": y3,
+                "y5": y5,
                 "data_count": len(x1)
             },
             "e_group": {
                 "name": e_group.name,
-                "x2": x2.tolist(),
-                "y2": y2.tolist(),
-                "y4": y4.tolist(),
-                "y6": y6.tolist(),
+                "x2": x2,
+                "y2": y2,
+                "y4": y4,
+                "y6": y6,
                 "data_count": len(x2)
             }
         }
@@ -298,7 +614,9 @@ class ExcelDataProcessor:
         """
         output = BytesIO()
         
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        # 优先用xlsxwriter流式写出，比openpyxl构建完整单元格树更快、更省内存
+        # 注意：pandas按列写单元格，不能开启xlsxwriter的constant_memory模式
+        with pd.ExcelWriter(output, engine=OUTPUT_ENGINE) as writer:
             # 为每组数据创建一个sheet
             for result in results:
                 group_idx = result["group_index"]
@@ -306,13 +624,13 @@ class ExcelDataProcessor:
                 e_data = result["e_group"]
                 b_value = result["b_value"]
                 
-                # 创建B组数据DataFrame
+                # 创建B组数据DataFrame（直接引用计算得到的ndarray，不复制）
                 b_df = pd.DataFrame({
                     'x1': b_data['x1'],
                     'y1': b_data['y1'],
                     'y3 (线性部分)': b_data['y3'],
                     'y5 (非线性部分)': b_data['y5']
-                })
+                }, copy=False)
                 
                 # 创建E组数据DataFrame
                 e_df = pd.DataFrame({
@@ -320,7 +638,7 @@ class ExcelDataProcessor:
                     'y2': e_data['y2'],
                     'y4 (线性部分)': e_data['y4'],
                     'y6 (非线性部分)': e_data['y6']
-                })
+                }, copy=False)
                 
                 # 合并两组数据，用空列分隔
                 # 由于两组数据长度可能不同，需要处理
@@ -328,12 +646,12 @@ class ExcelDataProcessor:
                 
                 # 扩展较短的DataFrame
                 if len(b_df) < max_len:
-                    b_df = pd.concat([b_df, pd.DataFrame(index=range(len(b_df), max_len))], ignore_index=True)
+                    b_df = b_df.reindex(range(max_len))
                 if len(e_df) < max_len:
-                    e_df = pd.concat([e_df, pd.DataFrame(index=range(len(e_df), max_len))], ignore_index=True)
+                    e_df = e_df.reindex(range(max_len))
                 
                 # 添加空列分隔
-                separator = pd.DataFrame({'': [None] * max_len})
+                separator = pd.DataFrame({'': np.full(max_len, np.nan)})
                 
                 # 合并
                 combined_df = pd.concat([b_df, separator, e_df], axis=1)
@@ -342,23 +660,24 @@ class ExcelDataProcessor:
                 sheet_name = f"组{group_idx}"
                 combined_df.to_excel(writer, sheet_name=sheet_name, index=False)
                 
-                # 获取worksheet添加计算参数信息
-                worksheet = writer.sheets[sheet_name]
-                
-                # 在数据下方添加计算参数
-                start_row = max_len + 3
-                worksheet.cell(row=start_row, column=1, value="计算参数:")
-                worksheet.cell(row=start_row + 1, column=1, value=f"B组斜率: {self.params.slope_b}")
-                worksheet.cell(row=start_row + 2, column=1, value=f"E组斜率: {self.params.slope_e}")
-                worksheet.cell(row=start_row + 3, column=1, value=f"计算得到的b值: {b_value:.6f}")
-                worksheet.cell(row=start_row + 4, column=1, value=f"y3最后一个点值: {result['y3_last']:.6f}")
-                
-                # 添加公式说明
-                worksheet.cell(row=start_row + 6, column=1, value="计算公式:")
-                worksheet.cell(row=start_row + 7, column=1, value="y3 = -0.4823 × x1")
-                worksheet.cell(row=start_row + 8, column=1, value="y4 = 0.4557 × x2 + b")
-                worksheet.cell(row=start_row + 9, column=1, value="y5 = y1 - y3 (B组非线性部分)")
-                worksheet.cell(row=start_row + 10, column=1, value="y6 = y2 - y4 (E组非线性部分)")
+                # 在数据下方添加计算参数和公式说明，作为一个单列DataFrame一次写入
+                meta_df = pd.DataFrame([
+                    "计算参数:",
+                    f"B组斜率: {self.params.slope_b}",
+                    f"E组斜率: {self.params.slope_e}",
+                    f"计算得到的b值: {b_value:.6f}",
+                    f"y3最后一个点值: {result['y3_last']:.6f}",
+                    None,
+                    "计算公式:",
+                    "y3 = -0.4823 × x1",
+                    "y4 = 0.4557 × x2 + b",
+                    "y5 = y1 - y3 (B组非线性部分)",
+                    "y6 = y2 - y4 (E组非线性部分)",
+                ])
+                meta_df.to_excel(
+                    writer, sheet_name=sheet_name,
+                    startrow=max_len + 2, index=False, header=False
+                )
             
             # 创建汇总sheet
             summary_data = []
@@ -382,7 +701,9 @@ def process_excel_file(
     file_path: str = None,
     file_content: bytes = None,
     slope_b: float = -0.4823,
-    slope_e: float = 0.4557
+    slope_e: float = 0.4557,
+    precision: str = "float64",
+    file_stream: BinaryIO = None
 ) -> ProcessingResult:
     """
     处理Excel文件的便捷函数
@@ -390,17 +711,21 @@ def process_excel_file(
     参数:
         file_path: 文件路径
         file_content: 文件内容（二进制）
+        file_stream: 可seek的二进制文件对象
         slope_b: B组斜率，默认-0.4823
         slope_e: E组斜率，默认0.4557
+        precision: 计算精度，"float64"（默认）或"float32"
         
     返回:
         ProcessingResult: 处理结果
     """
-    params = CalculationParams(slope_b=slope_b, slope_e=slope_e)
+    params = CalculationParams(slope_b=slope_b, slope_e=slope_e, precision=precision)
     processor = ExcelDataProcessor(params)
     
     # 读取文件
-    read_result = processor.read_excel(file_path=file_path, file_content=file_content)
+    read_result = processor.read_excel(
+        file_path=file_path, file_content=file_content, file_stream=file_stream
+    )
     if not read_result.success:
         return read_result
     
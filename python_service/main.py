@@ -50,9 +50,30 @@ import asyncio
 # json: 用于处理JSON格式数据（一种通用的数据交换格式）
 import json
 
+# hashlib: 计算哈希值（用于生成LLM请求缓存的键）
+import hashlib
+
+# re: 正则表达式（用于从LLM响应中提取JSON代码块）
+import re
+
 # os: 操作系统接口，用于读取环境变量、文件路径等
 import os
 
+# time: 时间戳（用于判断磁盘缓存文件是否过期）
+import time
+
+# logging: 标准日志库，记录请求处理过程和错误
+import logging
+
+# pathlib: 面向对象的文件路径操作
+from pathlib import Path
+
+# zipfile: 读取zip目录（xlsx是zip文件，解析前先检查目录，不解压工作表）
+import zipfile
+
+# warnings: 控制警告输出（全空列做NumPy统计时会产生RuntimeWarning）
+import warnings
+
 # dotenv: 加载.env文件中的环境变量
 try:
     from dotenv import load_dotenv
@@ -72,7 +93,8 @@ from datetime import datetime
 # - Any: 任意类型
 # - List: 列表类型
 # - Callable: 可调用对象（函数）类型
-from typing import Optional, Dict, Any, List, Callable
+# - ClassVar: 类变量（dataclass中不作为字段的类属性）
+from typing import Optional, Dict, Any, List, Callable, ClassVar
 
 # Enum: 枚举类型，用于定义一组固定的常量
 from enum import Enum
@@ -81,21 +103,69 @@ from enum import Enum
 # field: 用于自定义dataclass字段的默认值
 from dataclasses import dataclass, field
 
+# Mapping: 只读字典的抽象基类，实现几个方法就能像字典一样使用
+from collections.abc import Mapping
+
+# lru_cache: 函数结果缓存装饰器，相同参数直接返回上次的结果
+from functools import lru_cache
+
+# itertools.chain: 把多个可迭代对象首尾相连（用于收集所有记录的键）
+from itertools import chain
+
+# ThreadPoolExecutor: 线程池，用于按列并行做统计（NumPy/pandas的底层计算会释放GIL）
+# ProcessPoolExecutor: 进程池，用于解析Excel（解析过程大部分时间持有GIL）
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# multiprocessing: 用于指定进程池启动子进程的方式
+import multiprocessing
+
 # httpx: 现代化的HTTP客户端库，支持异步请求（用于调用LLM API和发送回调）
 import httpx
 
+# h2: httpx的HTTP/2支持依赖，可选安装
+try:
+    import h2
+except ImportError:
+    h2 = None  # 如果没有安装h2，则使用HTTP/1.1
+
+# orjson: 更快的JSON解析库（用于解析LLM响应）
+try:
+    import orjson
+except ImportError:
+    orjson = None  # 如果没有安装orjson，则使用标准库json
+
 # pandas: 强大的数据分析库，提供DataFrame数据结构（类似Excel表格）
 import pandas as pd
 
 # numpy: 数值计算库，提供高效的数组操作
 import numpy as np
 
+# pyarrow: 列式内存格式，用于把请求中的记录列表直接转换为列式表并聚合
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None  # 如果没有安装pyarrow，则使用pandas
+    pc = None
+
+# numexpr: 数值表达式引擎，把整条数组表达式融合成一次多线程计算，减少中间数组
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None  # 如果没有安装numexpr，则使用numpy直接计算
+
+# agent_kernels: numba编译的数值内核（按列统计、异常值计数、相关系数矩阵）
+# 没有安装numba时 HAVE_NUMBA 为False，使用numexpr或numpy计算
+from agent_kernels import (
+    HAVE_NUMBA, KERNEL_LOCK, KERNEL_THREADS, column_stats, column_summary, group_sum, nan_pearson, outlier_counts
+)
+
 # FastAPI相关：
 # - FastAPI: 现代化的Web框架，用于创建API接口
-# - BackgroundTasks: 后台任务，让耗时操作在后台执行，不阻塞API响应
 # - HTTPException: HTTP异常，用于返回错误响应
-from fastapi import FastAPI, BackgroundTasks, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse
 
 # CORS中间件：用于处理跨域请求
 from fastapi.middleware.cors import CORSMiddleware
@@ -103,13 +173,46 @@ from fastapi.middleware.cors import CORSMiddleware
 # Pydantic的BaseModel: 用于定义数据模型，自动进行数据验证
 from pydantic import BaseModel
 
+# cachetools: 带过期时间和容量上限的缓存容器（用于任务状态存储）
+try:
+    from cachetools import TTLCache
+except ImportError:
+    TTLCache = None  # 如果没有安装cachetools，则退回普通字典
+
+# redis: 设置了REDIS_URL时，任务状态同时写入Redis，多个worker/副本都能查询
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None  # 如果没有安装redis，则只保存在进程内
+
 # ============================================================================
 # 创建FastAPI应用实例
 # ============================================================================
 # FastAPI是一个现代、快速的Web框架，用于构建API
 # title: API的标题，会显示在自动生成的文档中
 # version: API版本号
-app = FastAPI(title="数据分析Agent服务", version="2.0.0")
+class FastJSONResponse(JSONResponse):
+    """
+    用orjson编码的JSON响应（所有接口默认使用）
+    
+    orjson直接编码numpy数组和numpy标量，比标准库json快很多；
+    NaN/Infinity编码为null（标准库会输出不合法的NaN）；
+    orjson不支持的类型（如pandas.Timestamp）交给jsonable_encoder转换。
+    没有安装orjson时与JSONResponse相同。
+    """
+    
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(
+            content,
+            default=jsonable_encoder,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+
+
+# default_response_class: 接口返回的字典用FastJSONResponse编码
+app = FastAPI(title="数据分析Agent服务", version="2.0.0", default_response_class=FastJSONResponse)
 
 # ============================================================================
 # CORS配置（跨域资源共享）
@@ -129,6 +232,19 @@ app.add_middleware(
 # 这些配置通过环境变量读取，方便在不同环境（开发、测试、生产）中使用不同的值
 # os.getenv("变量名", "默认值") - 如果环境变量不存在，则使用默认值
 
+# 日志级别（DEBUG/INFO/WARNING/ERROR），生产环境可设为WARNING，不再输出每个请求的处理日志
+# 【为什么不用print？】
+# print每次都要获取stdout的锁，请求多时会互相等待；logging按级别过滤，
+# 低于LOG_LEVEL的日志不会格式化，也不会输出。日志格式固定，方便日志系统采集。
+# 如果uvicorn等已经配置了根日志记录器，basicConfig不会覆盖它们的配置
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(
+    level=LOG_LEVEL,
+    handlers=[logging.StreamHandler()],
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+)
+logger = logging.getLogger(__name__)
+
 # LLM（大语言模型）API的基础URL地址（不包含/chat/completions）
 # 默认使用阿里云的API，也可以配置为其他兼容的API
 LLM_API_URL = os.getenv("LLM_API_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
@@ -145,14 +261,175 @@ LLM_MODEL = os.getenv("LLM_MODEL", "qwen-flash-2025-07-28")
 # 防止Agent陷入无限循环，超过这个次数就强制停止
 MAX_AGENT_ITERATIONS = int(os.getenv("MAX_AGENT_ITERATIONS", "15"))
 
+# 发给LLM的对话中保留完整内容的最近观察结果条数
+# 更早的观察结果只保留开头OBSERVATION_PREVIEW_CHARS个字符，
+# 避免每轮都把所有历史观察结果完整地再发一遍（token数随迭代次数平方增长）
+FULL_OBSERVATIONS_IN_CONTEXT = int(os.getenv("FULL_OBSERVATIONS_IN_CONTEXT", "3"))
+OBSERVATION_PREVIEW_CHARS = 200
+
 # ============================================================================
 # 任务状态存储
 # ============================================================================
-# 使用字典存储所有任务的状态
+# 所有任务的状态由TaskStore管理（定义见下方TaskState之后）
 # 键：任务ID（字符串）
-# 值：任务状态信息（字典）
-# 注意：这是内存存储，服务重启后数据会丢失。生产环境建议使用Redis或数据库
-tasks_store: Dict[str, Dict[str, Any]] = {}
+# 值：任务状态信息（TaskState对象）
+#
+# 【容量控制】
+# 普通字典会随着服务运行无限增长，这里用TTLCache限制：
+# - 最多保存 TASKS_STORE_MAXSIZE 个任务，超出时淘汰最久未使用的
+# - 任务创建 TASKS_STORE_TTL 秒后自动过期
+#
+# 【多worker部署】
+# 进程内的存储在服务重启后会丢失，而且多个worker时，查询请求可能落到
+# 没有执行该任务的worker上。设置了 REDIS_URL 时，每次状态变化都会写入
+# Redis的哈希 task:{任务ID}（同样在TASKS_STORE_TTL秒后过期），
+# 本地找不到的任务从Redis读取，任何worker/副本都能返回任务状态。
+TASKS_STORE_MAXSIZE = int(os.getenv("TASKS_STORE_MAXSIZE", "10000"))
+TASKS_STORE_TTL = int(os.getenv("TASKS_STORE_TTL", "3600"))
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+
+# ============================================================================
+# 共享HTTP客户端
+# ============================================================================
+# 每次请求都新建httpx.AsyncClient，意味着每次都要重新建立TCP连接和TLS握手。
+# Agent一次分析会调用多次LLM并发送多次进度回调，这里改为全局共用一个客户端，
+# 利用连接池复用keep-alive连接。服务关闭时在shutdown事件中释放（见下方）。
+# 安装了h2库（pip install httpx[http2]）时启用HTTP/2，多个请求复用同一条连接。
+http_client = httpx.AsyncClient(
+    http2=h2 is not None,
+    timeout=60.0,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+)
+
+
+@app.on_event("shutdown")
+async def close_http_client():
+    """服务关闭时释放共享HTTP客户端的连接（包括报告生成模块的客户端）"""
+    from report_generator.data_analyzer import close_http_clients
+    await http_client.aclose()
+    await close_http_clients()
+
+
+# ============================================================================
+# LLM响应缓存
+# ============================================================================
+# Agent的ReAct循环、文章处理都会反复调用LLM，相同的请求（模型、参数、消息
+# 完全一致）没必要再花一次网络延迟和API费用。
+# 这里按请求体的规范化JSON计算SHA256作为键，命中时直接返回上次的回复。
+# 设置 LLM_CACHE_SIZE=0 可关闭缓存；未安装cachetools时也不缓存。
+# 设置 LLM_CACHE_DIR 后，回复还会按键写入该目录，服务重启或多个worker之间也能命中
+# （内存缓存未命中时再查磁盘，同样按LLM_CACHE_TTL过期）。
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "")
+
+if TTLCache is not None and LLM_CACHE_SIZE > 0:
+    llm_response_cache: Optional[Dict[str, str]] = TTLCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL)
+else:
+    llm_response_cache = None
+
+# 并发的多个任务同时发出相同请求时，只发送一次，其余请求等待同一个结果
+# （键 -> 正在进行的请求；只在启用缓存时合并，关闭缓存时每次请求都独立发送）
+_llm_inflight: Dict[str, asyncio.Future] = {}
+
+# 同时发往LLM接口的请求数上限，并发任务很多时请求排队发送，避免触发服务商的限流
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+
+def llm_cache_key(payload: Dict[str, Any]) -> str:
+    """计算LLM请求体的缓存键（键排序后的JSON的SHA256）"""
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def read_llm_disk_cache(key: str) -> Optional[str]:
+    """从LLM_CACHE_DIR读取缓存的回复，不存在、已过期或未启用时返回None"""
+    if not LLM_CACHE_DIR:
+        return None
+    cache_file = Path(LLM_CACHE_DIR) / f"{key}.txt"
+    try:
+        if time.time() - cache_file.stat().st_mtime > LLM_CACHE_TTL:
+            return None
+        return cache_file.read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def write_llm_disk_cache(key: str, content: str):
+    """把回复写入LLM_CACHE_DIR（先写临时文件再改名，其他进程不会读到写了一半的文件）"""
+    if not LLM_CACHE_DIR:
+        return
+    cache_file = Path(LLM_CACHE_DIR) / f"{key}.txt"
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file.write_text(content, encoding="utf-8")
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass  # 缓存写入失败不影响调用
+
+
+async def cached_llm_call(payload: Dict[str, Any], timeout: float = 60.0) -> str:
+    """
+    调用LLM的chat/completions接口，相同请求体直接返回缓存的回复
+    
+    参数:
+        payload: 请求体（model、messages、temperature等）
+        timeout: 超时时间（秒）
+        
+    返回:
+        助手的回复内容；请求失败时抛出异常，由调用方处理
+    """
+    if llm_response_cache is None:
+        return await _post_llm(payload, timeout)
+    
+    key = llm_cache_key(payload)
+    if key in llm_response_cache:
+        return llm_response_cache[key]
+    
+    # 相同的请求正在进行中：等待它的结果（shield: 本调用被取消时不影响那个请求）
+    pending = _llm_inflight.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+    
+    future = asyncio.get_running_loop().create_future()
+    # 没有其他调用方等待时，失败的结果也算已读取，不输出"exception was never retrieved"
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _llm_inflight[key] = future
+    try:
+        content = read_llm_disk_cache(key)
+        if content is None:
+            content = await _post_llm(payload, timeout)
+            write_llm_disk_cache(key, content)
+        llm_response_cache[key] = content
+        future.set_result(content)
+        return content
+    except BaseException as e:
+        if isinstance(e, Exception):
+            future.set_exception(e)
+        else:
+            future.cancel()
+        raise
+    finally:
+        del _llm_inflight[key]
+
+
+async def _post_llm(payload: Dict[str, Any], timeout: float) -> str:
+    """发送一次chat/completions请求（受LLM_MAX_CONCURRENCY限制），返回助手的回复内容"""
+    async with llm_semaphore:
+        response = await http_client.post(
+            f"{LLM_API_URL}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {LLM_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            json=payload,
+            timeout=timeout
+        )
+    response.raise_for_status()
+    return response.json()["choices"][0]["message"]["content"]
 
 
 # ============================================================================
@@ -214,6 +491,165 @@ class TaskStatusResponse(BaseModel):
     error: Optional[str] = None                  # 错误信息，正常情况为None
 
 
+@dataclass
+class TaskState:
+    """
+    单个任务的状态（存放在tasks_store中）
+    
+    【为什么不用普通字典？】
+    字段固定，用dataclass更清晰；另外带一个asyncio.Event，
+    任务结束（完成或失败）时置位，查询接口可以等待它（长轮询），
+    前端不必频繁地反复查询。
+    """
+    status: TaskStatus = TaskStatus.PENDING      # 任务当前状态
+    progress: int = 0                            # 进度百分比（0-100）
+    result: Optional[Dict[str, Any]] = None      # 分析结果，完成前为None
+    error: Optional[str] = None                  # 错误信息，正常情况为None
+    domain: Optional[str] = None                 # 分析领域（仅基因编辑分析任务使用）
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)  # 任务结束时置位
+    
+    def complete(self, result: Optional[Dict[str, Any]]):
+        """标记任务完成"""
+        self.status = TaskStatus.COMPLETED
+        self.progress = 100
+        self.result = result
+        self.done.set()
+    
+    def fail(self, error: str):
+        """标记任务失败"""
+        self.status = TaskStatus.FAILED
+        self.error = error
+        self.done.set()
+    
+    def to_response(self) -> Dict[str, Any]:
+        """转换为TaskStatusResponse对应的字典"""
+        return {
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+        }
+    
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "TaskState":
+        """由Redis中保存的字段还原任务状态（已结束的任务done直接置位）"""
+        state = cls(
+            status=TaskStatus(record.get("status", TaskStatus.PENDING)),
+            progress=record.get("progress", 0),
+            result=record.get("result"),
+            error=record.get("error"),
+            domain=record.get("domain"),
+        )
+        if state.status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+            state.done.set()
+        return state
+
+
+def dumps_task_field(value: Any) -> bytes:
+    """把任务状态的一个字段编码为JSON（写入Redis哈希）"""
+    if orjson is not None:
+        return orjson.dumps(value, default=jsonable_encoder, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(jsonable_encoder(value), ensure_ascii=False).encode()
+
+
+class TaskStore:
+    """
+    任务状态存储
+    
+    本进程创建的任务保存在进程内的TTLCache中（TaskState带asyncio.Event，支持长轮询）；
+    设置了REDIS_URL时，每次状态变化还会把变化的字段写入Redis哈希 task:{任务ID}，
+    进度更新只写progress一个字段，不必每次重写整个结果。
+    本地找不到的任务（由其他worker执行）从Redis读取。
+    
+    Redis出错时只打印警告，本地状态照常更新，不影响任务执行。
+    """
+    
+    def __init__(self, redis_url: str, maxsize: int, ttl: int):
+        if TTLCache is not None:
+            self._local: Dict[str, TaskState] = TTLCache(maxsize=maxsize, ttl=ttl)
+        else:
+            self._local = {}
+        self._ttl = ttl
+        self._redis = aioredis.from_url(redis_url) if redis_url and aioredis is not None else None
+    
+    def local(self, task_id: str) -> Optional[TaskState]:
+        """获取本进程中的任务状态（不查询Redis）"""
+        return self._local.get(task_id)
+    
+    async def get(self, task_id: str) -> Optional[TaskState]:
+        """获取任务状态，本地没有时从Redis读取；任务不存在时返回None"""
+        state = self._local.get(task_id)
+        if state is not None or self._redis is None:
+            return state
+        try:
+            record = await self._redis.hgetall(f"task:{task_id}")
+        except Exception as e:
+            logger.warning("读取Redis任务状态失败: %s", e)
+            return None
+        if not record:
+            return None
+        return TaskState.from_record({key.decode(): json.loads(value) for key, value in record.items()})
+    
+    async def set(self, task_id: str, state: TaskState):
+        """保存新任务"""
+        self._local[task_id] = state
+        await self._save(task_id, {
+            "status": state.status,
+            "progress": state.progress,
+            "result": state.result,
+            "error": state.error,
+            "domain": state.domain,
+        })
+    
+    async def update(self, task_id: str, **fields):
+        """更新任务的部分字段，如 update(task_id, progress=50)"""
+        state = self._local.get(task_id)
+        if state is not None:
+            for name, value in fields.items():
+                setattr(state, name, value)
+        await self._save(task_id, fields)
+    
+    async def complete(self, task_id: str, result: Optional[Dict[str, Any]]):
+        """标记任务完成"""
+        state = self._local.get(task_id)
+        if state is not None:
+            state.complete(result)
+        await self._save(task_id, {"status": TaskStatus.COMPLETED, "progress": 100, "result": result})
+    
+    async def fail(self, task_id: str, error: str):
+        """标记任务失败"""
+        state = self._local.get(task_id)
+        if state is not None:
+            state.fail(error)
+        await self._save(task_id, {"status": TaskStatus.FAILED, "error": error})
+    
+    async def delete(self, task_id: str):
+        """删除任务（提交失败时撤销）"""
+        self._local.pop(task_id, None)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.delete(f"task:{task_id}")
+        except Exception as e:
+            logger.warning("删除Redis任务状态失败: %s", e)
+    
+    async def _save(self, task_id: str, fields: Dict[str, Any]):
+        """把变化的字段写入Redis哈希，并刷新过期时间"""
+        if self._redis is None:
+            return
+        key = f"task:{task_id}"
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping={name: dumps_task_field(value) for name, value in fields.items()})
+                pipe.expire(key, self._ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("写入Redis任务状态失败: %s", e)
+
+
+tasks_store = TaskStore(REDIS_URL, TASKS_STORE_MAXSIZE, TASKS_STORE_TTL)
+
+
 # ============================================================================
 # Agent核心数据结构
 # ============================================================================
@@ -249,6 +685,48 @@ class ToolResult:
     data: Any = None   # 工具返回的数据（如DataFrame），默认为None
 
 
+class LazySeriesDict(Mapping):
+    """
+    按需转换成字典的pandas Series视图
+    
+    【为什么需要它？】
+    数据概览、质量检查等工具会返回每一列的统计值。宽表有几千列时，
+    立即to_dict()要创建几千个Python对象，而Agent通常只看文本输出。
+    这里先保存Series，第一次按键取值或遍历时才转换成字典。
+    
+    用法和普通的只读字典一样；需要真正的dict（如json.dumps）时用dict(view)。
+    
+    参数:
+        series: 索引作为键、值作为值的Series
+        convert: 可选，对每个值做转换的函数，None表示使用to_dict()的结果
+    """
+    def __init__(self, series: pd.Series, convert: Optional[Callable[[Any], Any]] = None):
+        self._series = series
+        self._convert = convert
+        self._dict = None
+    
+    def _materialize(self) -> dict:
+        if self._dict is None:
+            if self._convert is None:
+                self._dict = self._series.to_dict()
+            else:
+                self._dict = {k: self._convert(v) for k, v in self._series.items()}
+        return self._dict
+    
+    def __getitem__(self, key):
+        return self._materialize()[key]
+    
+    def __iter__(self):
+        return iter(self._materialize())
+    
+    def __len__(self):
+        # 长度直接取Series的长度，不需要转换
+        return len(self._series)
+    
+    def __repr__(self):
+        return repr(self._materialize())
+
+
 @dataclass
 class AgentThought:
     """
@@ -262,11 +740,22 @@ class AgentThought:
     - action: 行动部分（Acting）- Agent决定做什么
     - action_input: 行动的参数
     - observation: 观察结果 - 执行后看到了什么
+    
+    【观察结果的截断】
+    完整的观察结果已经作为消息发给了LLM，记录里只需要用于展示的部分，
+    所以创建时就截断到MAX_OBSERVATION_CHARS个字符，不在内存中保留完整文本。
     """
     thought: str                    # Agent的思考内容，如"数据已加载，接下来检查数据质量"
     action: str                     # 要执行的工具名称，如"data_quality_check"
     action_input: Dict[str, Any]    # 工具的输入参数，如{"columns": ["age", "salary"]}
-    observation: str = ""           # 工具执行后的观察结果
+    observation: str = ""           # 工具执行后的观察结果（已截断）
+    
+    # 观察结果最多保留的字符数
+    MAX_OBSERVATION_CHARS: ClassVar[int] = 500
+    
+    def __post_init__(self):
+        if len(self.observation) > self.MAX_OBSERVATION_CHARS:
+            self.observation = self.observation[:self.MAX_OBSERVATION_CHARS]
 
 
 @dataclass
@@ -410,6 +899,175 @@ class Tool(ABC):
         }
 
 
+class SyncTool(Tool):
+    """
+    计算全部是同步代码的工具（只读取DataFrame做pandas/NumPy计算）
+    
+    子类实现普通函数compute，execute直接调用它。
+    Agent并行执行多个这类工具时，把compute放到线程池中运行，
+    不必为每个工具单独创建事件循环。
+    """
+    
+    @abstractmethod
+    def compute(self, **kwargs) -> ToolResult:
+        """执行工具的同步计算，参数与execute相同"""
+        pass
+    
+    async def execute(self, **kwargs) -> ToolResult:
+        return self.compute(**kwargs)
+
+
+class _DerivedArrayCache(dict):
+    """
+    挂在df.attrs上的缓存（数值列名、派生数组）
+    
+    pandas派生新DataFrame时会深拷贝attrs，这里让拷贝结果是一个空缓存：
+    既不会复制大数组，派生出的DataFrame也不会用到不属于它的数据。
+    """
+    def __deepcopy__(self, memo):
+        return _DerivedArrayCache()
+
+
+def numeric_columns(df: pd.DataFrame) -> pd.Index:
+    """
+    获取DataFrame的数值列名
+    
+    【为什么要缓存？】
+    多个工具都要先找出数值列，select_dtypes每次都要遍历所有列并构建新的DataFrame。
+    这里把结果连同当时的列索引对象一起存到df.attrs中，后续工具直接复用。
+    
+    缓存放在_DerivedArrayCache中：pandas派生新DataFrame（如取一列、取子集）时
+    深拷贝attrs得到的是空缓存，不会每次都复制两个列索引对象；
+    所以只有同一个DataFrame、列没有增删时才会命中缓存。
+    注意：原地修改某列的数据类型不会改变列索引，需要先清除df.attrs["numeric_cols"]。
+    """
+    cached = df.attrs.get("numeric_cols")
+    if cached and cached["columns"] is df.columns:
+        return cached["cols"]
+    cols = df.select_dtypes(include=[np.number]).columns
+    df.attrs["numeric_cols"] = _DerivedArrayCache(columns=df.columns, cols=cols)
+    return cols
+
+
+def numeric_array(df: pd.DataFrame, columns: Optional[List[str]] = None, order: str = "C") -> np.ndarray:
+    """
+    获取数值列的float64二维数组
+    
+    【为什么要区分存放顺序？】
+    order="C"（按行连续）：按行广播比较（如异常值边界判断）、矩阵运算时内存访问是连续的。
+    order="F"（按列连续，即"结构数组"SoA布局）：每一列是一段连续内存，
+    逐列求均值、分位数等统计时缓存命中率高。pandas本身就按列存放同类型数据，
+    全是float64的DataFrame转换为F顺序时通常不需要复制。
+    两种顺序各转换一次并缓存到df.attrs，异常值检测、相关性分析、描述统计等工具共用。
+    
+    参数:
+        df: pandas DataFrame
+        columns: 只取其中部分数值列（按给定顺序），None表示全部数值列
+        order: "C"按行连续，"F"按列连续
+        
+    返回:
+        形状为 (行数, 列数) 的数组，缺失值为NaN
+    """
+    all_cols = numeric_columns(df)
+    cache = df.attrs.get("_num_c_arr")
+    if not isinstance(cache, _DerivedArrayCache):
+        cache = df.attrs["_num_c_arr"] = _DerivedArrayCache()
+    
+    key = (tuple(all_cols), order)
+    arr = cache.get(key)
+    if arr is None:
+        arr = np.asarray(df[all_cols].to_numpy(dtype=np.float64, na_value=np.nan), order=order)
+        cache[key] = arr
+    
+    if columns is None or list(columns) == list(all_cols):
+        return arr
+    if not all_cols.is_unique:
+        return np.asarray(df[columns].to_numpy(dtype=np.float64, na_value=np.nan), order=order)
+    return np.asarray(arr[:, all_cols.get_indexer(columns)], order=order)
+
+
+# 按列并行统计时使用的最大线程数，设为1则逐列串行计算
+COLUMN_WORKERS = int(os.getenv("COLUMN_WORKERS", os.cpu_count() or 1))
+
+
+def map_columns(func: Callable[[str], Any], columns) -> List[Any]:
+    """
+    对每一列调用func，按列的顺序返回结果列表
+    
+    各列的统计互不相关，列数较多时用线程池并行执行；
+    value_counts、nunique等在NumPy/pandas底层计算时会释放GIL，宽表上能用满多个核。
+    """
+    columns = list(columns)
+    workers = min(COLUMN_WORKERS, len(columns))
+    if workers <= 1:
+        return [func(col) for col in columns]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, columns))
+
+def describe_array(arr: np.ndarray, columns: pd.Index) -> pd.DataFrame:
+    """
+    按列计算数值数组的描述性统计，结果格式与DataFrame.describe()相同
+    
+    参数:
+        arr: 形状为 (行数, 列数) 的float64数组，缺失值为NaN
+        columns: 各列的列名
+        
+    返回:
+        行索引为count、mean、std、min、25%、50%、75%、max的DataFrame
+    """
+    if HAVE_NUMBA and KERNEL_THREADS > 1:
+        # numba内核各列并行，每列部分排序一次，所有统计量在一次遍历中算完
+        # （只有一个线程时NumPy的实现更快）
+        with KERNEL_LOCK:
+            stats = column_stats(arr)
+    else:
+        # 全空列、只有一个值的列会触发"Mean of empty slice"等警告，结果按pandas惯例为NaN
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            count = (~np.isnan(arr)).sum(axis=0)
+            mean = np.nanmean(arr, axis=0)
+            std = np.nanstd(arr, axis=0, ddof=1)
+            q = np.nanpercentile(arr, [0, 25, 50, 75, 100], axis=0)
+        stats = np.vstack([count, mean, std, q])
+    
+    return pd.DataFrame(
+        stats,
+        index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"],
+        columns=columns,
+    )
+
+def summarize_columns(arr: np.ndarray) -> np.ndarray:
+    """
+    按列计算count、mean、std、min、max及最小值、最大值第一次出现的行号（忽略NaN）
+    
+    参数:
+        arr: 形状为 (行数, 列数) 的float64数组，缺失值为NaN
+        
+    返回:
+        形状为 (7, 列数) 的数组，行顺序见agent_kernels.SUMMARY_NAMES；
+        没有有效值的列除count外为NaN
+    """
+    if HAVE_NUMBA:
+        # numba内核每列只遍历两次，所有统计量一起算出
+        with KERNEL_LOCK:
+            return column_summary(arr)
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        count = (~np.isnan(arr)).sum(axis=0)
+        mean = np.nanmean(arr, axis=0)
+        std = np.nanstd(arr, axis=0, ddof=1)
+        lo = np.nanmin(arr, axis=0)
+        hi = np.nanmax(arr, axis=0)
+    # nanargmin/nanargmax遇到全空列会报错，只对有有效值的列计算
+    lo_row = np.full(arr.shape[1], np.nan)
+    hi_row = np.full(arr.shape[1], np.nan)
+    valid = count > 0
+    if valid.any():
+        lo_row[valid] = np.nanargmin(arr[:, valid], axis=0)
+        hi_row[valid] = np.nanargmax(arr[:, valid], axis=0)
+    return np.vstack([count, mean, std, lo, hi, lo_row, hi_row])
+
 # ============================================================================
 # 工具1：加载数据工具
 # ============================================================================
@@ -455,18 +1113,41 @@ class LoadDataTool(Tool):
             "file_name": {
                 "type": "string",
                 "description": "文件名（用于判断格式）"
+            },
+            "chunksize": {
+                "type": "integer",
+                "description": "可选，CSV/TXT按多少行分块读取；不填时大文件自动分块"
+            },
+            "downcast": {
+                "type": "boolean",
+                "description": "可选，是否压缩数据类型（数值列降为更窄的类型，低基数文本列转为分类类型），大数据集可减少内存、加快计算",
+                "default": False
             }
         },
         "required": ["file_path", "file_name"]  # 必填参数列表
     }
     
-    async def execute(self, file_path: str, file_name: str, **kwargs) -> ToolResult:
+    # 大文件分块读取的阈值和默认块大小
+    # 超过阈值的CSV/TXT文件按块读取，避免一次性解析整个文件时内存峰值过高
+    LARGE_FILE_BYTES = 500 * 1024 * 1024  # 500MB
+    DEFAULT_CHUNK_ROWS = 200_000
+    
+    # 列数超过阈值时，加载信息只列出首尾部分列名，数据类型只给出各类型的列数
+    # 避免几千列的宽表生成很长的字符串
+    MAX_INFO_COLUMNS = 50
+    INFO_HEAD_COLUMNS = 20
+    INFO_TAIL_COLUMNS = 10
+    
+    async def execute(self, file_path: str, file_name: str, chunksize: int = None,
+                      downcast: bool = False, **kwargs) -> ToolResult:
         """
         执行数据加载
         
         参数:
             file_path: 文件的完整路径
             file_name: 原始文件名
+            chunksize: CSV/TXT分块读取的行数，None表示按文件大小自动决定
+            downcast: 是否在加载后压缩数据类型
             **kwargs: 其他参数（本工具不使用，但为了接口统一需要接收）
             
         返回:
@@ -479,32 +1160,24 @@ class LoadDataTool(Tool):
             # os.path.splitext("data.csv") 返回 ("data", ".csv")
             file_ext = os.path.splitext(file_name)[1].lower()
             
-            # 根据文件扩展名选择不同的读取方法
-            if file_ext == '.csv':
-                # pandas的read_csv函数读取CSV文件
-                df = pd.read_csv(file_path)
-            elif file_ext in ['.xlsx', '.xls']:
-                # pandas的read_excel函数读取Excel文件
-                # 需要安装openpyxl库
-                df = pd.read_excel(file_path)
-            elif file_ext == '.json':
-                # pandas的read_json函数读取JSON文件
-                df = pd.read_json(file_path)
-            elif file_ext == '.txt':
-                # 尝试以制表符分隔的格式读取txt文件
-                df = pd.read_csv(file_path, sep='\t')
-            else:
+            # 根据文件扩展名从LOADERS表中查出对应的读取方法
+            loader = self.LOADERS.get(file_ext)
+            if loader is None:
                 # 不支持的文件格式，返回失败
                 return ToolResult(False, f"不支持的文件格式: {file_ext}")
+            df = loader(self, file_path, chunksize)
+            
+            if downcast:
+                df = self._downcast(df)
+            
+            # 预先识别数值列并缓存到df.attrs，后续统计、相关性、异常值工具直接复用
+            numeric_columns(df)
             
             # 构建成功信息
             # len(df): DataFrame的行数
             # len(df.columns): DataFrame的列数
-            # df.columns.tolist(): 列名列表
-            # df.dtypes: 每列的数据类型
             info = f"成功加载数据：{len(df)} 行 x {len(df.columns)} 列\n"
-            info += f"列名: {', '.join(df.columns.tolist())}\n"
-            info += f"数据类型:\n{df.dtypes.to_string()}"
+            info += self._columns_info(df)
             
             # 返回成功结果，data字段包含DataFrame供后续工具使用
             return ToolResult(True, info, df)
@@ -513,13 +1186,118 @@ class LoadDataTool(Tool):
             # 捕获所有异常，返回失败结果
             # str(e): 将异常转换为字符串，获取错误信息
             return ToolResult(False, f"加载数据失败: {str(e)}")
+    
+    def _columns_info(self, df: pd.DataFrame) -> str:
+        """
+        生成列名和数据类型的说明文本
+        
+        列数不超过MAX_INFO_COLUMNS时列出全部列名和每列的数据类型；
+        否则只列出前INFO_HEAD_COLUMNS个和后INFO_TAIL_COLUMNS个列名，
+        数据类型改为统计每种类型的列数。
+        """
+        if len(df.columns) <= self.MAX_INFO_COLUMNS:
+            # df.columns.tolist(): 列名列表
+            # df.dtypes: 每列的数据类型
+            return (f"列名: {', '.join(df.columns.tolist())}\n"
+                    f"数据类型:\n{df.dtypes.to_string()}")
+        
+        head = df.columns[:self.INFO_HEAD_COLUMNS].tolist()
+        tail = df.columns[-self.INFO_TAIL_COLUMNS:].tolist()
+        skipped = len(df.columns) - len(head) - len(tail)
+        # value_counts(): 每种数据类型各有多少列
+        dtype_counts = df.dtypes.value_counts()
+        return (f"列名: {', '.join(head)}, ...（省略 {skipped} 列）..., {', '.join(tail)}\n"
+                f"数据类型（列数）:\n" + "\n".join(f"{dtype}: {count}" for dtype, count in dtype_counts.items()))
+    
+    def _read_csv(self, file_path: str, chunksize: int = None, **kwargs) -> pd.DataFrame:
+        """
+        读取CSV/制表符分隔文件
+        
+        优先使用pyarrow引擎（多线程解析，大文件快很多），
+        没有安装pyarrow或文件格式pyarrow无法解析时，退回pandas默认引擎。
+        指定chunksize或文件超过LARGE_FILE_BYTES时按块读取再合并，
+        解析过程中的内存占用只和块大小有关（pyarrow引擎不支持分块）。
+        """
+        if chunksize is None and os.path.getsize(file_path) > self.LARGE_FILE_BYTES:
+            chunksize = self.DEFAULT_CHUNK_ROWS
+        if chunksize:
+            chunks = pd.read_csv(file_path, chunksize=chunksize, **kwargs)
+            return pd.concat(chunks, ignore_index=True)
+        
+        try:
+            return pd.read_csv(file_path, engine="pyarrow", **kwargs)
+        except (ImportError, ValueError):
+            return pd.read_csv(file_path, **kwargs)
+    
+    @staticmethod
+    def _downcast(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        压缩DataFrame的数据类型
+        
+        - 整数列降为能容纳数据的最小整数类型（如int64 -> int8），不损失精度
+        - 浮点列降为float32（约7位有效数字）
+        - 唯一值少于行数一半的文本列转为category，分组、计数更快
+        """
+        for col in df.columns:
+            series = df[col]
+            if pd.api.types.is_integer_dtype(series):
+                df[col] = pd.to_numeric(series, downcast='integer')
+            elif pd.api.types.is_float_dtype(series):
+                df[col] = pd.to_numeric(series, downcast='float')
+            elif series.dtype == object or pd.api.types.is_string_dtype(series):
+                if len(df) and series.nunique() < len(df) * 0.5:
+                    df[col] = series.astype('category')
+        return df
+    
+    @staticmethod
+    def _read_excel(file_path: str) -> pd.DataFrame:
+        """
+        读取Excel文件
+        
+        优先使用calamine引擎（原生代码解析，比openpyxl快一个数量级、占用内存更少），
+        没有安装python-calamine时退回pandas默认引擎（openpyxl）
+        """
+        try:
+            return pd.read_excel(file_path, engine="calamine")
+        except ImportError:
+            return pd.read_excel(file_path)
+    
+    # ------------------------------------------------------------------
+    # 各文件格式的读取方法，参数统一为 (file_path, chunksize)
+    # ------------------------------------------------------------------
+    
+    def _load_csv(self, file_path: str, chunksize: int = None) -> pd.DataFrame:
+        # pandas的read_csv函数读取CSV文件（优先pyarrow引擎）
+        return self._read_csv(file_path, chunksize)
+    
+    def _load_txt(self, file_path: str, chunksize: int = None) -> pd.DataFrame:
+        # 尝试以制表符分隔的格式读取txt文件
+        return self._read_csv(file_path, chunksize, sep='\t')
+    
+    def _load_excel(self, file_path: str, chunksize: int = None) -> pd.DataFrame:
+        # pandas的read_excel函数读取Excel文件
+        # 优先使用calamine引擎（Rust实现），需要安装python-calamine库
+        return self._read_excel(file_path)
+    
+    def _load_json(self, file_path: str, chunksize: int = None) -> pd.DataFrame:
+        # pandas的read_json函数读取JSON文件
+        return pd.read_json(file_path)
+    
+    # 扩展名 -> 读取方法的分派表，支持新格式时只需添加一个读取方法并在这里登记
+    LOADERS = {
+        '.csv': _load_csv,
+        '.xlsx': _load_excel,
+        '.xls': _load_excel,
+        '.json': _load_json,
+        '.txt': _load_txt,
+    }
 
 
 # ============================================================================
 # 工具2：数据概览工具
 # ============================================================================
 
-class DataOverviewTool(Tool):
+class DataOverviewTool(SyncTool):
     """
     数据概览工具
     
@@ -550,7 +1328,7 @@ class DataOverviewTool(Tool):
         "required": []
     }
     
-    async def execute(self, df: pd.DataFrame = None, **kwargs) -> ToolResult:
+    def compute(self, df: pd.DataFrame = None, **kwargs) -> ToolResult:
         """
         执行数据概览分析
         
@@ -566,20 +1344,24 @@ class DataOverviewTool(Tool):
             return ToolResult(False, "请先使用load_data加载数据")
         
         try:
+            # 缺失值统计只扫描一次全表，后面的数量、百分比、列数都复用这个结果
+            # df.isnull(): 返回布尔DataFrame，True表示缺失
+            # .sum(): 对每列求和，得到缺失值数量
+            null_counts = df.isnull().sum()
+            
             # 构建概览信息字典
             overview = {
                 # 数据形状
                 "shape": {"rows": len(df), "columns": len(df.columns)},
                 # 所有列名
                 "columns": df.columns.tolist(),
+                # 以下按列的统计在第一次取用时才转换为字典（见LazySeriesDict）
                 # 每列的数据类型（转为字符串以便JSON序列化）
-                "dtypes": df.dtypes.astype(str).to_dict(),
+                "dtypes": LazySeriesDict(df.dtypes, str),
                 # 每列的缺失值数量
-                # df.isnull(): 返回布尔DataFrame，True表示缺失
-                # .sum(): 对每列求和，得到缺失值数量
-                "missing_values": df.isnull().sum().to_dict(),
+                "missing_values": LazySeriesDict(null_counts),
                 # 每列的缺失值百分比
-                "missing_percentage": (df.isnull().sum() / len(df) * 100).round(2).to_dict(),
+                "missing_percentage": LazySeriesDict((null_counts / len(df) * 100).round(2)),
                 # 内存占用（转换为MB）
                 # deep=True: 计算对象类型的实际内存占用
                 "memory_usage": f"{df.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB"
@@ -589,7 +1371,7 @@ class DataOverviewTool(Tool):
             output = f"""数据概览:
 - 形状: {overview['shape']['rows']} 行 x {overview['shape']['columns']} 列
 - 内存占用: {overview['memory_usage']}
-- 缺失值: {sum(1 for v in overview['missing_values'].values() if v > 0)} 列存在缺失值
+- 缺失值: {int((null_counts > 0).sum())} 列存在缺失值
 """
             return ToolResult(True, output, overview)
         except Exception as e:
@@ -600,7 +1382,7 @@ class DataOverviewTool(Tool):
 # 工具3：数值列统计工具
 # ============================================================================
 
-class DescribeNumericTool(Tool):
+class DescribeNumericTool(SyncTool):
     """
     数值列描述性统计工具
     
@@ -636,7 +1418,7 @@ class DescribeNumericTool(Tool):
         "required": []  # 没有必填参数
     }
     
-    async def execute(self, df: pd.DataFrame = None, columns: List[str] = None, **kwargs) -> ToolResult:
+    def compute(self, df: pd.DataFrame = None, columns: List[str] = None, **kwargs) -> ToolResult:
         """
         执行数值列统计分析
         
@@ -648,9 +1430,9 @@ class DescribeNumericTool(Tool):
             return ToolResult(False, "请先使用load_data加载数据")
         
         try:
-            # select_dtypes: 选择特定数据类型的列
-            # include=[np.number]: 选择所有数值类型（int、float等）
-            numeric_df = df.select_dtypes(include=[np.number])
+            # 选择所有数值类型（int、float等）的列
+            # numeric_columns会缓存识别结果，多个工具共用
+            numeric_df = df[numeric_columns(df)]
             
             # 如果指定了列名，只保留这些列
             if columns:
@@ -661,15 +1443,18 @@ class DescribeNumericTool(Tool):
             if numeric_df.empty:
                 return ToolResult(False, "没有找到数值列")
             
-            # describe(): pandas的描述性统计函数
-            # 自动计算count、mean、std、min、25%、50%、75%、max
+            # 描述性统计：count、mean、std、min、25%、50%、75%、max（与describe()一致）
+            # 直接在NumPy数组上按列计算一次，字典和文本输出共用同一份结果
+            # 逐列统计，使用按列连续存放的数组
+            describe_df = describe_array(numeric_array(df, numeric_df.columns, order="F"), numeric_df.columns)
+            
             # round(4): 保留4位小数
             # to_dict(): 转换为字典格式
-            stats = numeric_df.describe().round(4).to_dict()
+            stats = describe_df.round(4).to_dict()
             
             # 构建输出文本
             output = f"数值列统计分析 ({len(numeric_df.columns)} 列):\n"
-            output += numeric_df.describe().round(2).to_string()
+            output += describe_df.round(2).to_string()
             
             return ToolResult(True, output, stats)
         except Exception as e:
@@ -680,7 +1465,7 @@ class DescribeNumericTool(Tool):
 # 工具4：分类列统计工具
 # ============================================================================
 
-class DescribeCategoricalTool(Tool):
+class DescribeCategoricalTool(SyncTool):
     """
     分类列统计工具
     
@@ -722,7 +1507,7 @@ class DescribeCategoricalTool(Tool):
         "required": []
     }
     
-    async def execute(self, df: pd.DataFrame = None, columns: List[str] = None, top_n: int = 10, **kwargs) -> ToolResult:
+    def compute(self, df: pd.DataFrame = None, columns: List[str] = None, top_n: int = 10, **kwargs) -> ToolResult:
         """
         执行分类列统计分析
         
@@ -749,19 +1534,26 @@ class DescribeCategoricalTool(Tool):
             stats = {}
             output_parts = [f"分类列统计分析 ({len(cat_df.columns)} 列):"]
             
+            # 一次性统计所有分类列的缺失值数量
+            null_counts = cat_df.isnull().sum()
+            
+            # value_counts(sort=False): 统计每个值出现的次数（不含缺失值），不排序
+            # 每列只统计这一次，唯一值数量和Top值都从这里得到；各列互不相关，用线程池并行
+            column_counts = map_columns(lambda col: df[col].value_counts(sort=False), cat_df.columns)
+            
             # 遍历每个分类列
-            for col in cat_df.columns:
-                # value_counts(): 统计每个值出现的次数，按频率降序排列
-                # head(top_n): 只取前N个
-                value_counts = df[col].value_counts().head(top_n)
+            for col, all_counts in zip(cat_df.columns, column_counts):
+                # nlargest(top_n): 只挑出频率最高的前N个，不需要把所有值完整排序
+                # （唯一值很多的列上比先排序再取head快得多；次数相同时按首次出现的顺序）
+                value_counts = all_counts.nlargest(top_n)
                 
                 stats[col] = {
-                    # nunique(): 唯一值数量
-                    "unique_count": df[col].nunique(),
+                    # 唯一值数量（category类型会列出未出现的类别，计数为0，需要排除）
+                    "unique_count": int((all_counts > 0).sum()),
                     # 频率最高的值及其出现次数
                     "top_values": value_counts.to_dict(),
                     # 缺失值数量
-                    "null_count": df[col].isnull().sum()
+                    "null_count": null_counts[col]
                 }
                 
                 # 构建输出文本
@@ -777,7 +1569,7 @@ class DescribeCategoricalTool(Tool):
 # 工具5：相关性分析工具
 # ============================================================================
 
-class CorrelationAnalysisTool(Tool):
+class CorrelationAnalysisTool(SyncTool):
     """
     相关性分析工具
     
@@ -830,7 +1622,10 @@ class CorrelationAnalysisTool(Tool):
         "required": []
     }
     
-    async def execute(self, df: pd.DataFrame = None, method: str = "pearson", threshold: float = 0.5, **kwargs) -> ToolResult:
+    # 变量对数量达到此值时才用numexpr筛选（小矩阵上numexpr的启动开销比计算本身还大）
+    NUMEXPR_MIN_PAIRS = 50_000
+    
+    def compute(self, df: pd.DataFrame = None, method: str = "pearson", threshold: float = 0.5, **kwargs) -> ToolResult:
         """
         执行相关性分析
         
@@ -844,29 +1639,52 @@ class CorrelationAnalysisTool(Tool):
         
         try:
             # 只选择数值列
-            numeric_df = df.select_dtypes(include=[np.number])
+            numeric_df = df[numeric_columns(df)]
             
             # 至少需要2列才能计算相关性
             if len(numeric_df.columns) < 2:
                 return ToolResult(False, "需要至少2个数值列才能进行相关性分析")
             
-            # corr(): 计算相关系数矩阵
+            # 计算相关系数矩阵
             # 返回一个DataFrame，行和列都是变量名，值是相关系数
-            corr_matrix = numeric_df.corr(method=method)
+            corr_matrix = None
+            if method == "pearson":
+                # 没有缺失值时，把数据转成连续的二维数组，用np.corrcoef一次矩阵运算算完
+                # （pandas的corr需要逐对列处理缺失值，要慢得多）
+                X = numeric_array(df)
+                if not np.isnan(X).any():
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        C = np.corrcoef(X, rowvar=False)
+                    corr_matrix = pd.DataFrame(C, index=numeric_df.columns, columns=numeric_df.columns)
+                elif HAVE_NUMBA:
+                    # 有缺失值时用numba内核按列对并行计算（成对删除缺失值，结果与pandas相同）
+                    with KERNEL_LOCK:
+                        C = nan_pearson(numeric_array(df, order="F"))
+                    corr_matrix = pd.DataFrame(C, index=numeric_df.columns, columns=numeric_df.columns)
+            if corr_matrix is None:
+                # corr(): pandas计算相关系数矩阵，支持缺失值和spearman/kendall方法
+                corr_matrix = numeric_df.corr(method=method)
             
             # 找出高相关性的变量对
-            # 遍历矩阵的上三角部分（避免重复）
-            high_corr = []
-            for i in range(len(corr_matrix.columns)):
-                for j in range(i + 1, len(corr_matrix.columns)):  # j > i，只看上三角
-                    corr_val = corr_matrix.iloc[i, j]
-                    # 只保留相关系数绝对值大于阈值的
-                    if abs(corr_val) >= threshold:
-                        high_corr.append({
-                            "var1": corr_matrix.columns[i],
-                            "var2": corr_matrix.columns[j],
-                            "correlation": round(corr_val, 4)
-                        })
+            # 取矩阵的上三角部分（k=1不含对角线，避免重复），一次性筛选
+            C = corr_matrix.to_numpy()
+            rows, cols = np.triu_indices_from(C, k=1)
+            values = C[rows, cols]
+            # 只保留相关系数绝对值大于阈值的
+            if ne is not None and values.size >= self.NUMEXPR_MIN_PAIRS:
+                # 变量对很多时，numexpr把取绝对值和比较融合成一次多线程遍历
+                keep = ne.evaluate("abs(values) >= threshold",
+                                   local_dict={"values": values, "threshold": float(threshold)})
+            else:
+                keep = np.abs(values) >= threshold
+            high_corr = [
+                {
+                    "var1": corr_matrix.columns[i],
+                    "var2": corr_matrix.columns[j],
+                    "correlation": round(corr_val, 4)
+                }
+                for i, j, corr_val in zip(rows[keep], cols[keep], values[keep])
+            ]
             
             # 按相关系数绝对值降序排序
             high_corr.sort(key=lambda x: abs(x["correlation"]), reverse=True)
@@ -892,7 +1710,7 @@ class CorrelationAnalysisTool(Tool):
 # 工具6：异常值检测工具
 # ============================================================================
 
-class OutlierDetectionTool(Tool):
+class OutlierDetectionTool(SyncTool):
     """
     异常值检测工具
     
@@ -946,7 +1764,7 @@ class OutlierDetectionTool(Tool):
         "required": []
     }
     
-    async def execute(self, df: pd.DataFrame = None, columns: List[str] = None, iqr_multiplier: float = 1.5, **kwargs) -> ToolResult:
+    def compute(self, df: pd.DataFrame = None, columns: List[str] = None, iqr_multiplier: float = 1.5, **kwargs) -> ToolResult:
         """
         执行异常值检测
         
@@ -960,7 +1778,7 @@ class OutlierDetectionTool(Tool):
         
         try:
             # 只选择数值列
-            numeric_df = df.select_dtypes(include=[np.number])
+            numeric_df = df[numeric_columns(df)]
             if columns:
                 numeric_df = numeric_df[[c for c in columns if c in numeric_df.columns]]
             
@@ -970,24 +1788,48 @@ class OutlierDetectionTool(Tool):
             outliers_info = {}
             output_parts = ["异常值检测结果:"]
             
-            # 遍历每个数值列
-            for col in numeric_df.columns:
-                # quantile(0.25): 计算第一四分位数（25%分位数）
-                Q1 = df[col].quantile(0.25)
-                # quantile(0.75): 计算第三四分位数（75%分位数）
-                Q3 = df[col].quantile(0.75)
-                # IQR: 四分位距
-                IQR = Q3 - Q1
-                
-                # 计算异常值的边界
-                lower_bound = Q1 - iqr_multiplier * IQR  # 下边界
-                upper_bound = Q3 + iqr_multiplier * IQR  # 上边界
-                
-                # 创建布尔掩码，标记异常值
-                # | 是"或"运算符
-                outlier_mask = (df[col] < lower_bound) | (df[col] > upper_bound)
-                # sum(): True被当作1，False被当作0，所以sum()就是异常值数量
-                outlier_count = outlier_mask.sum()
+            # 一次性计算所有列的第一、第三四分位数（25%和75%分位数）
+            if HAVE_NUMBA and KERNEL_THREADS > 1:
+                # numba内核按列并行求分位数，结果与quantile()相同
+                with KERNEL_LOCK:
+                    stats = column_stats(numeric_array(df, numeric_df.columns, order="F"))
+                Q1 = stats[4]
+                Q3 = stats[6]
+            else:
+                q = numeric_df.quantile([0.25, 0.75])
+                Q1 = q.iloc[0].to_numpy()
+                Q3 = q.iloc[1].to_numpy()
+            # IQR: 四分位距
+            IQR = Q3 - Q1
+            
+            # 计算每列异常值的边界
+            lower_bounds = Q1 - iqr_multiplier * IQR  # 下边界
+            upper_bounds = Q3 + iqr_multiplier * IQR  # 上边界
+            
+            # 在二维数组上一次性标记所有列的异常值（按列广播边界）
+            # | 是"或"运算符；NaN与任何值比较都是False，不会被算作异常值
+            arr = numeric_array(df, numeric_df.columns)
+            if HAVE_NUMBA:
+                # numba内核把比较和计数融合在一次多线程遍历中
+                with KERNEL_LOCK:
+                    counts = outlier_counts(arr, lower_bounds, upper_bounds)
+            elif ne is not None:
+                # numexpr一次遍历完成两次比较和"或"运算，不生成中间布尔数组
+                outlier_mask = ne.evaluate(
+                    "(arr < lower_bounds) | (arr > upper_bounds)",
+                    local_dict={"arr": arr, "lower_bounds": lower_bounds, "upper_bounds": upper_bounds}
+                )
+                counts = outlier_mask.sum(axis=0)
+            else:
+                outlier_mask = (arr < lower_bounds) | (arr > upper_bounds)
+                # sum(axis=0): 按列统计True的个数，就是每列的异常值数量
+                counts = outlier_mask.sum(axis=0)
+            
+            # 遍历每个数值列，整理结果
+            for i, col in enumerate(numeric_df.columns):
+                outlier_count = counts[i]
+                lower_bound = lower_bounds[i]
+                upper_bound = upper_bounds[i]
                 
                 # 如果有异常值，记录信息
                 if outlier_count > 0:
@@ -1012,7 +1854,7 @@ class OutlierDetectionTool(Tool):
 # 工具7：分组分析工具
 # ============================================================================
 
-class GroupAnalysisTool(Tool):
+class GroupAnalysisTool(SyncTool):
     """
     分组分析工具
     
@@ -1071,7 +1913,7 @@ class GroupAnalysisTool(Tool):
         "required": ["group_by"]  # group_by是必填参数
     }
     
-    async def execute(self, df: pd.DataFrame = None, group_by: str = None, 
+    def compute(self, df: pd.DataFrame = None, group_by: str = None, 
                      agg_columns: List[str] = None, agg_functions: List[str] = None, **kwargs) -> ToolResult:
         """
         执行分组分析
@@ -1100,7 +1942,7 @@ class GroupAnalysisTool(Tool):
                 agg_df = df
             
             # 获取数值列（只有数值列才能做mean、sum等聚合）
-            numeric_cols = agg_df.select_dtypes(include=[np.number]).columns.tolist()
+            numeric_cols = numeric_columns(agg_df).tolist()
             # 分组列不应该被聚合
             if group_by in numeric_cols:
                 numeric_cols.remove(group_by)
@@ -1109,11 +1951,16 @@ class GroupAnalysisTool(Tool):
                 # 如果没有数值列，只做计数
                 # size(): 返回每组的行数
                 # reset_index(): 将分组列从索引变回普通列
-                result = df.groupby(group_by).size().reset_index(name='count')
+                # observed=True: 分组列是category类型时，只输出实际出现的类别，
+                # 不为未使用的类别生成空组
+                result = df[[group_by]].groupby(group_by, observed=True).size().reset_index(name='count')
             else:
+                # 先只取分组列和要聚合的列，减少分组时搬运的数据量
                 # groupby(): 按指定列分组
                 # agg(): 对每组应用聚合函数
-                result = df.groupby(group_by)[numeric_cols].agg(agg_functions).round(4)
+                result = (df[[group_by] + numeric_cols]
+                          .groupby(group_by, observed=True)[numeric_cols]
+                          .agg(agg_functions).round(4))
             
             # 构建输出文本
             output = f"分组分析 (按 {group_by} 分组):\n"
@@ -1131,7 +1978,7 @@ class GroupAnalysisTool(Tool):
 # 工具8：数据质量检查工具
 # ============================================================================
 
-class DataQualityCheckTool(Tool):
+class DataQualityCheckTool(SyncTool):
     """
     数据质量检查工具
     
@@ -1155,61 +2002,77 @@ class DataQualityCheckTool(Tool):
     5. 不一致的格式：如日期格式不统一
     
     【输入参数】
-    无需参数，直接检查已加载的数据
+    - duplicate_check: 可选，重复行检查方式
+      - exact（默认）：逐行比较所有列，结果精确
+      - fast：先把每行哈希成一个64位整数再查重，宽表上快得多；
+        不同的行哈希值相同的概率极低，可以忽略
     """
     name = "data_quality_check"
     description = "全面检查数据质量，包括缺失值、重复值、数据类型一致性等。"
     parameters = {
         "type": "object",
-        "properties": {},
+        "properties": {
+            "duplicate_check": {
+                "type": "string",
+                "enum": ["exact", "fast"],
+                "description": "重复行检查方式：exact逐行精确比较，fast按行哈希比较（宽表更快）",
+                "default": "exact"
+            }
+        },
         "required": []
     }
     
-    async def execute(self, df: pd.DataFrame = None, **kwargs) -> ToolResult:
+    def compute(self, df: pd.DataFrame = None, duplicate_check: str = "exact", **kwargs) -> ToolResult:
         """
         执行数据质量检查
         
         参数:
             df: pandas DataFrame
+            duplicate_check: 重复行检查方式，exact或fast
         """
         if df is None:
             return ToolResult(False, "请先使用load_data加载数据")
         
         try:
+            # 重复行数量（只扫描一次，数量和比例共用）
+            duplicate_count = self._count_duplicates(df, duplicate_check)
+            # isnull().sum(): 每列的缺失值数量（只扫描一次，总数和各列明细共用）
+            null_per_col = df.isnull().sum()
+            missing_total = null_per_col.sum()
+            
             # 构建质量报告字典
             quality_report = {
                 "total_rows": len(df),                    # 总行数
                 "total_columns": len(df.columns),         # 总列数
-                # duplicated(): 返回布尔Series，标记重复行
-                "duplicate_rows": int(df.duplicated().sum()),
-                "duplicate_percentage": round(df.duplicated().sum() / len(df) * 100, 2),
-                # isnull().sum().sum(): 先对每列求缺失值数量，再求总和
-                "missing_cells": int(df.isnull().sum().sum()),
-                "missing_percentage": round(df.isnull().sum().sum() / (len(df) * len(df.columns)) * 100, 2),
-                "columns_with_missing": {},   # 存在缺失值的列
+                "duplicate_rows": int(duplicate_count),
+                "duplicate_percentage": round(duplicate_count / len(df) * 100, 2),
+                "missing_cells": int(missing_total),
+                "missing_percentage": round(missing_total / (len(df) * len(df.columns)) * 100, 2),
+                # 存在缺失值的列，第一次取用时才逐列生成明细字典
+                "columns_with_missing": LazySeriesDict(
+                    null_per_col[null_per_col > 0],
+                    lambda missing: {
+                        "count": int(missing),
+                        "percentage": round(missing / len(df) * 100, 2)
+                    }
+                ),
                 "constant_columns": [],       # 常量列（只有一个值）
                 "high_cardinality_columns": [] # 高基数列（唯一值太多）
             }
             
-            # 检查每列缺失值
-            for col in df.columns:
-                missing = df[col].isnull().sum()
-                if missing > 0:
-                    quality_report["columns_with_missing"][col] = {
-                        "count": int(missing),
-                        "percentage": round(missing / len(df) * 100, 2)
-                    }
+            # 每列的唯一值数量只计算一次，常量列和高基数列检查共用；各列用线程池并行
+            nunique = dict(zip(df.columns, map_columns(lambda col: df[col].nunique(), df.columns)))
             
             # 检查常量列（只有一个唯一值的列）
             # 这种列通常没有分析价值，可以考虑删除
             for col in df.columns:
-                if df[col].nunique() == 1:
+                if nunique[col] == 1:
                     quality_report["constant_columns"].append(col)
             
             # 检查高基数列
             # 如果一个分类列的唯一值数量超过行数的90%，可能是ID列
             for col in df.select_dtypes(include=['object']).columns:
-                if df[col].nunique() > len(df) * 0.9:
+                if nunique[col] > len(df) * 0.9:
                     quality_report["high_cardinality_columns"].append(col)
             
             # 构建人类可读的输出
@@ -1225,6 +2088,24 @@ class DataQualityCheckTool(Tool):
             return ToolResult(True, output, quality_report)
         except Exception as e:
             return ToolResult(False, f"数据质量检查失败: {str(e)}")
+    
+    @staticmethod
+    def _count_duplicates(df: pd.DataFrame, duplicate_check: str = "exact") -> int:
+        """
+        统计重复行数量
+        
+        exact: duplicated()按行比较所有列的值
+        fast: hash_pandas_object()逐列向量化计算哈希并合并成每行一个uint64，
+              再对这一列整数查重，避免对宽表的每一行构建元组
+        """
+        if duplicate_check == "fast":
+            try:
+                return pd.util.hash_pandas_object(df, index=False).duplicated().sum()
+            except TypeError:
+                # 单元格里有列表、字典等不可哈希的值时，退回精确比较
+                pass
+        # duplicated(): 返回布尔Series，标记重复行
+        return df.duplicated().sum()
 
 
 # ============================================================================
@@ -1386,28 +2267,170 @@ class FinalAnswerTool(Tool):
 # 5. 返回最终的分析报告
 # ============================================================================
 
-class DataAnalysisAgent:
+def describe_tools(tools: Dict[str, Tool]) -> str:
     """
-    数据分析Agent - 核心类
-    
-    【这个类做什么？】
-    这是Agent的主体，负责：
-    1. 管理工具集合
-    2. 与LLM交互
-    3. 执行ReAct循环
-    4. 维护记忆系统
-    5. 生成最终报告
+    生成工具描述文本
     
-    【关键属性】
-    - task_id: 任务ID，用于跟踪任务状态
-    - callback_url: 回调URL，用于通知前端进度
-    - memory: 记忆系统，保存思考历史
-    - df: 当前加载的数据（DataFrame）
-    - insights: 收集的洞察列表
-    - tools: 可用工具的字典
+    这个函数遍历所有注册的工具，生成一个格式化的描述文本。
     
-    【关键方法】
-    - run(): 运行Agent，执行完整的分析流程
+    参数:
+        tools: 工具名称 -> 工具实例
+        
+    返回:
+        格式化的工具描述字符串
+    """
+    descriptions = []
+    for name, tool in tools.items():
+        # 将参数定义转换为JSON字符串，便于阅读
+        params_str = json.dumps(tool.parameters, ensure_ascii=False, indent=2)
+        descriptions.append(f"### {name}\n{tool.description}\n参数: {params_str}")
+    return "\n\n".join(descriptions)
+
+
+@lru_cache(maxsize=8)
+def render_system_prompt(template: str, tools_description: str) -> str:
+    """把工具描述填入系统提示词模板（结果按参数缓存，每个任务不必重新格式化）"""
+    return template.format(tools_description=tools_description)
+
+
+# ====================================================================
+# 注册所有可用的工具
+# ====================================================================
+# 这里创建了所有工具的实例，并存储在字典中
+# 键是工具名称，值是工具实例
+# Agent通过工具名称来查找和调用工具
+# 工具的名称、描述和参数定义都是固定的，描述文本在启动时生成一次
+# ====================================================================
+AGENT_TOOLS: Dict[str, Tool] = {
+    "load_data": LoadDataTool(),              # 加载数据
+    "data_overview": DataOverviewTool(),      # 数据概览
+    "describe_numeric": DescribeNumericTool(),    # 数值统计
+    "describe_categorical": DescribeCategoricalTool(),  # 分类统计
+    "correlation_analysis": CorrelationAnalysisTool(),  # 相关性分析
+    "detect_outliers": OutlierDetectionTool(),    # 异常值检测
+    "group_analysis": GroupAnalysisTool(),        # 分组分析
+    "data_quality_check": DataQualityCheckTool(), # 数据质量检查
+    "generate_insight": GenerateInsightTool(),    # 生成洞察
+    "final_answer": FinalAnswerTool(),            # 最终答案
+}
+AGENT_TOOLS_DESCRIPTION = describe_tools(AGENT_TOOLS)
+
+# 只读取DataFrame、不修改Agent状态的工具，它们之间没有依赖关系，可以同时执行
+PARALLEL_SAFE_TOOLS = frozenset({
+    "data_overview",
+    "data_quality_check",
+    "describe_numeric",
+    "describe_categorical",
+    "correlation_analysis",
+    "detect_outliers",
+    "group_analysis",
+})
+
+# ====================================================================
+# 模拟模式的预设分析流程
+# ====================================================================
+# 每一步是 (工具名称, 思考内容, 工具参数)，按顺序执行
+# 全部执行完后，用MOCK_FINAL_ANSWER生成最终报告
+# ====================================================================
+# 文件路径和文件名的占位符，执行load_data前替换为实际值
+FILE_PATH_PLACEHOLDER = "__FILE_PATH__"
+FILE_NAME_PLACEHOLDER = "__FILE_NAME__"
+
+MOCK_ANALYSIS_PLAN = (
+    # 第1步：加载数据
+    ("load_data", "首先需要加载数据文件，了解数据的基本结构",
+     {"file_path": FILE_PATH_PLACEHOLDER, "file_name": FILE_NAME_PLACEHOLDER}),
+    # 第2步：数据概览
+    ("data_overview", "数据已加载，现在获取数据概览，了解基本情况", {}),
+    # 第3步：数据质量检查
+    ("data_quality_check", "接下来检查数据质量，发现潜在问题", {}),
+    # 第4步：数值列统计
+    ("describe_numeric", "对数值列进行统计分析", {}),
+    # 第5步：分类列统计
+    ("describe_categorical", "对分类列进行分析", {}),
+    # 第6步：相关性分析
+    ("correlation_analysis", "分析变量之间的相关性", {"threshold": 0.3}),
+    # 第7步：异常值检测
+    ("detect_outliers", "检测数据中的异常值", {}),
+)
+
+# 第8步：生成最终报告
+MOCK_FINAL_ANSWER = {
+    "summary": "数据分析完成。通过对数据的全面分析，我们了解了数据的基本特征、质量状况、统计分布和变量关系。",
+    "key_findings": [
+        "数据集结构清晰，包含多种类型的变量",
+        "数据质量整体良好，部分列存在缺失值需要处理",
+        "数值变量之间存在一定的相关性",
+        "检测到部分异常值，建议进一步核实"
+    ],
+    "recommendations": [
+        "建议对缺失值进行适当处理",
+        "对异常值进行业务核实",
+        "可以基于相关性分析进行特征选择",
+        "建议进行更深入的业务分析"
+    ]
+}
+
+# 模拟LLM回复的JSON字符串在启动时序列化一次，每次调用直接返回
+# （LLM调用失败时作为替代回复）
+MOCK_PLAN_JSON = tuple(
+    (action, json.dumps({"thought": thought, "action": action, "action_input": action_input}, ensure_ascii=False))
+    for action, thought, action_input in MOCK_ANALYSIS_PLAN
+)
+MOCK_FINAL_THOUGHT = "分析已完成，现在生成最终报告"
+MOCK_FINAL_JSON = json.dumps(
+    {"thought": MOCK_FINAL_THOUGHT, "action": "final_answer", "action_input": MOCK_FINAL_ANSWER},
+    ensure_ascii=False,
+)
+
+
+# LLM有时会用markdown代码块（```json ... ``` 或 ``` ... ```）包裹JSON
+# 预编译的正则一次扫描取出第一个代码块中的JSON对象
+JSON_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+
+
+def parse_llm_json(response: str) -> Any:
+    """
+    解析LLM返回的JSON（自动去掉markdown代码块）
+    
+    参数:
+        response: LLM的原始回复
+        
+    返回:
+        解析后的对象
+        
+    异常:
+        json.JSONDecodeError: 不是合法的JSON（orjson.JSONDecodeError是它的子类）
+    """
+    match = JSON_FENCE_PATTERN.search(response)
+    response_clean = match.group(1) if match else response.strip()
+    if orjson is not None:
+        return orjson.loads(response_clean)
+    return json.loads(response_clean)
+
+
+class DataAnalysisAgent:
+    """
+    数据分析Agent - 核心类
+    
+    【这个类做什么？】
+    这是Agent的主体，负责：
+    1. 管理工具集合
+    2. 与LLM交互
+    3. 执行ReAct循环
+    4. 维护记忆系统
+    5. 生成最终报告
+    
+    【关键属性】
+    - task_id: 任务ID，用于跟踪任务状态
+    - callback_url: 回调URL，用于通知前端进度
+    - memory: 记忆系统，保存思考历史
+    - df: 当前加载的数据（DataFrame）
+    - insights: 收集的洞察列表
+    - tools: 可用工具的字典
+    
+    【关键方法】
+    - run(): 运行Agent，执行完整的分析流程
     - _call_llm(): 调用大模型
     - _execute_tool(): 执行工具
     """
@@ -1465,16 +2488,25 @@ class DataAnalysisAgent:
 - 给出可操作的建议
 """
     
-    def __init__(self, task_id: str, callback_url: str):
+    def __init__(self, task_id: str, callback_url: str, fast_plan: bool = False):
         """
         初始化Agent
         
         参数:
             task_id: 任务ID，用于跟踪任务状态和更新进度
             callback_url: 回调URL，分析完成后通知前端
+            fast_plan: LLM模式下，数据加载后是否直接并行执行预设的分析工具
+                       （不必让LLM逐个决定，减少LLM调用次数）
         """
         self.task_id = task_id
         self.callback_url = callback_url
+        self.fast_plan = fast_plan
+        
+        # 没有配置LLM API Key时使用模拟模式，按预设流程直接生成决策，不调用LLM
+        self._mock_mode = not LLM_API_KEY
+        
+        # 进度通知器：合并短时间内的多次进度更新，只发送最新的一次
+        self.progress = ProgressNotifier(callback_url)
         
         # 初始化记忆系统
         self.memory = AgentMemory()
@@ -1485,42 +2517,25 @@ class DataAnalysisAgent:
         # 收集的洞察列表
         self.insights: List[Dict[str, Any]] = []
         
-        # ====================================================================
-        # 注册所有可用的工具
-        # ====================================================================
-        # 这里创建了所有工具的实例，并存储在字典中
-        # 键是工具名称，值是工具实例
-        # Agent通过工具名称来查找和调用工具
-        # ====================================================================
-        self.tools: Dict[str, Tool] = {
-            "load_data": LoadDataTool(),              # 加载数据
-            "data_overview": DataOverviewTool(),      # 数据概览
-            "describe_numeric": DescribeNumericTool(),    # 数值统计
-            "describe_categorical": DescribeCategoricalTool(),  # 分类统计
-            "correlation_analysis": CorrelationAnalysisTool(),  # 相关性分析
-            "detect_outliers": OutlierDetectionTool(),    # 异常值检测
-            "group_analysis": GroupAnalysisTool(),        # 分组分析
-            "data_quality_check": DataQualityCheckTool(), # 数据质量检查
-            "generate_insight": GenerateInsightTool(),    # 生成洞察
-            "final_answer": FinalAnswerTool(),            # 最终答案
-        }
+        # 所有可用的工具（工具本身不保存状态，所有Agent共用同一组实例）
+        self.tools: Dict[str, Tool] = AGENT_TOOLS
+        
+        # 对话消息中观察结果消息的位置（用于压缩较早的观察结果）
+        self._observation_indices: List[int] = []
     
     def _get_tools_description(self) -> str:
         """
         生成工具描述文本
         
-        这个方法遍历所有注册的工具，生成一个格式化的描述文本。
         这个文本会被插入到系统提示词中，让LLM知道有哪些工具可用。
+        使用默认工具集时直接返回启动时生成好的描述。
         
         返回:
             格式化的工具描述字符串
         """
-        descriptions = []
-        for name, tool in self.tools.items():
-            # 将参数定义转换为JSON字符串，便于阅读
-            params_str = json.dumps(tool.parameters, ensure_ascii=False, indent=2)
-            descriptions.append(f"### {name}\n{tool.description}\n参数: {params_str}")
-        return "\n\n".join(descriptions)
+        if self.tools is AGENT_TOOLS:
+            return AGENT_TOOLS_DESCRIPTION
+        return describe_tools(self.tools)
     
     def _build_prompt(self, user_query: str, file_name: str) -> str:
         """
@@ -1537,8 +2552,8 @@ class DataAnalysisAgent:
         返回:
             (system_prompt, user_message) 元组
         """
-        # 将工具描述插入系统提示词
-        system = self.SYSTEM_PROMPT.format(tools_description=self._get_tools_description())
+        # 将工具描述插入系统提示词（模板和工具不变时复用上次的结果）
+        system = render_system_prompt(self.SYSTEM_PROMPT, self._get_tools_description())
         
         # 构建用户消息
         user_message = f"""请分析以下数据文件：
@@ -1585,37 +2600,41 @@ class DataAnalysisAgent:
             return await self._mock_llm_response(messages)
         
         try:
-            # 使用httpx发送异步HTTP请求
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{LLM_API_URL}/chat/completions",  # API地址
-                    headers={
-                        # Bearer Token认证
-                        "Authorization": f"Bearer {LLM_API_KEY}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": LLM_MODEL,      # 模型名称
-                        "messages": messages,     # 对话消息
-                        "temperature": 0.7,       # 温度参数，控制随机性（0-1）
-                        "max_tokens": 2000        # 最大生成token数
-                    },
-                    timeout=60.0  # 超时时间60秒
-                )
-                # 如果HTTP状态码不是2xx，抛出异常
-                response.raise_for_status()
-                # 解析JSON响应
-                result = response.json()
-                # 提取助手的回复内容
-                return result["choices"][0]["message"]["content"]
+            # 发送请求（相同请求会直接命中缓存，见cached_llm_call）
+            return await cached_llm_call(
+                {
+                    "model": LLM_MODEL,      # 模型名称
+                    "messages": messages,     # 对话消息
+                    "temperature": 0.7,       # 温度参数，控制随机性（0-1）
+                    "max_tokens": 2000        # 最大生成token数
+                },
+                timeout=60.0  # 超时时间60秒
+            )
         except Exception as e:
-            # 如果调用失败，打印错误并使用模拟响应
-            print(f"LLM调用失败: {e}")
+            # 如果调用失败，记录错误并使用模拟响应
+            logger.warning("LLM调用失败: %s", e)
             return await self._mock_llm_response(messages)
     
     async def _mock_llm_response(self, messages: List[Dict[str, str]]) -> str:
         """
-        模拟LLM响应
+        模拟LLM响应（JSON格式字符串，LLM调用失败时作为替代）
+        
+        参数:
+            messages: 对话消息列表（本方法不使用，但保持接口一致）
+            
+        返回:
+            模拟的LLM响应（JSON格式字符串）
+        """
+        # 与_mock_decision的流程相同，返回预先序列化好的字符串
+        history = self.memory.get_history()
+        for action, response in MOCK_PLAN_JSON:
+            if action not in history:
+                return response
+        return MOCK_FINAL_JSON
+    
+    def _mock_decision(self) -> Dict[str, Any]:
+        """
+        模拟LLM的决策
         
         【为什么需要这个方法？】
         1. 在没有配置LLM API Key时，仍然可以运行和测试Agent
@@ -1626,94 +2645,36 @@ class DataAnalysisAgent:
         根据Agent的历史记录，按照预设的分析流程返回下一步的动作。
         这模拟了一个"按部就班"的分析师的行为。
         
-        参数:
-            messages: 对话消息列表（本方法不使用，但保持接口一致）
-            
         返回:
-            模拟的LLM响应（JSON格式字符串）
+            决策字典，包含thought、action、action_input（和LLM返回的JSON解析后一致）
         """
         # 获取Agent的思考历史
         history = self.memory.get_history()
         
-        # 按照预设的分析流程，依次执行各个工具
+        # 按照预设的分析流程（MOCK_ANALYSIS_PLAN），依次执行各个工具
         # 每次检查历史中是否已经执行过某个工具，如果没有就执行它
+        for action, thought, action_input in MOCK_ANALYSIS_PLAN:
+            if action not in history:
+                # 复制一份参数，执行工具时的修改不会影响预设流程
+                return {"thought": thought, "action": action, "action_input": dict(action_input)}
         
-        # 第1步：加载数据
-        if "load_data" not in history:
-            return json.dumps({
-                "thought": "首先需要加载数据文件，了解数据的基本结构",
-                "action": "load_data",
-                "action_input": {"file_path": "__FILE_PATH__", "file_name": "__FILE_NAME__"}
-            }, ensure_ascii=False)
-        
-        # 第2步：数据概览
-        if "data_overview" not in history:
-            return json.dumps({
-                "thought": "数据已加载，现在获取数据概览，了解基本情况",
-                "action": "data_overview",
-                "action_input": {}
-            }, ensure_ascii=False)
-        
-        # 第3步：数据质量检查
-        if "data_quality_check" not in history:
-            return json.dumps({
-                "thought": "接下来检查数据质量，发现潜在问题",
-                "action": "data_quality_check",
-                "action_input": {}
-            }, ensure_ascii=False)
-        
-        # 第4步：数值列统计
-        if "describe_numeric" not in history:
-            return json.dumps({
-                "thought": "对数值列进行统计分析",
-                "action": "describe_numeric",
-                "action_input": {}
-            }, ensure_ascii=False)
-        
-        # 第5步：分类列统计
-        if "describe_categorical" not in history:
-            return json.dumps({
-                "thought": "对分类列进行分析",
-                "action": "describe_categorical",
-                "action_input": {}
-            }, ensure_ascii=False)
-        
-        # 第6步：相关性分析
-        if "correlation_analysis" not in history:
-            return json.dumps({
-                "thought": "分析变量之间的相关性",
-                "action": "correlation_analysis",
-                "action_input": {"threshold": 0.3}
-            }, ensure_ascii=False)
-        
-        # 第7步：异常值检测
-        if "detect_outliers" not in history:
-            return json.dumps({
-                "thought": "检测数据中的异常值",
-                "action": "detect_outliers",
-                "action_input": {}
-            }, ensure_ascii=False)
-        
-        # 第8步：生成最终报告
-        return json.dumps({
-            "thought": "分析已完成，现在生成最终报告",
+        # 所有步骤都执行过了：生成最终报告
+        return {
+            "thought": MOCK_FINAL_THOUGHT,
             "action": "final_answer",
-            "action_input": {
-                "summary": "数据分析完成。通过对数据的全面分析，我们了解了数据的基本特征、质量状况、统计分布和变量关系。",
-                "key_findings": [
-                    "数据集结构清晰，包含多种类型的变量",
-                    "数据质量整体良好，部分列存在缺失值需要处理",
-                    "数值变量之间存在一定的相关性",
-                    "检测到部分异常值，建议进一步核实"
-                ],
-                "recommendations": [
-                    "建议对缺失值进行适当处理",
-                    "对异常值进行业务核实",
-                    "可以基于相关性分析进行特征选择",
-                    "建议进行更深入的业务分析"
-                ]
-            }
-        }, ensure_ascii=False)
+            "action_input": dict(MOCK_FINAL_ANSWER),
+        }
+    
+    def _pending_parallel_steps(self) -> List[Dict[str, Any]]:
+        """
+        预设流程中尚未执行、且可以并行执行的步骤（决策字典列表，按流程顺序）
+        """
+        history = self.memory.get_history()
+        return [
+            {"thought": thought, "action": action, "action_input": dict(action_input)}
+            for action, thought, action_input in MOCK_ANALYSIS_PLAN
+            if action in PARALLEL_SAFE_TOOLS and action not in history
+        ]
     
     # ========================================================================
     # 工具执行方法
@@ -1729,7 +2690,7 @@ class DataAnalysisAgent:
         
         【执行流程】
         1. 检查工具是否存在
-        2. 注入DataFrame上下文（如果已加载数据）
+        2. 注入DataFrame上下文（未加载数据时为None）
         3. 调用工具的execute方法
         4. 处理特殊情况（如保存DataFrame、收集洞察）
         5. 返回执行结果
@@ -1750,13 +2711,20 @@ class DataAnalysisAgent:
         
         # 注入DataFrame上下文
         # 大多数工具需要操作数据，我们自动将当前的DataFrame传给它们
-        if self.df is not None:
-            action_input["df"] = self.df
+        # DataFrame作为单独的关键字参数传入，不复制也不修改action_input
+        # （action_input记录在思考历史中，要序列化为JSON）；
+        # LLM的参数里如果误带了df，以Agent当前的数据为准
+        if "df" in action_input:
+            action_input = {k: v for k, v in action_input.items() if k != "df"}
         
         # 调用工具的execute方法
-        # **action_input: 将字典解包为关键字参数
-        result = await tool.execute(**action_input)
-        
+        # **action_input: 将字典解包为关键字参数（所有工具的execute都接受df参数）
+        result = await tool.execute(**action_input, df=self.df)
+        self._apply_tool_result(action, result)
+        return result
+    
+    def _apply_tool_result(self, action: str, result: ToolResult):
+        """根据工具结果更新Agent状态（在事件循环中调用）"""
         # 特殊处理：如果是load_data工具，保存返回的DataFrame
         if action == "load_data" and result.success and result.data is not None:
             self.df = result.data
@@ -1764,8 +2732,79 @@ class DataAnalysisAgent:
         # 特殊处理：如果是generate_insight工具，收集洞察
         if action == "generate_insight" and result.success:
             self.insights.append(result.data)
+    
+    async def _execute_tools_parallel(self, calls: List[Dict[str, Any]]) -> List[ToolResult]:
+        """
+        同时执行多个互不依赖的只读工具
         
-        return result
+        这些工具的计算是同步的pandas/NumPy代码（SyncTool.compute），
+        直接gather仍然会一个接一个执行。这里把每个工具的compute放到线程池中运行，
+        NumPy/pandas计算时会释放GIL，多个工具可以真正同时执行；
+        更新Agent状态仍在事件循环中进行。
+        
+        参数:
+            calls: 决策字典列表，每个包含action和action_input（action必须在PARALLEL_SAFE_TOOLS中）
+            
+        返回:
+            ToolResult列表，顺序和calls一致
+        """
+        async def run_one(action: str, action_input: Dict[str, Any]) -> ToolResult:
+            tool = self.tools.get(action)
+            if not isinstance(tool, SyncTool):
+                return await self._execute_tool(action, action_input)
+            action_input = {k: v for k, v in action_input.items() if k != "df"}
+            result = await asyncio.to_thread(tool.compute, **action_input, df=self.df)
+            self._apply_tool_result(action, result)
+            return result
+        
+        return await asyncio.gather(*(
+            run_one(call["action"], call["action_input"]) for call in calls
+        ))
+    
+    async def _run_parallel_steps(self, messages: List[Dict[str, str]]):
+        """
+        并行执行预设流程中剩余的只读分析步骤，并按流程顺序记录到记忆中
+        
+        模拟模式下，后续的模拟决策发现这些步骤都已执行，会直接生成最终报告；
+        LLM模式（fast_plan）下，所有观察结果合并成一条消息交给LLM，由它继续决策。
+        """
+        steps = self._pending_parallel_steps()
+        if not steps:
+            return
+        
+        results = await self._execute_tools_parallel(steps)
+        
+        observations = []
+        for step, result in zip(steps, results):
+            self.memory.add_thought(AgentThought(
+                thought=step["thought"],
+                action=step["action"],
+                action_input=step["action_input"],
+                observation=result.output
+            ))
+            observations.append(f"[{step['action']}]\n{result.output}")
+        
+        if not self._mock_mode:
+            self._append_observation(
+                messages, "以下分析已并行完成：\n\nObservation: " + "\n\n".join(observations)
+            )
+    
+    def _append_observation(self, messages: List[Dict[str, str]], content: str):
+        """
+        添加一条观察结果消息，并压缩已经不在最近FULL_OBSERVATIONS_IN_CONTEXT条之内的那一条
+        
+        LLM已经看过完整的观察结果并据此做了决策，较早的观察结果只需保留开头作为提示。
+        每条消息只在移出窗口时压缩一次，之后的对话前缀保持不变。
+        """
+        self._observation_indices.append(len(messages))
+        messages.append({"role": "user", "content": content})
+        
+        if len(self._observation_indices) > FULL_OBSERVATIONS_IN_CONTEXT:
+            message = messages[self._observation_indices[-FULL_OBSERVATIONS_IN_CONTEXT - 1]]
+            text = message["content"]
+            if len(text) > OBSERVATION_PREVIEW_CHARS:
+                omitted = len(text) - OBSERVATION_PREVIEW_CHARS
+                message["content"] = f"{text[:OBSERVATION_PREVIEW_CHARS]}…（已省略{omitted}字）"
     
     # ========================================================================
     # Agent主运行方法 - ReAct循环的核心
@@ -1827,53 +2866,52 @@ class DataAnalysisAgent:
             # 保留10%给初始化，10%给最终处理
             progress = min(10 + iteration * 6, 90)
             
-            # 更新任务进度并通知前端
-            tasks_store[self.task_id]["progress"] = progress
-            await send_callback(self.callback_url, {"status": "processing", "progress": progress})
-            
-            # ================================================================
-            # 第1步：思考（Reasoning）- 调用LLM获取决策
-            # ================================================================
-            response = await self._call_llm(messages)
+            # 更新任务进度并通知前端（由后台任务合并发送，不阻塞主循环）
+            await tasks_store.update(self.task_id, progress=progress)
+            self.progress.notify({"status": "processing", "progress": progress})
             
-            # ================================================================
-            # 第2步：解析LLM的响应
-            # ================================================================
-            # LLM应该返回JSON格式的响应，包含thought、action、action_input
-            # 但有时LLM可能会用markdown代码块包裹JSON，需要提取
-            try:
-                response_clean = response
-                
-                # 尝试从markdown代码块中提取JSON
-                if "```json" in response:
-                    # 格式: ```json\n{...}\n```
-                    response_clean = response.split("```json")[1].split("```")[0]
-                elif "```" in response:
-                    # 格式: ```\n{...}\n```
-                    response_clean = response.split("```")[1].split("```")[0]
-                
-                # 解析JSON
-                parsed = json.loads(response_clean.strip())
-                thought = parsed.get("thought", "")      # Agent的思考
-                action = parsed.get("action", "")        # 要执行的工具
-                action_input = parsed.get("action_input", {})  # 工具参数
+            if self._mock_mode:
+                # 模拟模式：按预设流程直接得到决策字典，
+                # 不需要先序列化成JSON字符串再解析回来
+                parsed = self._mock_decision()
+                response = None
+            else:
+                # ============================================================
+                # 第1步：思考（Reasoning）- 调用LLM获取决策
+                # ============================================================
+                response = await self._call_llm(messages)
                 
-            except json.JSONDecodeError:
-                # 如果JSON解析失败，要求LLM重新输出
-                # 这是一种错误恢复机制
-                messages.append({"role": "assistant", "content": response})
-                messages.append({"role": "user", "content": "请按照指定的JSON格式输出。"})
-                continue  # 跳过本次迭代，重新调用LLM
+                # ============================================================
+                # 第2步：解析LLM的响应
+                # ============================================================
+                # LLM应该返回JSON格式的响应，包含thought、action、action_input
+                # 但有时LLM可能会用markdown代码块包裹JSON，需要提取
+                try:
+                    # 从markdown代码块中提取JSON并解析
+                    parsed = parse_llm_json(response)
+                    
+                except json.JSONDecodeError:
+                    # 如果JSON解析失败，要求LLM重新输出
+                    # 这是一种错误恢复机制
+                    messages.append({"role": "assistant", "content": response})
+                    messages.append({"role": "user", "content": "请按照指定的JSON格式输出。"})
+                    continue  # 跳过本次迭代，重新调用LLM
+            
+            thought = parsed.get("thought", "")      # Agent的思考
+            action = parsed.get("action", "")        # 要执行的工具
+            action_input = parsed.get("action_input", {})  # 工具参数
             
             # ================================================================
             # 第3步：处理占位符
             # ================================================================
             # 模拟模式下，LLM不知道实际的文件路径，使用占位符
-            # 这里将占位符替换为实际值
-            if "__FILE_PATH__" in str(action_input):
-                action_input["file_path"] = file_path
-            if "__FILE_NAME__" in str(action_input):
-                action_input["file_name"] = file_name
+            # 这里将占位符替换为实际值（只有load_data的这两个参数会用到占位符，
+            # 直接比较参数值，不必把整个参数字典转成字符串再查找）
+            if action == "load_data" and isinstance(action_input, dict):
+                if action_input.get("file_path") == FILE_PATH_PLACEHOLDER:
+                    action_input["file_path"] = file_path
+                if action_input.get("file_name") == FILE_NAME_PLACEHOLDER:
+                    action_input["file_name"] = file_name
             
             # ================================================================
             # 第4步：行动（Acting）- 执行工具
@@ -1897,8 +2935,15 @@ class DataAnalysisAgent:
             # ================================================================
             # 将LLM的响应和工具的观察结果添加到消息列表
             # 这样下一轮LLM调用时，它能看到之前的所有交互
-            messages.append({"role": "assistant", "content": response})
-            messages.append({"role": "user", "content": f"Observation: {result.output}"})
+            # （模拟模式不调用LLM，不需要维护对话消息）
+            if not self._mock_mode:
+                messages.append({"role": "assistant", "content": response})
+                self._append_observation(messages, f"Observation: {result.output}")
+            
+            # 数据加载完成后，把预设流程中互不依赖的分析工具一次性并行执行
+            # （模拟模式总是如此；LLM模式需要开启fast_plan选项）
+            if action == "load_data" and result.success and (self._mock_mode or self.fast_plan):
+                await self._run_parallel_steps(messages)
             
             # ================================================================
             # 第7步：检查是否完成
@@ -1921,12 +2966,12 @@ class DataAnalysisAgent:
             }
         
         # 添加Agent的思考过程（用于调试和展示）
-        # 截断过长的观察结果，避免报告过大
+        # 观察结果在记录时已截断（见AgentThought），避免报告过大
         final_result["agent_thoughts"] = [
             {
                 "thought": t.thought,
                 "action": t.action,
-                "observation": t.observation[:500] if len(t.observation) > 500 else t.observation
+                "observation": t.observation
             }
             for t in self.memory.thoughts
         ]
@@ -1962,6 +3007,20 @@ class DataAnalysisAgent:
 # 4. POST /api/task/{id}/cancel - 取消任务
 # ============================================================================
 
+# 健康检查返回的时间戳按秒缓存：[时间戳字符串, 对应的整数秒]
+# 负载均衡器频繁探测时，同一秒内的请求直接复用，不必每次创建datetime并格式化
+_health_timestamp = ["", 0]
+
+
+def current_timestamp() -> str:
+    """当前时间的ISO格式字符串（精确到秒，同一秒内返回缓存的字符串）"""
+    now = int(time.time())
+    if now != _health_timestamp[1]:
+        _health_timestamp[0] = datetime.fromtimestamp(now).isoformat()
+        _health_timestamp[1] = now
+    return _health_timestamp[0]
+
+
 @app.get("/health")
 async def health_check():
     """
@@ -1972,14 +3031,14 @@ async def health_check():
     
     【返回信息】
     - status: 服务状态（"ok"表示正常）
-    - timestamp: 当前时间
+    - timestamp: 当前时间（精确到秒）
     - version: 服务版本
     - agent_enabled: Agent功能是否启用
     - llm_configured: LLM API是否已配置
     """
     return {
         "status": "ok",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": current_timestamp(),
         "version": "2.0.0",
         "agent_enabled": True,
         "llm_configured": bool(LLM_API_KEY)  # 如果有API Key则为True
@@ -1987,7 +3046,7 @@ async def health_check():
 
 
 @app.post("/api/analyze")
-async def submit_analysis(request: AnalyzeRequest, background_tasks: BackgroundTasks):
+async def submit_analysis(request: AnalyzeRequest):
     """
     提交分析任务接口
     
@@ -1998,47 +3057,52 @@ async def submit_analysis(request: AnalyzeRequest, background_tasks: BackgroundT
     【工作流程】
     1. 接收请求，验证参数（由Pydantic自动完成）
     2. 在tasks_store中创建任务记录
-    3. 将分析任务添加到后台任务队列
+    3. 将分析任务放入Agent任务队列（见下方"Agent任务队列"）
     4. 立即返回成功响应
-    5. 后台任务执行完成后，通过callback_url通知前端
+    5. 空闲的工作协程取出任务执行，完成后通过callback_url通知前端
     
-    【什么是BackgroundTasks？】
-    FastAPI提供的后台任务机制。添加到BackgroundTasks的函数会在
-    响应返回后异步执行，不会阻塞当前请求。
+    【为什么不直接用BackgroundTasks？】
+    BackgroundTasks会立即执行每个任务，没有并发上限；同时提交很多任务时，
+    每个任务都要加载一份DataFrame，内存会被耗尽。
+    队列让同时运行的Agent最多MAX_CONCURRENT_AGENTS个，其余任务排队等待；
+    队列满时返回503，让前端稍后重试。
     
     参数:
         request: AnalyzeRequest对象，包含任务信息
-        background_tasks: FastAPI的后台任务管理器
         
     返回:
         成功响应，包含success和message字段
     """
     # 在任务存储中创建新任务记录
-    tasks_store[request.task_id] = {
-        "status": TaskStatus.PENDING,  # 初始状态：等待中
-        "progress": 0,                  # 初始进度：0%
-        "result": None,                 # 结果：暂无
-        "error": None,                  # 错误：暂无
-    }
+    # 初始状态：等待中，进度0%，暂无结果和错误
+    await tasks_store.set(request.task_id, TaskState())
     
-    # 将分析任务添加到后台执行
-    # add_task的第一个参数是要执行的函数，后面是函数的参数
-    background_tasks.add_task(
-        run_agent_analysis,      # 要执行的函数
-        request.task_id,         # 任务ID
-        request.file_path,       # 文件路径
-        request.file_name,       # 文件名
-        request.callback_url,    # 回调URL
-        request.user_query,      # 用户需求
-        request.options,         # 额外选项
-    )
+    # 将分析任务放入队列（参数顺序与run_agent_analysis一致）
+    try:
+        agent_queue.put_nowait((
+            request.task_id,         # 任务ID
+            request.file_path,       # 文件路径
+            request.file_name,       # 文件名
+            request.callback_url,    # 回调URL
+            request.user_query,      # 用户需求
+            request.options,         # 额外选项
+        ))
+    except asyncio.QueueFull:
+        await tasks_store.delete(request.task_id)
+        raise HTTPException(status_code=503, detail="Agent任务队列已满，请稍后重试")
     
     # 立即返回成功响应
     return {"success": True, "message": "Agent任务已提交"}
 
 
+# 长轮询最多等待的秒数
+MAX_STATUS_WAIT_SECONDS = 30.0
+# 长轮询其他worker的任务时，重新读取Redis的间隔（秒）
+REMOTE_STATUS_POLL_INTERVAL = 0.5
+
+
 @app.get("/api/task/{task_id}/status", response_model=TaskStatusResponse)
-async def get_task_status(task_id: str):
+async def get_task_status(task_id: str, wait: float = 0):
     """
     查询任务状态接口
     
@@ -2048,6 +3112,11 @@ async def get_task_status(task_id: str):
     【路径参数】
     task_id: 任务ID（在URL中，如 /api/task/abc123/status）
     
+    【查询参数】
+    wait: 可选，长轮询秒数（如 ?wait=5，最多MAX_STATUS_WAIT_SECONDS秒）。
+          任务还没结束时最多等待这么久，任务一结束立即返回，
+          前端不需要频繁地反复查询。默认0表示立即返回当前状态。
+    
     【response_model的作用】
     指定响应的数据模型，FastAPI会自动：
     1. 验证响应数据是否符合模型
@@ -2057,13 +3126,29 @@ async def get_task_status(task_id: str):
     返回:
         TaskStatusResponse对象，包含status、progress、result、error
     """
-    # 检查任务是否存在
-    if task_id not in tasks_store:
+    # 检查任务是否存在（本地没有时从Redis读取）
+    state = await tasks_store.get(task_id)
+    if state is None:
         # 如果不存在，返回404错误
         raise HTTPException(status_code=404, detail="任务不存在")
     
+    # 长轮询：等待任务结束或超时
+    if wait > 0 and not state.done.is_set():
+        timeout = min(wait, MAX_STATUS_WAIT_SECONDS)
+        if tasks_store.local(task_id) is state:
+            try:
+                await asyncio.wait_for(state.done.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            # 任务由其他worker执行，收不到本地事件，定期重新读取Redis
+            deadline = time.monotonic() + timeout
+            while not state.done.is_set() and time.monotonic() < deadline:
+                await asyncio.sleep(REMOTE_STATUS_POLL_INTERVAL)
+                state = await tasks_store.get(task_id) or state
+    
     # 返回任务状态
-    return tasks_store[task_id]
+    return state.to_response()
 
 
 @app.post("/api/task/{task_id}/cancel")
@@ -2085,12 +3170,11 @@ async def cancel_task(task_id: str):
         成功响应
     """
     # 检查任务是否存在
-    if task_id not in tasks_store:
+    if await tasks_store.get(task_id) is None:
         raise HTTPException(status_code=404, detail="任务不存在")
     
     # 将任务状态设为失败，并记录取消原因
-    tasks_store[task_id]["status"] = TaskStatus.FAILED
-    tasks_store[task_id]["error"] = "任务已取消"
+    await tasks_store.fail(task_id, "任务已取消")
     
     return {"success": True}
 
@@ -2128,20 +3212,25 @@ async def run_agent_analysis(
         user_query: 用户的分析需求
         options: 额外选项
     """
+    agent = None
     try:
         # 更新状态为处理中
-        tasks_store[task_id]["status"] = TaskStatus.PROCESSING
+        await tasks_store.update(task_id, status=TaskStatus.PROCESSING)
+        
+        # 创建Agent实例
+        # options.fast_plan: 数据加载后并行执行预设的分析工具
+        agent = DataAnalysisAgent(task_id, callback_url, fast_plan=bool(options.get("fast_plan", False)))
         # 发送初始进度通知
-        await send_callback(callback_url, {"status": "processing", "progress": 5})
+        agent.progress.notify({"status": "processing", "progress": 5})
         
-        # 创建Agent实例并运行
-        agent = DataAnalysisAgent(task_id, callback_url)
+        # 运行Agent
         result = await agent.run(file_path, file_name, user_query)
         
         # 分析完成，更新状态
-        tasks_store[task_id]["status"] = TaskStatus.COMPLETED
-        tasks_store[task_id]["progress"] = 100
-        tasks_store[task_id]["result"] = result
+        await tasks_store.complete(task_id, result)
+        
+        # 先停止进度通知，保证"处理中"的回调不会晚于最终结果到达前端
+        await agent.progress.aclose()
         
         # 发送完成回调，通知前端
         await send_callback(callback_url, {
@@ -2150,22 +3239,115 @@ async def run_agent_analysis(
             "result": result,
             "reportName": f"{file_name} - Agent分析报告",
             "reportType": "json",
-        })
+        }, retries=CALLBACK_RETRIES)
         
     except Exception as e:
         # 发生异常，更新状态为失败
         error_msg = str(e)
-        tasks_store[task_id]["status"] = TaskStatus.FAILED
-        tasks_store[task_id]["error"] = error_msg
+        await tasks_store.fail(task_id, error_msg)
+        
+        if agent is not None:
+            await agent.progress.aclose()
         
         # 发送失败回调
         await send_callback(callback_url, {
             "status": "failed",
             "error": error_msg,
-        })
+        }, retries=CALLBACK_RETRIES)
+
+
+# ============================================================================
+# Agent任务队列
+# ============================================================================
+# 提交的分析任务先放入有界队列，由固定数量的工作协程依次取出执行：
+# - 同时运行的Agent最多MAX_CONCURRENT_AGENTS个，内存中的DataFrame数量有上限
+# - 排队的任务最多AGENT_QUEUE_SIZE个，超出时提交接口返回503
+# 工作协程在服务启动时创建，关闭时取消。
+# ============================================================================
+MAX_CONCURRENT_AGENTS = int(os.getenv("MAX_CONCURRENT_AGENTS", "8"))
+AGENT_QUEUE_SIZE = int(os.getenv("AGENT_QUEUE_SIZE", "200"))
+
+agent_queue: asyncio.Queue = asyncio.Queue(maxsize=AGENT_QUEUE_SIZE)
+_agent_workers: List[asyncio.Task] = []
+
+
+async def agent_worker():
+    """工作协程：不断从队列取出任务并执行"""
+    while True:
+        job = await agent_queue.get()
+        try:
+            state = tasks_store.local(job[0])
+            # 排队期间被取消（或已过期）的任务不再执行
+            if state is not None and not state.done.is_set():
+                await run_agent_analysis(*job)
+        except Exception as e:
+            # 单个任务的意外错误不能让工作协程退出
+            logger.exception("Agent任务执行失败: %s", e)
+        finally:
+            agent_queue.task_done()
+
+
+# ============================================================================
+# 后台作业队列（报告生成、基因编辑分析）
+# ============================================================================
+# 与Agent任务队列相同：作业放入有界队列，由固定数量的工作协程执行，
+# 同时运行的作业最多MAX_BACKGROUND_JOBS个，排队的作业最多BACKGROUND_QUEUE_SIZE个。
+# 队列中的每一项是 (协程函数, 参数元组)。
+# ============================================================================
+MAX_BACKGROUND_JOBS = int(os.getenv("MAX_BACKGROUND_JOBS", "4"))
+BACKGROUND_QUEUE_SIZE = int(os.getenv("BACKGROUND_QUEUE_SIZE", "200"))
+
+background_queue: asyncio.Queue = asyncio.Queue(maxsize=BACKGROUND_QUEUE_SIZE)
+
+
+def submit_background_job(func, *args):
+    """
+    把后台作业放入队列
+    
+    队列已满时抛出HTTPException(503)，让前端稍后重试
+    """
+    try:
+        background_queue.put_nowait((func, args))
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="后台任务队列已满，请稍后重试")
+
+
+async def background_worker():
+    """工作协程：不断从后台作业队列取出作业并执行"""
+    while True:
+        func, args = await background_queue.get()
+        try:
+            await func(*args)
+        except Exception as e:
+            # 作业自己负责记录失败状态，这里只防止工作协程退出
+            logger.exception("后台任务执行失败: %s", e)
+        finally:
+            background_queue.task_done()
+
+
+@app.on_event("startup")
+async def start_agent_workers():
+    """服务启动时创建Agent工作协程和后台作业工作协程"""
+    for _ in range(MAX_CONCURRENT_AGENTS):
+        _agent_workers.append(asyncio.create_task(agent_worker()))
+    for _ in range(MAX_BACKGROUND_JOBS):
+        _agent_workers.append(asyncio.create_task(background_worker()))
 
 
-async def send_callback(callback_url: str, data: Dict[str, Any]):
+@app.on_event("shutdown")
+async def stop_agent_workers():
+    """服务关闭时取消所有工作协程"""
+    for worker in _agent_workers:
+        worker.cancel()
+    _agent_workers.clear()
+
+
+# 最终结果回调（完成/失败）遇到连接错误或5xx时的重试次数，以及第一次重试前等待的秒数（之后每次翻倍）
+CALLBACK_RETRIES = int(os.getenv("CALLBACK_RETRIES", "3"))
+CALLBACK_RETRY_DELAY = 0.5
+
+
+async def send_callback(callback_url: str, data: Dict[str, Any], retries: int = 0):
     """
     发送回调请求到前端
     
@@ -2177,22 +3359,88 @@ async def send_callback(callback_url: str, data: Dict[str, Any]):
     因为分析是异步执行的，前端不知道什么时候完成。
     通过回调机制，后端可以主动通知前端，而不是让前端不断轮询。
     
+    【重试】
+    前端重启或短暂过载时回调会失败。最终结果只发送一次，丢失后前端只能靠轮询，
+    所以最终结果的回调传入retries=CALLBACK_RETRIES：遇到连接错误或5xx响应时
+    按指数退避（0.5秒、1秒、2秒……）重试。进度回调很快会被下一次覆盖，不重试。
+    
     参数:
         callback_url: 前端提供的回调URL
         data: 要发送的数据
+        retries: 失败后最多重试的次数
     """
-    try:
-        # 使用httpx发送异步POST请求
-        async with httpx.AsyncClient() as client:
-            await client.post(
+    for attempt in range(retries + 1):
+        if attempt > 0:
+            await asyncio.sleep(CALLBACK_RETRY_DELAY * 2 ** (attempt - 1))
+        try:
+            # 使用共享的httpx客户端发送异步POST请求（复用已建立的连接）
+            response = await http_client.post(
                 callback_url,
                 json=data,  # 自动将字典序列化为JSON
                 headers={"Content-Type": "application/json"},
                 timeout=10.0,  # 10秒超时
             )
-    except Exception as e:
-        # 回调失败不应该影响主流程，只打印错误
-        print(f"发送回调失败: {e}")
+        except httpx.TransportError as e:
+            # 连接失败、超时等，可以重试
+            logger.warning("发送回调失败: %s", e)
+            continue
+        except Exception as e:
+            # 回调失败不应该影响主流程，只记录错误
+            logger.warning("发送回调失败: %s", e)
+            return
+        if response.status_code < 500:
+            return
+        logger.warning("发送回调失败: HTTP %s", response.status_code)
+
+
+class ProgressNotifier:
+    """
+    进度回调的合并发送器（防抖）
+    
+    【为什么需要它？】
+    Agent每轮循环都会更新一次进度，如果每次都直接POST回调，
+    迭代很快时发送回调的时间比实际分析还长。
+    
+    【工作方式】
+    notify()只记录最新的进度并唤醒后台任务，立即返回；
+    后台任务被唤醒后等待COALESCE_SECONDS，把这段时间内的多次更新合并，
+    只发送最后一次。完成/失败等最终状态不走这里，调用方应先aclose()再直接发送。
+    """
+    COALESCE_SECONDS = 0.1
+    
+    def __init__(self, callback_url: str):
+        self.callback_url = callback_url
+        self._latest: Optional[Dict[str, Any]] = None
+        self._event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+    
+    def notify(self, data: Dict[str, Any]):
+        """记录最新进度（覆盖尚未发送的旧进度），第一次调用时启动后台发送任务"""
+        self._latest = data
+        self._event.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def _run(self):
+        while True:
+            await self._event.wait()
+            # 等待一小段时间，让紧接着的更新合并到这一次发送中
+            await asyncio.sleep(self.COALESCE_SECONDS)
+            self._event.clear()
+            data, self._latest = self._latest, None
+            if data is not None:
+                await send_callback(self.callback_url, data)
+    
+    async def aclose(self):
+        """停止后台任务，丢弃尚未发送的进度（随后发送的最终状态会覆盖它）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._latest = None
 
 
 # ============================================================================
@@ -2203,12 +3451,87 @@ async def send_callback(callback_url: str, data: Dict[str, Any]):
 # 主要用于处理特定格式的实验数据，进行线性/非线性分离计算
 # ============================================================================
 
+import tempfile
+
 from fastapi import File, UploadFile
-from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from excel_processor import process_excel_file, CalculationParams
 
-# 存储处理后的文件，用于下载
-processed_files_store: Dict[str, bytes] = {}
+# 处理后的文件写到临时目录，这里只记录 下载ID -> 文件路径
+# （文件内容不常驻内存，上传再多内存也不会一直增长）
+processed_files_store: Dict[str, Path] = {}
+
+# 处理后的文件保留时间（秒），超时由后台清理任务删除
+PROCESSED_FILE_TTL = int(os.getenv("PROCESSED_FILE_TTL", "3600"))
+# 后台清理任务的检查间隔（秒）
+PROCESSED_FILE_SWEEP_INTERVAL = 300
+# 写入和下载文件时每次读写的块大小
+FILE_CHUNK_SIZE = 1 << 20
+
+_sweeper_task: Optional[asyncio.Task] = None
+
+
+def save_processed_file(content: bytes) -> str:
+    """
+    把处理后的Excel内容分块写入临时文件并登记，返回下载ID
+    
+    参数:
+        content: 处理后的Excel文件内容
+        
+    返回:
+        下载ID
+    """
+    import uuid
+    download_id = str(uuid.uuid4())
+    
+    # delete=False: 关闭后文件保留，由下载删除接口或后台清理任务删除
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
+        fd = tmp.fileno()
+        view = memoryview(content)
+        for start in range(0, len(view), FILE_CHUNK_SIZE):
+            os.write(fd, view[start:start + FILE_CHUNK_SIZE])
+    
+    processed_files_store[download_id] = Path(tmp.name)
+    return download_id
+
+
+def remove_processed_file(download_id: str) -> bool:
+    """从登记表中移除下载ID并删除对应的临时文件，返回是否存在该ID"""
+    path = processed_files_store.pop(download_id, None)
+    if path is None:
+        return False
+    path.unlink(missing_ok=True)
+    return True
+
+
+async def sweep_processed_files():
+    """后台任务：定期删除超过保留时间的处理结果文件"""
+    while True:
+        await asyncio.sleep(PROCESSED_FILE_SWEEP_INTERVAL)
+        cutoff = time.time() - PROCESSED_FILE_TTL
+        for download_id, path in list(processed_files_store.items()):
+            try:
+                expired = path.stat().st_mtime < cutoff
+            except FileNotFoundError:
+                expired = True
+            if expired:
+                remove_processed_file(download_id)
+
+
+@app.on_event("startup")
+async def start_processed_file_sweeper():
+    """服务启动时开启处理结果文件的后台清理任务"""
+    global _sweeper_task
+    _sweeper_task = asyncio.create_task(sweep_processed_files())
+
+
+@app.on_event("shutdown")
+async def stop_processed_file_sweeper():
+    """服务关闭时停止清理任务，并删除本进程登记的所有处理结果文件"""
+    if _sweeper_task is not None:
+        _sweeper_task.cancel()
+    for download_id in list(processed_files_store):
+        remove_processed_file(download_id)
 
 
 class ExcelProcessRequest(BaseModel):
@@ -2234,19 +3557,19 @@ async def upload_excel(file: UploadFile = File(...)):
         处理结果，包含下载ID
     """
     try:
-        # 读取文件内容
-        content = await file.read()
+        # 上传的文件已由框架写入临时文件（超过1MB落盘），直接把文件对象交给处理函数，
+        # 不用await file.read()把整个文件读进内存
+        await file.seek(0)
         
         # 处理文件
-        result = process_excel_file(file_content=content)
+        # Excel解析和计算是同步的耗时操作，放到线程池中执行，不阻塞事件循环
+        result = await run_in_threadpool(process_excel_file, file_stream=file.file)
         
         if not result.success:
             return {"success": False, "message": result.message}
         
-        # 生成下载ID并存储处理后的文件
-        import uuid
-        download_id = str(uuid.uuid4())
-        processed_files_store[download_id] = result.output_file
+        # 把处理后的文件写入临时文件，生成下载ID
+        download_id = await run_in_threadpool(save_processed_file, result.output_file)
         
         # 提取结果摘要
         summary = []
@@ -2293,10 +3616,11 @@ async def process_excel_with_params(
         处理结果，包含下载ID
     """
     try:
-        content = await file.read()
+        await file.seek(0)
         
-        result = process_excel_file(
-            file_content=content,
+        result = await run_in_threadpool(
+            process_excel_file,
+            file_stream=file.file,
             slope_b=slope_b,
             slope_e=slope_e
         )
@@ -2304,9 +3628,7 @@ async def process_excel_with_params(
         if not result.success:
             return {"success": False, "message": result.message}
         
-        import uuid
-        download_id = str(uuid.uuid4())
-        processed_files_store[download_id] = result.output_file
+        download_id = await run_in_threadpool(save_processed_file, result.output_file)
         
         summary = []
         if result.data and "results" in result.data:
@@ -2347,21 +3669,21 @@ async def download_processed_excel(download_id: str, filename: str = "processed_
     返回:
         Excel文件流
     """
-    if download_id not in processed_files_store:
+    path = processed_files_store.get(download_id)
+    try:
+        stat_result = path.stat() if path is not None else None
+    except FileNotFoundError:
+        stat_result = None
+    if stat_result is None:
         raise HTTPException(status_code=404, detail="文件不存在或已过期")
     
-    file_content = processed_files_store[download_id]
-    
-    # 创建流式响应
-    from io import BytesIO
-    file_stream = BytesIO(file_content)
-    
-    return StreamingResponse(
-        file_stream,
+    # FileResponse直接从磁盘分块发送（服务器支持时用sendfile零拷贝），
+    # 传入stat_result后立即得到Content-Length，并支持Range断点续传
+    return FileResponse(
+        path,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
+        filename=filename,
+        stat_result=stat_result,
     )
 
 
@@ -2373,8 +3695,7 @@ async def delete_processed_file(download_id: str):
     参数:
         download_id: 下载ID
     """
-    if download_id in processed_files_store:
-        del processed_files_store[download_id]
+    if remove_processed_file(download_id):
         return {"success": True, "message": "文件已删除"}
     return {"success": False, "message": "文件不存在"}
 
@@ -2383,7 +3704,15 @@ async def delete_processed_file(download_id: str):
 # 第6.5部分：报告生成API
 # ============================================================================
 
+from fastapi import Header, Response
 from report_generator import ReportGeneratorAgent, get_agent
+from report_generator.agent import MAX_TASKS_PER_USER, shutdown_report_pool
+
+
+@app.on_event("shutdown")
+async def stop_report_pool():
+    """服务关闭时释放生成报告用的进程池"""
+    shutdown_report_pool()
 
 # 报告生成请求模型
 class ReportGenerateRequest(BaseModel):
@@ -2397,16 +3726,24 @@ class ReportGenerateRequest(BaseModel):
 
 
 @app.post("/api/report/generate")
-async def generate_report(request: ReportGenerateRequest, background_tasks: BackgroundTasks):
+async def generate_report(request: ReportGenerateRequest):
     """
     创建报告生成任务
     
-    这个接口会立即返回任务ID，报告生成在后台进行。
+    这个接口会立即返回任务ID，报告生成在后台作业队列中进行。
     可以通过 /api/report/status/{task_id} 查询进度。
     """
     try:
         agent = get_agent(output_dir="./reports")
         
+        # 每个用户未完成的任务数有上限：后台作业的工作协程只有MAX_BACKGROUND_JOBS个，
+        # 不能让一个用户的任务占满
+        if agent.active_task_count(request.user_id) >= MAX_TASKS_PER_USER:
+            raise HTTPException(
+                status_code=429,
+                detail=f"未完成的报告任务已达上限（{MAX_TASKS_PER_USER}个），请等待已有任务完成"
+            )
+        
         # 创建任务
         task = agent.create_task(
             user_id=request.user_id,
@@ -2417,8 +3754,12 @@ async def generate_report(request: ReportGenerateRequest, background_tasks: Back
             output_format=request.output_format
         )
         
-        # 在后台处理任务
-        background_tasks.add_task(agent.process_task, task.task_id)
+        # 放入后台作业队列处理（队列已满时删除刚创建的任务，不留下永远PENDING的记录）
+        try:
+            submit_background_job(agent.process_task, task.task_id)
+        except HTTPException:
+            agent.discard_task(task.task_id)
+            raise
         
         return {
             "success": True,
@@ -2426,14 +3767,32 @@ async def generate_report(request: ReportGenerateRequest, background_tasks: Back
             "message": "报告生成任务已创建",
             "task": task.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """请求头If-None-Match（可以是逗号分隔的多个ETag或*）是否与etag匹配"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
 @app.get("/api/report/status/{task_id}")
-async def get_report_status(task_id: str):
+async def get_report_status(
+    task_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+):
     """
     查询报告生成任务状态
+    
+    前端会反复轮询此接口。响应带有ETag（任务ID+版本号），
+    前端在If-None-Match中带上上次的ETag时，任务没有变化就直接返回304，
+    不再重新生成和传输任务详情。
     """
     agent = get_agent()
     task = agent.get_task(task_id)
@@ -2441,6 +3800,11 @@ async def get_report_status(task_id: str):
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
     
+    etag = f'W/"{task.task_id}-{task.revision}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
     return {
         "success": True,
         "task": task.to_dict()
@@ -2452,8 +3816,6 @@ async def download_report(task_id: str):
     """
     下载生成的报告
     """
-    from fastapi.responses import FileResponse
-    
     agent = get_agent()
     task = agent.get_task(task_id)
     
@@ -2463,7 +3825,12 @@ async def download_report(task_id: str):
     if task.status.value != "completed":
         raise HTTPException(status_code=400, detail=f"报告尚未生成完成，当前状态: {task.status.value}")
     
-    if not task.output_path or not os.path.exists(task.output_path):
+    # 一次stat同时检查文件是否存在，并传给FileResponse（不再重复stat）
+    try:
+        stat_result = os.stat(task.output_path) if task.output_path else None
+    except FileNotFoundError:
+        stat_result = None
+    if stat_result is None:
         raise HTTPException(status_code=404, detail="报告文件不存在")
     
     filename = os.path.basename(task.output_path)
@@ -2479,18 +3846,31 @@ async def download_report(task_id: str):
     return FileResponse(
         task.output_path,
         media_type=media_type,
-        filename=filename
+        filename=filename,
+        stat_result=stat_result
     )
 
 
 @app.get("/api/report/list/{user_id}")
-async def list_user_reports(user_id: str):
+async def list_user_reports(
+    user_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+):
     """
     获取用户的所有报告任务
+    
+    ETag由所有任务的(任务ID, 版本号)计算，任务列表和各任务都没有变化时返回304
     """
     agent = get_agent()
     tasks = agent.get_user_tasks(user_id)
     
+    versions = ",".join(f"{t.task_id}-{t.revision}" for t in tasks)
+    etag = f'W/"{hashlib.sha1(versions.encode()).hexdigest()}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
     return {
         "success": True,
         "tasks": [t.to_dict() for t in tasks]
@@ -2509,6 +3889,113 @@ class DataAnalysisRequest(BaseModel):
     x_axis: Optional[str] = None
     y_axis: Optional[List[str]] = None
 
+# 图表最多展示的分组数
+TOP_GROUPS = 20
+
+
+def records_to_table(data: List[Dict[str, Any]]):
+    """
+    把请求中的记录列表转换为Arrow表
+    
+    列取所有记录的键的并集，按第一次出现的顺序排列（与pd.DataFrame(data)一致）。
+    按列构造：每列先收集成一个Python列表再交给pa.array，
+    每列只推断一种类型，比把整个记录列表作为结构体数组推断快约20%。
+    没有安装pyarrow，或同一列中混有无法统一的类型（如数字和字符串）时返回None，
+    调用方改用pandas。
+    """
+    if pa is None:
+        return None
+    try:
+        names = dict.fromkeys(chain.from_iterable(data))
+        return pa.table({name: pa.array([record.get(name) for record in data]) for name in names})
+    except (pa.ArrowException, TypeError, ValueError, AttributeError):
+        return None
+
+
+def arrow_column_kinds(table) -> tuple:
+    """
+    按Arrow类型把列分为数值列和分类列（与pandas的select_dtypes结果一致）
+    
+    返回:
+        (数值列列表, 分类列列表)；布尔列和日期时间列两边都不算
+    """
+    numeric_cols, categorical_cols = [], []
+    for field in table.schema:
+        if pa.types.is_integer(field.type) or pa.types.is_floating(field.type):
+            numeric_cols.append(field.name)
+        elif not (pa.types.is_boolean(field.type) or pa.types.is_temporal(field.type)):
+            categorical_cols.append(field.name)
+    return numeric_cols, categorical_cols
+
+
+def top_groups_arrow(table, x_axis: str, y_axis: List[str], k: int = TOP_GROUPS) -> List[Dict[str, Any]]:
+    """
+    按x_axis分组对y_axis求和，返回合计最大的k组（Arrow实现）
+    
+    与 df.groupby(x_axis)[y_axis].sum().reset_index()
+           .sort_values(y_axis[0], ascending=False).head(k).to_dict('records')
+    的结果一致：分组键缺失的记录不参与分组，全部缺失的组合计为0。
+    只对最终的k行转换为Python对象。
+    """
+    table = table.filter(pc.is_valid(table[x_axis]))
+    aggregated = table.group_by(x_axis).aggregate(
+        [(col, "sum", pc.ScalarAggregateOptions(min_count=0)) for col in y_axis]
+    )
+    aggregated = aggregated.select([x_axis] + [f"{col}_sum" for col in y_axis])
+    aggregated = aggregated.rename_columns([x_axis] + y_axis)
+    indices = pc.select_k_unstable(
+        aggregated, k=min(k, aggregated.num_rows),
+        sort_keys=[(y_axis[0] if y_axis else x_axis, "descending")],
+    )
+    return aggregated.take(indices).to_pylist()
+
+
+def group_sum_records(table, key: str, value: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    按key分组对value求和，返回每组一条记录（按分组键升序）
+    
+    与 df.groupby(key)[value].sum().reset_index().to_dict('records') 的结果一致，
+    但不构造DataFrame，也没有groupby每次调用的固定开销：
+    pd.factorize得到分组编号，再由numba内核group_sum一次遍历累加。
+    数据集通常只有几百到几千行，这时groupby的固定开销占了大部分时间。
+    
+    没有安装numba、value不是数值列或分组键无法排序时返回None，调用方改用pandas。
+    """
+    if not HAVE_NUMBA or key == value or key not in table.column_names or value not in table.column_names:
+        return None
+    value_type = table.schema.field(value).type
+    if not (pa.types.is_integer(value_type) or pa.types.is_floating(value_type)):
+        return None
+    # 有缺失值的整数列转换为带NaN的float64（与pandas构造DataFrame时一致）；
+    # 已经是int64/float64时直接使用Arrow零拷贝得到的只读数组
+    values = table[value].to_numpy()
+    values = values.astype(np.int64 if values.dtype.kind == "i" else np.float64, copy=False)
+    try:
+        codes, uniques = pd.factorize(table[key].to_numpy(), sort=True)
+    except TypeError:
+        return None
+    sums = group_sum(codes.astype(np.int64, copy=False), values, len(uniques))
+    return [{key: k, value: v} for k, v in zip(uniques.tolist(), sums.tolist())]
+
+
+def chart_data_payload(records: List[Dict[str, Any]], columns: List[str], compat: bool = False):
+    """
+    把图表数据整理为列式结构 {"columns": [列名...], "data": [[行的值...], ...]}
+    
+    记录列表中每一行都要重复所有列名，列式结构只写一次列名，JSON小很多，
+    前端也不必再按列名逐行取值。compat=True 时仍返回原来的记录列表
+    （兼容旧版前端，保留一个发布周期）。
+    
+    参数:
+        records: 记录列表（图表数据最多TOP_GROUPS行）
+        columns: 列顺序；记录中缺少的列为None
+        compat: 是否返回旧的记录列表格式
+    """
+    if compat:
+        return records
+    return {"columns": columns, "data": [[record.get(col) for col in columns] for record in records]}
+
+
 class ChartGenerationRequest(BaseModel):
     """图表生成请求模型"""
     data: List[Dict[str, Any]]
@@ -2519,10 +4006,13 @@ class ChartGenerationRequest(BaseModel):
     aggregation: str = "sum"
 
 @app.post("/api/data-analysis/analyze")
-async def analyze_data(request: DataAnalysisRequest):
+async def analyze_data(request: DataAnalysisRequest, compat: bool = False):
     """
     智能数据分析API
     根据用户的自然语言提示分析数据并返回结果
+    
+    chart_data为列式结构 {"columns": [xAxis, *yAxis], "data": [[x, y1, ...], ...]}，
+    列名与chart_config中的xAxis/yAxis对应；查询参数 ?compat=true 时返回旧的记录列表
     """
     try:
         data = request.data
@@ -2532,29 +4022,48 @@ async def analyze_data(request: DataAnalysisRequest):
         if not data:
             raise HTTPException(status_code=400, detail="数据不能为空")
         
-        # 转换为DataFrame进行分析
-        df = pd.DataFrame(data)
-        
-        # 获取列信息
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-        categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+        # 优先转换为Arrow列式表（不生成object类型的pandas列），转换失败时使用DataFrame
+        table = records_to_table(data)
+        df = None
+        if table is not None:
+            columns = table.column_names
+            numeric_cols, categorical_cols = arrow_column_kinds(table)
+        else:
+            df = pd.DataFrame(data)
+            columns = df.columns.tolist()
+            numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+            categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
         
         # 自动选择X轴和Y轴
-        x_axis = request.x_axis or (categorical_cols[0] if categorical_cols else df.columns[0])
-        y_axis = request.y_axis or (numeric_cols[:3] if numeric_cols else [df.columns[1]] if len(df.columns) > 1 else [])
+        x_axis = request.x_axis or (categorical_cols[0] if categorical_cols else columns[0])
+        y_axis = request.y_axis or (numeric_cols[:3] if numeric_cols else [columns[1]] if len(columns) > 1 else [])
+        
+        # Arrow只能对数值列求和，Y轴中有非数值列时改用pandas
+        if df is None and not all(col in numeric_cols for col in y_axis):
+            df = pd.DataFrame(data)
         
         # 数据聚合
-        if x_axis in df.columns:
-            aggregated = df.groupby(x_axis)[y_axis].sum().reset_index()
-            aggregated = aggregated.sort_values(by=y_axis[0] if y_axis else x_axis, ascending=False)
-            aggregated = aggregated.head(20)
-            chart_data = aggregated.to_dict('records')
+        if x_axis in columns:
+            if df is None:
+                chart_data = top_groups_arrow(table, x_axis, y_axis)
+            else:
+                aggregated = df.groupby(x_axis)[y_axis].sum().reset_index()
+                aggregated = aggregated.sort_values(by=y_axis[0] if y_axis else x_axis, ascending=False)
+                aggregated = aggregated.head(TOP_GROUPS)
+                chart_data = aggregated.to_dict('records')
+            chart_columns = [x_axis] + list(y_axis)
         else:
-            chart_data = data[:20]
+            chart_data = data[:TOP_GROUPS]
+            chart_columns = list(columns)
         
         # 生成分析摘要
-        total_records = len(df)
-        unique_categories = df[x_axis].nunique() if x_axis in df.columns else 0
+        total_records = len(data)
+        if x_axis not in columns:
+            unique_categories = 0
+        elif df is None:
+            unique_categories = pc.count_distinct(table[x_axis]).as_py()
+        else:
+            unique_categories = df[x_axis].nunique()
         
         summary_parts = [
             f"📊 **数据分析结果**",
@@ -2563,15 +4072,24 @@ async def analyze_data(request: DataAnalysisRequest):
             f"- 按 **{x_axis}** 维度分类，共 **{unique_categories}** 个类别",
         ]
         
-        if y_axis and y_axis[0] in df.columns:
-            max_val = df[y_axis[0]].max()
-            min_val = df[y_axis[0]].min()
-            avg_val = df[y_axis[0]].mean()
-            max_idx = df[y_axis[0]].idxmax()
-            min_idx = df[y_axis[0]].idxmin()
+        if y_axis and y_axis[0] in columns:
+            # 最大值、最小值、平均值及最值所在行在一次统计中全部得到
+            if df is None:
+                values = np.asarray(table[y_axis[0]].to_numpy(), dtype=np.float64)
+            else:
+                values = df[y_axis[0]].to_numpy(dtype=np.float64, na_value=np.nan)
+            _, avg_val, _, min_val, max_val, min_idx, max_idx = summarize_columns(values[:, None])[:, 0]
+            # 与idxmax/idxmin一致：取第一次出现的行（全空列时转换int报错）
+            max_idx, min_idx = int(max_idx), int(min_idx)
             
-            max_item = df.loc[max_idx, x_axis] if x_axis in df.columns else max_idx
-            min_item = df.loc[min_idx, x_axis] if x_axis in df.columns else min_idx
+            if x_axis not in columns:
+                max_item, min_item = max_idx, min_idx
+            elif df is None:
+                max_item = table[x_axis][max_idx].as_py()
+                min_item = table[x_axis][min_idx].as_py()
+            else:
+                max_item = df[x_axis].iloc[max_idx]
+                min_item = df[x_axis].iloc[min_idx]
             
             summary_parts.extend([
                 f"- 分析指标: {', '.join(y_axis)}",
@@ -2581,7 +4099,8 @@ async def analyze_data(request: DataAnalysisRequest):
                 f"- 平均值: **{avg_val:,.2f}**",
             ])
         
-        return {
+        # 直接返回响应对象，跳过jsonable_encoder对结果的逐项遍历（由orjson一次编码）
+        return FastJSONResponse({
             "success": True,
             "summary": "\n".join(summary_parts),
             "chart_config": {
@@ -2592,24 +4111,27 @@ async def analyze_data(request: DataAnalysisRequest):
                 "showLegend": len(y_axis) > 1,
                 "showGrid": True,
             },
-            "chart_data": chart_data,
+            "chart_data": chart_data_payload(chart_data, chart_columns, compat),
             "statistics": {
                 "total_records": total_records,
                 "unique_categories": unique_categories,
                 "numeric_columns": numeric_cols,
                 "categorical_columns": categorical_cols,
             }
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
 
 
 @app.post("/api/data-analysis/compare")
-async def compare_datasets(request: Dict[str, Any]):
+async def compare_datasets(request: Dict[str, Any], compat: bool = False):
     """
     多数据集对比分析API
     对比多个数据集之间的差异
+    
+    chart_data为列式结构 {"columns": [compare_column, value_column, "_source"], "data": [...]}；
+    查询参数 ?compat=true 时返回旧的记录列表
     """
     try:
         datasets = request.get("datasets", [])
@@ -2619,26 +4141,30 @@ async def compare_datasets(request: Dict[str, Any]):
         if len(datasets) < 2:
             raise HTTPException(status_code=400, detail="至少需要2个数据集进行对比")
         
-        results = []
+        chart_data = []
         for i, dataset in enumerate(datasets):
-            df = pd.DataFrame(dataset.get("data", []))
             name = dataset.get("name", f"数据集{i+1}")
             
+            # 数值列的分组求和优先用Arrow表 + numba内核完成，不满足条件时使用pandas
+            table = records_to_table(dataset.get("data", [])) if compare_column else None
+            if table is not None and compare_column in table.column_names:
+                records = group_sum_records(table, compare_column, value_column)
+                if records is not None:
+                    for record in records:
+                        record["_source"] = name
+                    chart_data.extend(records)
+                    continue
+            
+            df = pd.DataFrame(dataset.get("data", []))
             if compare_column and compare_column in df.columns:
                 grouped = df.groupby(compare_column)[value_column].sum().reset_index()
                 grouped["_source"] = name
-                results.append(grouped)
+                chart_data.extend(grouped.to_dict('records'))
         
-        if results:
-            combined = pd.concat(results, ignore_index=True)
-            chart_data = combined.to_dict('records')
-        else:
-            chart_data = []
-        
-        return {
+        return FastJSONResponse({
             "success": True,
             "message": f"成功对比 {len(datasets)} 个数据集",
-            "chart_data": chart_data,
+            "chart_data": chart_data_payload(chart_data, [compare_column, value_column, "_source"], compat),
             "chart_config": {
                 "type": "grouped-bar",
                 "title": "数据集对比分析",
@@ -2647,7 +4173,7 @@ async def compare_datasets(request: Dict[str, Any]):
                 "groupBy": "_source",
                 "showLegend": True,
             }
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"对比分析失败: {str(e)}")
@@ -2671,31 +4197,45 @@ async def get_statistics(request: Dict[str, Any]):
             "columns": []
         }
         
+        # 所有数值列一起转换为按列连续的float64数组，一次算出各列的个数、最值、均值和标准差
+        numeric_cols = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+        summaries = {}
+        if numeric_cols:
+            arr = np.asarray(df[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan), order="F")
+            summary = summarize_columns(arr)
+            summaries = {col: summary[:, j] for j, col in enumerate(numeric_cols)}
+        
         for col in df.columns:
+            summary = summaries.get(col)
+            # 非数值列只做一次哈希计数：缺失值个数、不同值个数和出现最多的值都由它得到
+            # （np.unique需要先排序，对字符串列比哈希计数慢得多）
+            counts = df[col].value_counts(sort=False) if summary is None else None
             col_stats = {
                 "name": col,
                 "type": str(df[col].dtype),
-                "null_count": int(df[col].isnull().sum()),
-                "unique_count": int(df[col].nunique()),
+                # 数值列的缺失值个数直接由统计结果中的有效值个数得到
+                "null_count": len(df) - int(summary[0] if summary is not None else counts.sum()),
+                "unique_count": int(df[col].nunique()) if summary is not None else len(counts),
             }
             
-            if pd.api.types.is_numeric_dtype(df[col]):
+            if summary is not None:
+                _, mean, std, lo, hi = summary[:5]
                 col_stats.update({
-                    "min": float(df[col].min()) if not pd.isna(df[col].min()) else None,
-                    "max": float(df[col].max()) if not pd.isna(df[col].max()) else None,
-                    "mean": float(df[col].mean()) if not pd.isna(df[col].mean()) else None,
-                    "std": float(df[col].std()) if not pd.isna(df[col].std()) else None,
+                    "min": None if np.isnan(lo) else float(lo),
+                    "max": None if np.isnan(hi) else float(hi),
+                    "mean": None if np.isnan(mean) else float(mean),
+                    "std": None if np.isnan(std) else float(std),
                 })
             else:
-                top_values = df[col].value_counts().head(5).to_dict()
+                top_values = counts.nlargest(5).to_dict()
                 col_stats["top_values"] = {str(k): int(v) for k, v in top_values.items()}
             
             stats["columns"].append(col_stats)
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "statistics": stats
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"统计分析失败: {str(e)}")
@@ -2711,6 +4251,58 @@ async def get_statistics(request: Dict[str, Any]):
 from report_generator.gene_editing_processor import GeneEditingProcessor, simplify_gene_editing_file
 from report_generator.mutation_highlighter import highlight_mutations
 
+# ----------------------------------------------------------------------------
+# Excel文件预检
+# ----------------------------------------------------------------------------
+# 化简、排序、高亮等接口会把整个工作簿载入内存，1GB的文件或损坏的文件
+# 要占用工作进程几分钟才会报错。解析之前先做几项不到1毫秒的检查：
+# - 文件大小不超过 MAX_XLSX_SIZE
+# - xlsx必须是zip文件，且包含 xl/workbook.xml（只读zip目录，不解压工作表）
+# - 解压后的总大小不超过 MAX_XLSX_UNCOMPRESSED，且压缩比不超过
+#   MAX_XLSX_COMPRESSION_RATIO（防止zip炸弹；很小的文件不检查压缩比）
+# .xls是旧的二进制格式，不是zip文件，只检查大小
+# ----------------------------------------------------------------------------
+MAX_XLSX_SIZE = int(os.getenv("MAX_XLSX_SIZE", str(100 * 1024 * 1024)))
+MAX_XLSX_UNCOMPRESSED = int(os.getenv("MAX_XLSX_UNCOMPRESSED", str(1024 * 1024 * 1024)))
+MAX_XLSX_COMPRESSION_RATIO = 200
+XLSX_RATIO_CHECK_MIN_SIZE = 10 * 1024 * 1024
+
+
+def validate_xlsx(path) -> None:
+    """
+    解析Excel文件之前的快速检查，不通过时抛出HTTPException
+    
+    参数:
+        path: Excel文件路径（文件不存在时抛出FileNotFoundError）
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        raise HTTPException(status_code=400, detail="文件为空")
+    if size > MAX_XLSX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"文件过大: {size / 1024 / 1024:.1f}MB，最大允许{MAX_XLSX_SIZE / 1024 / 1024:.0f}MB",
+        )
+    if Path(path).suffix.lower() == ".xls":
+        return
+    
+    try:
+        with zipfile.ZipFile(path) as zf:
+            infos = zf.infolist()
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="文件不是有效的xlsx文件")
+    
+    if not any(info.filename == "xl/workbook.xml" for info in infos):
+        raise HTTPException(status_code=400, detail="文件不是有效的xlsx文件: 缺少xl/workbook.xml")
+    
+    uncompressed = sum(info.file_size for info in infos)
+    compressed = sum(info.compress_size for info in infos)
+    if uncompressed > MAX_XLSX_UNCOMPRESSED or (
+        uncompressed > XLSX_RATIO_CHECK_MIN_SIZE
+        and uncompressed > compressed * MAX_XLSX_COMPRESSION_RATIO
+    ):
+        raise HTTPException(status_code=413, detail="文件解压后过大，拒绝处理")
+
 
 class GeneEditingSimplifyRequest(BaseModel):
     """基因编辑数据化简请求"""
@@ -2757,8 +4349,6 @@ async def simplify_gene_editing_data(request: GeneEditingSimplifyRequest):
     - summary: 处理摘要
     - results: 化简结果列表
     """
-    import traceback
-    
     # 【修复】处理文件路径，确保正确编码和规范化
     file_path = request.file_path
     if file_path:
@@ -2772,12 +4362,13 @@ async def simplify_gene_editing_data(request: GeneEditingSimplifyRequest):
     if output_path:
         output_path = os.path.normpath(output_path)
     
-    print(f"[gene-editing/simplify] 收到请求: file_path={file_path}, output_path={output_path}")
-    print(f"[gene-editing/simplify] 路径字节表示: {file_path.encode('utf-8') if file_path else None}")
+    logger.info("[gene-editing/simplify] 收到请求: file_path=%s, output_path=%s", file_path, output_path)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[gene-editing/simplify] 路径字节表示: %r", file_path.encode('utf-8') if file_path else None)
     
     # 验证文件路径
     if not file_path:
-        print("[gene-editing/simplify] 错误: 缺少file_path参数")
+        logger.warning("[gene-editing/simplify] 错误: 缺少file_path参数")
         raise HTTPException(status_code=400, detail="缺少file_path参数")
     
     # 检查文件是否存在（使用pathlib处理Unicode路径）
@@ -2785,30 +4376,31 @@ async def simplify_gene_editing_data(request: GeneEditingSimplifyRequest):
     path_obj = Path(file_path)
     
     if not path_obj.exists():
-        print(f"[gene-editing/simplify] 错误: 文件不存在 - {file_path}")
-        print(f"[gene-editing/simplify] 尝试的路径: {path_obj.absolute()}")
+        logger.warning("[gene-editing/simplify] 错误: 文件不存在 - %s（尝试的路径: %s）", file_path, path_obj.absolute())
         raise HTTPException(status_code=404, detail=f"文件不存在: {file_path}")
     
     # 检查文件扩展名
     file_ext = path_obj.suffix.lower()
     if file_ext not in ['.xlsx', '.xls']:
-        print(f"[gene-editing/simplify] 错误: 不支持的文件格式 - {file_ext}")
+        logger.warning("[gene-editing/simplify] 错误: 不支持的文件格式 - %s", file_ext)
         raise HTTPException(status_code=400, detail=f"不支持的文件格式: {file_ext}，请上传Excel文件(.xlsx或.xls)")
     
+    # 解析前检查文件大小和zip结构
+    validate_xlsx(path_obj)
+    
     try:
-        print(f"[gene-editing/simplify] 开始处理文件: {file_path}")
+        logger.info("[gene-editing/simplify] 开始处理文件: %s", file_path)
         result = simplify_gene_editing_file(str(path_obj), output_path)
-        print(f"[gene-editing/simplify] 处理成功, 结果条数: {result.get('total_entries', 0)}")
+        logger.info("[gene-editing/simplify] 处理成功, 结果条数: %s", result.get('total_entries', 0))
         return result
     except FileNotFoundError as e:
-        print(f"[gene-editing/simplify] FileNotFoundError: {e}")
+        logger.warning("[gene-editing/simplify] FileNotFoundError: %s", e)
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
-        print(f"[gene-editing/simplify] ValueError: {e}")
+        logger.warning("[gene-editing/simplify] ValueError: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"[gene-editing/simplify] Exception: {e}")
-        traceback.print_exc()
+        logger.exception("[gene-editing/simplify] Exception: %s", e)
         raise HTTPException(status_code=500, detail=f"数据化简失败: {str(e)}")
 
 
@@ -2840,11 +4432,10 @@ async def sort_gene_editing_data(request: GeneEditingSortRequest):
     - total_groups: 序列组数量
     - message: 处理信息
     """
-    import traceback
     from pathlib import Path
     from report_generator.gene_editing_processor import sort_gene_editing_file
     
-    print(f"[gene-editing/sort] 收到请求: file_path={request.file_path}")
+    logger.info("[gene-editing/sort] 收到请求: file_path=%s", request.file_path)
     
     # 验证文件路径
     if not request.file_path:
@@ -2855,7 +4446,7 @@ async def sort_gene_editing_data(request: GeneEditingSortRequest):
     path_obj = Path(file_path)
     
     if not path_obj.exists():
-        print(f"[gene-editing/sort] 错误: 文件不存在 - {file_path}")
+        logger.warning("[gene-editing/sort] 错误: 文件不存在 - %s", file_path)
         raise HTTPException(status_code=404, detail=f"文件不存在: {file_path}")
     
     # 检查文件扩展名
@@ -2863,8 +4454,11 @@ async def sort_gene_editing_data(request: GeneEditingSortRequest):
     if file_ext not in ['.xlsx', '.xls']:
         raise HTTPException(status_code=400, detail=f"不支持的文件格式: {file_ext}")
     
+    # 解析前检查文件大小和zip结构
+    validate_xlsx(path_obj)
+    
     try:
-        print(f"[gene-editing/sort] 开始处理文件: {file_path}")
+        logger.info("[gene-editing/sort] 开始处理文件: %s", file_path)
         
         # 生成输出路径
         output_path = request.output_path
@@ -2873,20 +4467,19 @@ async def sort_gene_editing_data(request: GeneEditingSortRequest):
             base_name = os.path.splitext(original_name)[0]
             output_dir = os.path.dirname(file_path)
             output_path = os.path.join(output_dir, f"{base_name}_sorted.xlsx")
-            print(f"[gene-editing/sort] 使用原始文件名生成输出路径: {output_path}")
+            logger.info("[gene-editing/sort] 使用原始文件名生成输出路径: %s", output_path)
         
         result = sort_gene_editing_file(str(path_obj), output_path)
-        print(f"[gene-editing/sort] 处理成功, 序列组数: {result.get('total_groups', 0)}")
+        logger.info("[gene-editing/sort] 处理成功, 序列组数: %s", result.get('total_groups', 0))
         return result
     except FileNotFoundError as e:
-        print(f"[gene-editing/sort] FileNotFoundError: {e}")
+        logger.warning("[gene-editing/sort] FileNotFoundError: %s", e)
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
-        print(f"[gene-editing/sort] ValueError: {e}")
+        logger.warning("[gene-editing/sort] ValueError: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"[gene-editing/sort] Exception: {e}")
-        traceback.print_exc()
+        logger.exception("[gene-editing/sort] Exception: %s", e)
         raise HTTPException(status_code=500, detail=f"数据排序失败: {str(e)}")
 
 
@@ -2916,10 +4509,9 @@ async def highlight_mutation_data(request: MutationHighlightRequest):
     - color_statistics: 颜色统计
     - mutation_statistics: 突变类型统计
     """
-    import traceback
     from pathlib import Path
     
-    print(f"[gene-editing/highlight] 收到请求: file_path={request.file_path}")
+    logger.info("[gene-editing/highlight] 收到请求: file_path=%s", request.file_path)
     
     # 验证文件路径
     if not request.file_path:
@@ -2930,7 +4522,7 @@ async def highlight_mutation_data(request: MutationHighlightRequest):
     path_obj = Path(file_path)
     
     if not path_obj.exists():
-        print(f"[gene-editing/highlight] 错误: 文件不存在 - {file_path}")
+        logger.warning("[gene-editing/highlight] 错误: 文件不存在 - %s", file_path)
         raise HTTPException(status_code=404, detail=f"文件不存在: {file_path}")
     
     # 检查文件扩展名
@@ -2938,8 +4530,11 @@ async def highlight_mutation_data(request: MutationHighlightRequest):
     if file_ext not in ['.xlsx', '.xls']:
         raise HTTPException(status_code=400, detail=f"不支持的文件格式: {file_ext}")
     
+    # 解析前检查文件大小和zip结构
+    validate_xlsx(path_obj)
+    
     try:
-        print(f"[gene-editing/highlight] 开始处理文件: {file_path}")
+        logger.info("[gene-editing/highlight] 开始处理文件: %s", file_path)
         
         # 【新增】如果提供了原始文件名，使用它来生成输出路径
         output_path = request.output_path
@@ -2949,29 +4544,28 @@ async def highlight_mutation_data(request: MutationHighlightRequest):
             base_name = os.path.splitext(original_name)[0]
             output_dir = os.path.dirname(file_path)
             output_path = os.path.join(output_dir, f"{base_name}_highlighted.xlsx")
-            print(f"[gene-editing/highlight] 使用原始文件名生成输出路径: {output_path}")
+            logger.info("[gene-editing/highlight] 使用原始文件名生成输出路径: %s", output_path)
         
         result = highlight_mutations(
             str(path_obj), 
             output_path,
             request.target_sequence
         )
-        print(f"[gene-editing/highlight] 处理成功, 高亮行数: {result.get('total_highlighted', 0)}")
+        logger.info("[gene-editing/highlight] 处理成功, 高亮行数: %s", result.get('total_highlighted', 0))
         return result
     except FileNotFoundError as e:
-        print(f"[gene-editing/highlight] FileNotFoundError: {e}")
+        logger.warning("[gene-editing/highlight] FileNotFoundError: %s", e)
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
-        print(f"[gene-editing/highlight] ValueError: {e}")
+        logger.warning("[gene-editing/highlight] ValueError: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"[gene-editing/highlight] Exception: {e}")
-        traceback.print_exc()
+        logger.exception("[gene-editing/highlight] Exception: %s", e)
         raise HTTPException(status_code=500, detail=f"突变高亮处理失败: {str(e)}")
 
 
 @app.post("/api/gene-editing/analyze")
-async def analyze_gene_editing_data(request: GeneEditingAnalyzeRequest, background_tasks: BackgroundTasks):
+async def analyze_gene_editing_data(request: GeneEditingAnalyzeRequest):
     """
     基因编辑数据分析API
     
@@ -2989,24 +4583,22 @@ async def analyze_gene_editing_data(request: GeneEditingAnalyzeRequest, backgrou
     - domain: 分析领域（默认gene_editing）
     """
     # 初始化任务状态
-    tasks_store[request.task_id] = {
-        "status": TaskStatus.PENDING,
-        "progress": 0,
-        "result": None,
-        "error": None,
-        "domain": request.domain
-    }
+    await tasks_store.set(request.task_id, TaskState(domain=request.domain))
     
-    # 在后台执行分析
-    background_tasks.add_task(
-        run_gene_editing_analysis,
-        request.task_id,
-        request.file_path,
-        request.file_name,
-        request.user_query,
-        request.callback_url,
-        request.domain
-    )
+    # 放入后台作业队列执行分析
+    try:
+        submit_background_job(
+            run_gene_editing_analysis,
+            request.task_id,
+            request.file_path,
+            request.file_name,
+            request.user_query,
+            request.callback_url,
+            request.domain
+        )
+    except HTTPException:
+        await tasks_store.delete(request.task_id)
+        raise
     
     return {
         "task_id": request.task_id,
@@ -3015,6 +4607,65 @@ async def analyze_gene_editing_data(request: GeneEditingAnalyzeRequest, backgrou
     }
 
 
+# ----------------------------------------------------------------------------
+# Excel解析进程池
+# ----------------------------------------------------------------------------
+# ExcelParser.parse是纯CPU操作，且pandas/openpyxl解析xlsx时大部分时间持有GIL，
+# 放在线程池中仍会拖慢事件循环，所以交给独立的进程解析。
+# 子进程用spawn方式启动：主进程中已经有numba线程池等线程，fork出的子进程可能死锁。
+# 进程池在服务启动时创建（子进程在第一次提交任务时才启动），关闭时释放。
+# ----------------------------------------------------------------------------
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+parse_pool: Optional[ProcessPoolExecutor] = None
+
+
+@app.on_event("startup")
+async def start_parse_pool():
+    """服务启动时创建Excel解析进程池"""
+    global parse_pool
+    parse_pool = ProcessPoolExecutor(
+        max_workers=PARSE_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+@app.on_event("shutdown")
+async def stop_parse_pool():
+    """服务关闭时释放Excel解析进程池"""
+    global parse_pool
+    if parse_pool is not None:
+        parse_pool.shutdown(wait=False, cancel_futures=True)
+        parse_pool = None
+
+
+async def parse_excel_off_loop(parser, file_path: str):
+    """
+    在进程池中解析Excel文件（进程池未创建时使用线程池）
+    
+    参数:
+        parser: ExcelParser实例（连同解析结果一起在进程间pickle传递）
+        file_path: Excel文件路径
+    返回:
+        ExcelData解析结果
+    """
+    if parse_pool is None:
+        return await run_in_threadpool(parser.parse, file_path)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(parse_pool, parser.parse, file_path)
+
+
+@lru_cache(maxsize=8)
+def get_domain_analyzer(domain: str):
+    """
+    按分析领域缓存DataAnalyzer实例
+    
+    DataAnalyzer只保存LLM配置和无状态的解析器，不保存单次分析的状态，可以在任务之间共用
+    """
+    from report_generator.data_analyzer import DataAnalyzer
+    return DataAnalyzer(domain=domain)
+
+
 async def run_gene_editing_analysis(
     task_id: str,
     file_path: str,
@@ -3028,49 +4679,42 @@ async def run_gene_editing_analysis(
     """
     try:
         # 更新状态为处理中
-        tasks_store[task_id]["status"] = TaskStatus.PROCESSING
-        tasks_store[task_id]["progress"] = 10
+        await tasks_store.update(task_id, status=TaskStatus.PROCESSING, progress=10)
         
-        # 创建领域特定的分析器
-        from report_generator.data_analyzer import DataAnalyzer
+        # 获取领域特定的分析器
         from report_generator.excel_parser import ExcelParser
         
-        analyzer = DataAnalyzer(domain=domain)
+        analyzer = get_domain_analyzer(domain)
         parser = ExcelParser()
         
-        # 解析Excel文件
-        tasks_store[task_id]["progress"] = 30
-        excel_data = parser.parse(file_path)
+        # 解析Excel文件（CPU密集操作，放到进程池中执行，不阻塞事件循环）
+        await tasks_store.update(task_id, progress=30)
+        excel_data = await parse_excel_off_loop(parser, file_path)
         
         # 执行分析
-        tasks_store[task_id]["progress"] = 50
+        await tasks_store.update(task_id, progress=50)
         result = await analyzer.analyze(excel_data, user_query)
         
         # 更新状态为完成
-        tasks_store[task_id]["status"] = TaskStatus.COMPLETED
-        tasks_store[task_id]["progress"] = 100
-        tasks_store[task_id]["result"] = result.to_dict()
+        await tasks_store.complete(task_id, result.to_dict())
         
-        # 发送回调
+        # 发送回调（使用共享的HTTP客户端，失败时重试）
         if callback_url:
-            async with httpx.AsyncClient() as client:
-                await client.post(callback_url, json={
-                    "task_id": task_id,
-                    "status": "completed",
-                    "result": result.to_dict()
-                })
+            await send_callback(callback_url, {
+                "task_id": task_id,
+                "status": "completed",
+                "result": result.to_dict()
+            }, retries=CALLBACK_RETRIES)
                 
     except Exception as e:
-        tasks_store[task_id]["status"] = TaskStatus.FAILED
-        tasks_store[task_id]["error"] = str(e)
+        await tasks_store.fail(task_id, str(e))
         
         if callback_url:
-            async with httpx.AsyncClient() as client:
-                await client.post(callback_url, json={
-                    "task_id": task_id,
-                    "status": "failed",
-                    "error": str(e)
-                })
+            await send_callback(callback_url, {
+                "task_id": task_id,
+                "status": "failed",
+                "error": str(e)
+            }, retries=CALLBACK_RETRIES)
 
 
 @app.post("/api/gene-editing/extract-sequences")
@@ -3092,6 +4736,9 @@ async def extract_target_sequences(request: Dict[str, Any]):
         if not file_path:
             raise HTTPException(status_code=400, detail="file_path不能为空")
         
+        # 解析前检查文件大小和zip结构
+        validate_xlsx(file_path)
+        
         processor = GeneEditingProcessor()
         entries_by_id = processor.parse_gene_editing_file(file_path)
         
@@ -3120,6 +4767,8 @@ async def extract_target_sequences(request: Dict[str, Any]):
             "sequences": sequences
         }
         
+    except HTTPException:
+        raise
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"文件不存在")
     except Exception as e:
@@ -3152,17 +4801,20 @@ async def download_file(path: str):
     - 文件下载响应
     """
     import os
+    import stat
     
     # 验证文件路径
     if not path:
         raise HTTPException(status_code=400, detail="文件路径不能为空")
     
-    # 检查文件是否存在
-    if not os.path.exists(path):
+    # 检查文件是否存在（stat结果传给FileResponse，不再重复stat）
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"文件不存在: {path}")
     
     # 检查是否是文件（不是目录）
-    if not os.path.isfile(path):
+    if not stat.S_ISREG(stat_result.st_mode):
         raise HTTPException(status_code=400, detail="路径不是有效的文件")
     
     # 获取文件名
@@ -3172,7 +4824,8 @@ async def download_file(path: str):
     return FileResponse(
         path=path,
         filename=filename,
-        media_type="application/octet-stream"
+        media_type="application/octet-stream",
+        stat_result=stat_result
     )
 
 
@@ -3195,31 +4848,22 @@ async def call_llm_for_article(prompt: str, system_prompt: str) -> str:
         return None
     
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                f"{LLM_API_URL}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {LLM_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": LLM_MODEL,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.3
-                }
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
-            else:
-                print(f"LLM API错误: {response.status_code}")
-                return None
+        return await cached_llm_call(
+            {
+                "model": LLM_MODEL,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                "temperature": 0.3
+            },
+            timeout=120.0
+        )
+    except httpx.HTTPStatusError as e:
+        logger.warning("LLM API错误: %s", e.response.status_code)
+        return None
     except Exception as e:
-        print(f"LLM调用失败: {e}")
+        logger.warning("LLM调用失败: %s", e)
         return None
 
 @app.post("/api/article/extract")
@@ -6,10 +6,19 @@
 import os
 import uuid
 import asyncio
-from typing import Dict, List, Any, Optional
+import multiprocessing
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+try:
+    from cachetools import TTLCache
+except ImportError:
+    TTLCache = None
 
 from .excel_parser import ExcelParser, ExcelData
 from .data_analyzer import DataAnalyzer, AnalysisResult
@@ -19,6 +28,53 @@ from .report_builder import (
 )
 
 
+# 同一任务同时解析的文件数上限（避免多个大文件同时读盘、同时占用内存）
+MAX_PARALLEL_PARSES = min(8, os.cpu_count() or 1)
+
+# 任务记录最多保存的个数和保存时间（秒），超出后最早的任务被移除
+TASKS_MAXSIZE = int(os.getenv("REPORT_TASKS_MAXSIZE", "1000"))
+TASKS_TTL = int(os.getenv("REPORT_TASKS_TTL", "86400"))
+
+# 每个用户未完成（排队中或处理中）的任务数上限，在提交任务时检查，
+# 避免一个用户的大量任务占满后台作业队列的工作协程
+MAX_TASKS_PER_USER = int(os.getenv("REPORT_MAX_TASKS_PER_USER", "3"))
+
+# 阶段内部的进度（如逐个文件的解析进度）最多每隔多少秒写入任务一次
+PROGRESS_FLUSH_INTERVAL = 0.25
+
+# 输出格式 -> 报告文件扩展名（其他格式都按Word生成）
+_EXT_MAP = {"ppt": "pptx", "word": "docx"}
+
+# 生成Word/PPT文件的进程数：python-docx/python-pptx的序列化是纯Python的CPU操作，
+# 在事件循环或线程池中执行都会因为GIL拖慢其他请求，所以交给独立的进程
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", str(max(1, (os.cpu_count() or 1) // 2))))
+
+_report_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_report_pool() -> ProcessPoolExecutor:
+    """
+    获取生成报告用的进程池（第一次使用时创建，所有Agent实例共用）
+    
+    子进程用spawn方式启动：主进程中已经有numba线程池等线程，fork出的子进程可能死锁
+    """
+    global _report_pool
+    if _report_pool is None:
+        _report_pool = ProcessPoolExecutor(
+            max_workers=REPORT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _report_pool
+
+
+def shutdown_report_pool():
+    """释放生成报告用的进程池（服务关闭时调用）"""
+    global _report_pool
+    if _report_pool is not None:
+        _report_pool.shutdown(wait=False, cancel_futures=True)
+        _report_pool = None
+
+
 class TaskStatus(str, Enum):
     """任务状态"""
     PENDING = "pending"
@@ -48,6 +104,14 @@ class ReportTask:
     analysis_result: Optional[AnalysisResult] = None
     output_path: Optional[str] = None
     error_message: Optional[str] = None
+    # 版本号：任务的任何字段被修改后加1（状态查询接口据此生成ETag）
+    revision: int = 0
+    
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # __init__给revision赋值之前的字段赋值不计数
+        if name != "revision" and "revision" in self.__dict__:
+            self.__dict__["revision"] += 1
     
     def to_dict(self) -> Dict:
         return {
@@ -75,7 +139,16 @@ class ReportGeneratorAgent:
         self.output_dir = output_dir
         self.parser = ExcelParser()
         self.analyzer = DataAnalyzer()
-        self.tasks: Dict[str, ReportTask] = {}
+        # 任务记录有数量和时间上限（没有安装cachetools时退化为普通dict）
+        if TTLCache is not None:
+            self.tasks: Dict[str, ReportTask] = TTLCache(maxsize=TASKS_MAXSIZE, ttl=TASKS_TTL)
+        else:
+            self.tasks = {}
+        # 用户ID -> 任务ID集合，查询用户任务时不必遍历所有任务
+        self.user_index: Dict[str, Set[str]] = defaultdict(set)
+        
+        # 任务ID -> 尚未写入任务的 (进度, 进度说明)，由心跳协程定期写入
+        self._pending_progress: Dict[str, Tuple[int, str]] = {}
         
         # 确保输出目录存在
         os.makedirs(output_dir, exist_ok=True)
@@ -103,7 +176,7 @@ class ReportGeneratorAgent:
         Returns:
             ReportTask: 创建的任务
         """
-        task_id = str(uuid.uuid4())
+        task_id = uuid.uuid4().hex
         now = datetime.now()
         
         task = ReportTask(
@@ -122,20 +195,60 @@ class ReportGeneratorAgent:
         )
         
         self.tasks[task_id] = task
+        self.user_index[user_id].add(task_id)
         return task
     
     def get_task(self, task_id: str) -> Optional[ReportTask]:
         """获取任务"""
         return self.tasks.get(task_id)
     
+    def discard_task(self, task_id: str):
+        """删除任务记录（任务没能进入处理队列时调用）"""
+        task = self.tasks.pop(task_id, None)
+        if task is None:
+            return
+        task_ids = self.user_index.get(task.user_id)
+        if task_ids is not None:
+            task_ids.discard(task_id)
+            if not task_ids:
+                del self.user_index[task.user_id]
+    
     def get_user_tasks(self, user_id: str) -> List[ReportTask]:
-        """获取用户的所有任务"""
-        return [t for t in self.tasks.values() if t.user_id == user_id]
+        """
+        获取用户的所有任务（按创建时间排序）
+        
+        索引中已被移除（过期或超出数量上限）的任务ID在这里顺便清理
+        """
+        task_ids = self.user_index.get(user_id)
+        if not task_ids:
+            return []
+        
+        tasks = []
+        for task_id in list(task_ids):
+            task = self.tasks.get(task_id)
+            if task is None:
+                task_ids.discard(task_id)
+            else:
+                tasks.append(task)
+        if not task_ids:
+            del self.user_index[user_id]
+        tasks.sort(key=lambda t: t.created_at)
+        return tasks
+    
+    def active_task_count(self, user_id: str) -> int:
+        """用户未完成（排队中或处理中）的任务数"""
+        return sum(
+            1 for t in self.get_user_tasks(user_id)
+            if t.status not in (TaskStatus.COMPLETED, TaskStatus.FAILED)
+        )
     
     async def process_task(self, task_id: str) -> ReportTask:
         """
         处理报告生成任务
         
+        同时处理的任务数由调用方（后台作业队列的工作协程数）限制；
+        处理期间由心跳协程写入阶段内部的进度。
+        
         Args:
             task_id: 任务ID
             
@@ -146,6 +259,15 @@ class ReportGeneratorAgent:
         if not task:
             raise ValueError(f"任务不存在: {task_id}")
         
+        heartbeat = asyncio.create_task(self._heartbeat(task))
+        try:
+            return await self._run_stages(task)
+        finally:
+            heartbeat.cancel()
+            self._pending_progress.pop(task.task_id, None)
+    
+    async def _run_stages(self, task: ReportTask) -> ReportTask:
+        """依次执行任务的各个阶段"""
         try:
             # 阶段1: 解析Excel文件
             await self._parse_excel_files(task)
@@ -162,6 +284,10 @@ class ReportGeneratorAgent:
             task.progress_message = "报告生成完成"
             task.updated_at = datetime.now()
             
+            # 报告已写入output_path，释放解析数据和分析结果占用的内存
+            task.excel_data = []
+            task.analysis_result = None
+            
         except Exception as e:
             task.status = TaskStatus.FAILED
             task.error_message = str(e)
@@ -171,28 +297,59 @@ class ReportGeneratorAgent:
         
         return task
     
+    def _report_progress(self, task: ReportTask, progress: int, message: str):
+        """记录阶段内部的进度（只保存最新一次，由心跳协程写入任务）"""
+        self._pending_progress[task.task_id] = (progress, message)
+    
+    def _discard_progress(self, task: ReportTask):
+        """丢弃尚未写入的进度（阶段结束时调用，避免旧进度覆盖之后的状态）"""
+        self._pending_progress.pop(task.task_id, None)
+    
+    async def _heartbeat(self, task: ReportTask):
+        """每隔PROGRESS_FLUSH_INTERVAL秒把最新的进度写入任务"""
+        while True:
+            await asyncio.sleep(PROGRESS_FLUSH_INTERVAL)
+            pending = self._pending_progress.pop(task.task_id, None)
+            if pending is not None:
+                task.progress, task.progress_message = pending
+                task.updated_at = datetime.now()
+    
     async def _parse_excel_files(self, task: ReportTask):
-        """解析Excel文件"""
+        """
+        解析Excel文件
+        
+        各文件相互独立，在线程中并发解析（最多MAX_PARALLEL_PARSES个同时进行），
+        不阻塞事件循环；结果按task.excel_files的顺序返回。
+        """
         task.status = TaskStatus.PARSING
         task.progress = 10
         task.progress_message = "正在解析Excel文件..."
         task.updated_at = datetime.now()
         
-        excel_data_list = []
         total_files = len(task.excel_files)
+        semaphore = asyncio.Semaphore(MAX_PARALLEL_PARSES)
+        parsed_count = 0
         
-        for i, filepath in enumerate(task.excel_files):
-            task.progress_message = f"正在解析文件 ({i+1}/{total_files}): {os.path.basename(filepath)}"
-            task.progress = 10 + int(20 * (i + 1) / total_files)
-            task.updated_at = datetime.now()
-            
-            try:
-                data = self.parser.parse(filepath)
-                excel_data_list.append(data)
-            except Exception as e:
-                raise ValueError(f"解析文件失败 {filepath}: {str(e)}")
+        async def parse_one(filepath: str) -> ExcelData:
+            nonlocal parsed_count
+            async with semaphore:
+                try:
+                    data = await asyncio.to_thread(self.parser.parse, filepath)
+                except Exception as e:
+                    raise ValueError(f"解析文件失败 {filepath}: {str(e)}")
+            # 回到事件循环后再记录进度，协程之间不会同时修改
+            parsed_count += 1
+            self._report_progress(
+                task,
+                10 + int(20 * parsed_count / total_files),
+                f"已解析文件 ({parsed_count}/{total_files}): {os.path.basename(filepath)}"
+            )
+            return data
+        
+        excel_data_list = await asyncio.gather(*(parse_one(fp) for fp in task.excel_files))
+        self._discard_progress(task)
         
-        task.excel_data = excel_data_list
+        task.excel_data = list(excel_data_list)
         task.progress = 30
         task.progress_message = f"已解析 {len(excel_data_list)} 个文件"
     
@@ -206,13 +363,7 @@ class ReportGeneratorAgent:
         if not task.excel_data:
             raise ValueError("没有可分析的数据")
         
-        # 合并所有Excel数据的上下文
-        combined_context = []
-        for data in task.excel_data:
-            context = self.parser.get_analysis_context(data)
-            combined_context.append(context)
-        
-        # 分析第一个文件（主要数据源）
+        # 分析第一个文件（主要数据源），分析上下文由分析器从ExcelData生成
         # TODO: 支持多文件综合分析
         task.progress = 50
         task.progress_message = "正在进行智能分析..."
@@ -228,11 +379,12 @@ class ReportGeneratorAgent:
         task.progress_message = "数据分析完成"
     
     async def _generate_report(self, task: ReportTask):
-        """生成报告"""
+        """生成报告（在进程池中写文件，分析结果和配置pickle后传给子进程）"""
         task.status = TaskStatus.GENERATING
         task.progress = 75
         task.progress_message = "正在生成报告..."
-        task.updated_at = datetime.now()
+        now = datetime.now()
+        task.updated_at = now
         
         if not task.analysis_result:
             raise ValueError("没有分析结果")
@@ -245,8 +397,8 @@ class ReportGeneratorAgent:
         )
         
         # 生成输出文件名
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        ext = "pptx" if task.output_format == "ppt" else "docx"
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
+        ext = _EXT_MAP.get(task.output_format, "docx")
         filename = f"report_{task.task_id[:8]}_{timestamp}.{ext}"
         output_path = os.path.join(self.output_dir, filename)
         
@@ -254,7 +406,10 @@ class ReportGeneratorAgent:
         task.progress_message = f"正在生成{task.output_format.upper()}报告..."
         
         # 生成报告
-        result_path = create_report(
+        loop = asyncio.get_running_loop()
+        result_path = await loop.run_in_executor(
+            get_report_pool(),
+            create_report,
             task.analysis_result,
             output_path,
             config,
@@ -266,16 +421,24 @@ class ReportGeneratorAgent:
         task.progress_message = "报告生成完成，正在保存..."
 
 
-# 全局Agent实例
-_agent_instance: Optional[ReportGeneratorAgent] = None
+@lru_cache(maxsize=None)
+def _agent_for_dir(output_dir: str) -> ReportGeneratorAgent:
+    """
+    每个输出目录一个Agent实例（output_dir已规范化为绝对路径）
+    
+    不限制个数：实例被淘汰后再次获取会新建一个，原实例中的任务记录就查不到了
+    """
+    return ReportGeneratorAgent(output_dir)
 
 
 def get_agent(output_dir: str = "./reports") -> ReportGeneratorAgent:
-    """获取Agent单例"""
-    global _agent_instance
-    if _agent_instance is None:
-        _agent_instance = ReportGeneratorAgent(output_dir)
-    return _agent_instance
+    """
+    获取Agent单例
+    
+    同一输出目录的所有调用（无论是否传参、相对还是绝对路径）返回同一个实例，
+    任务记录保存在实例中，创建任务和查询状态必须用同一个实例。
+    """
+    return _agent_for_dir(os.path.abspath(output_dir))
 
 
 async def generate_report(
@@ -0,0 +1,257 @@
+"""
+解析结果缓存
+同一个上传文件会被多个接口反复解析（报告生成、基因编辑分析等），
+按文件指纹缓存解析结果，第二次起直接读取缓存，不再重新解析Excel
+
+后端：
+- 设置了 REDIS_URL 且安装了redis库时使用Redis，多个worker/副本共享缓存
+- 否则使用进程内的TTLCache（需要cachetools）；设置了 PARSE_CACHE_DIR 时
+  结果还会写入该目录，服务重启或多个worker之间也能命中
+- 两者都不可用时不缓存
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+try:
+    from cachetools import TTLCache
+except ImportError:
+    TTLCache = None
+
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+PARSE_CACHE_TTL = int(os.getenv("PARSE_CACHE_TTL", "3600"))
+# 进程内缓存最多保存的解析结果数
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "32"))
+# 进程内缓存的磁盘目录（为空时只保存在内存中）
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", "")
+
+# 文件指纹读取开头和结尾各这么多字节
+FINGERPRINT_CHUNK = 64 * 1024
+# zip文件（xlsx）的开头标志
+ZIP_MAGIC = b"PK"
+# 同一个键同时只有一个调用方在解析，其余等待；锁最长持有时间（秒）
+LOCK_TIMEOUT = 60
+LOCK_POLL_INTERVAL = 0.05
+
+
+def file_fingerprint(filepath: str) -> str:
+    """
+    计算文件指纹：文件大小 + 开头和结尾各64KiB的SHA1
+
+    xlsx是zip文件，结尾的中央目录里记录了每个成员的CRC32，
+    内容有任何变化都会体现在结尾，不必对整个文件计算哈希。
+    不是zip的文件（如OLE2格式的xls）没有这样的目录，对整个文件计算哈希。
+    同一文件（路径、修改时间、大小都不变）的指纹只读取计算一次。
+    """
+    st = os.stat(filepath)
+    return _fingerprint(os.path.abspath(filepath), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=256)
+def _fingerprint(filepath: str, mtime_ns: int, size: int) -> str:
+    """按 (路径, 修改时间, 大小) 缓存的文件指纹"""
+    digest = hashlib.sha1(str(size).encode())
+    with open(filepath, "rb") as f:
+        head = f.read(FINGERPRINT_CHUNK)
+        digest.update(head)
+        if not head.startswith(ZIP_MAGIC):
+            # 非zip文件：中间部分的变化不会体现在开头和结尾，读取剩余全部内容
+            hashlib.file_digest(f, lambda: digest)
+        elif size > FINGERPRINT_CHUNK:
+            f.seek(max(size - FINGERPRINT_CHUNK, FINGERPRINT_CHUNK))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class _LocalBackend:
+    """
+    进程内缓存后端（保存pickle后的字节，每次读取得到独立的副本）
+
+    设置了cache_dir时同时写入 {cache_dir}/{键的SHA1}.pkl，
+    内存中没有的键再查磁盘（按文件修改时间判断是否过期）
+    """
+
+    def __init__(self, cache_dir: str = ""):
+        self._cache = TTLCache(maxsize=PARSE_CACHE_SIZE, ttl=PARSE_CACHE_TTL)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self._dir = Path(cache_dir) if cache_dir else None
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._guard:
+            value = self._cache.get(key)
+        if value is None and self._dir is not None:
+            value = self._read_disk(key)
+            if value is not None:
+                with self._guard:
+                    self._cache[key] = value
+        return value
+
+    def set(self, key: str, value: bytes, ttl: int):
+        with self._guard:
+            self._cache[key] = value
+        if self._dir is not None:
+            self._write_disk(key, value)
+
+    def _disk_path(self, key: str) -> Path:
+        return self._dir / f"{hashlib.sha1(key.encode()).hexdigest()}.pkl"
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        """读取磁盘缓存，不存在或已过期时返回None"""
+        cache_file = self._disk_path(key)
+        try:
+            if time.time() - cache_file.stat().st_mtime > PARSE_CACHE_TTL:
+                return None
+            return cache_file.read_bytes()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, value: bytes):
+        """写入磁盘缓存（先写临时文件再改名，其他进程不会读到写了一半的文件）"""
+        cache_file = self._disk_path(key)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            tmp_file.write_bytes(value)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass  # 缓存写入失败不影响结果
+
+    @contextmanager
+    def lock(self, key: str):
+        with self._guard:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            yield
+        with self._guard:
+            if not key_lock.locked():
+                self._locks.pop(key, None)
+
+
+class _RedisBackend:
+    """Redis缓存后端"""
+
+    def __init__(self, url: str):
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int):
+        self._client.set(key, value, ex=ttl)
+
+    @contextmanager
+    def lock(self, key: str):
+        """SET NX EX实现的简单分布式锁，等待超过LOCK_TIMEOUT后不再等待，直接执行"""
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        acquired = False
+        while not acquired and time.monotonic() < deadline:
+            acquired = bool(self._client.set(lock_key, token, nx=True, ex=LOCK_TIMEOUT))
+            if not acquired:
+                time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            if acquired and self._client.get(lock_key) == token.encode():
+                self._client.delete(lock_key)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """获取缓存后端（第一次调用时创建），没有可用后端时返回None"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if REDIS_URL and redis is not None:
+                    _backend = _RedisBackend(REDIS_URL)
+                elif TTLCache is not None and PARSE_CACHE_SIZE > 0:
+                    _backend = _LocalBackend(PARSE_CACHE_DIR)
+                else:
+                    _backend = False
+    return _backend or None
+
+
+def _safe_get(backend, key: str) -> Optional[bytes]:
+    """读取缓存，后端出错时当作未命中"""
+    try:
+        return backend.get(key)
+    except Exception:
+        return None
+
+
+@contextmanager
+def _safe_lock(backend, key: str):
+    """获取后端的锁，后端出错时不加锁直接执行"""
+    try:
+        lock = backend.lock(key)
+        lock.__enter__()
+    except Exception:
+        yield
+        return
+    try:
+        yield
+    finally:
+        try:
+            lock.__exit__(None, None, None)
+        except Exception:
+            pass
+
+
+def redis_memoize(namespace: str, key_fn: Callable[..., str], ttl: int = PARSE_CACHE_TTL):
+    """
+    缓存函数返回值的装饰器（返回值必须可以pickle）
+
+    Args:
+        namespace: 键前缀，区分不同的函数
+        key_fn: 用函数的参数计算缓存键，如 lambda self, filepath: file_fingerprint(filepath)
+        ttl: 缓存有效期（秒）
+
+    缓存后端出错（如Redis不可用）时直接调用原函数，不影响结果；原函数的异常照常抛出。
+    同一个键同时被多个调用方请求时，只有一个调用方执行原函数，其余等待后读取缓存。
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            backend = get_backend()
+            if backend is None:
+                return func(*args, **kwargs)
+
+            key = f"{namespace}:{key_fn(*args, **kwargs)}"
+            cached = _safe_get(backend, key)
+            if cached is not None:
+                return pickle.loads(cached)
+
+            with _safe_lock(backend, key):
+                # 等锁期间其他调用方可能已经算好了
+                cached = _safe_get(backend, key)
+                if cached is not None:
+                    return pickle.loads(cached)
+                result = func(*args, **kwargs)
+                try:
+                    backend.set(key, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+                except Exception:
+                    pass  # 缓存写入失败不影响结果
+                return result
+
+        return wrapper
+    return decorator
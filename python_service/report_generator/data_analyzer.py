@@ -10,9 +10,42 @@ from dataclasses import dataclass, field
 import json
 import httpx
 import os
+import asyncio
+import weakref
 from .excel_parser import ExcelData, ExcelParser
 from .gene_editing_processor import GeneEditingProcessor, simplify_gene_editing_file
 
+try:
+    import h2  # httpx的HTTP/2支持依赖
+except ImportError:
+    h2 = None
+
+
+# 每个事件循环共用一个HTTP客户端，复用keep-alive连接，避免每次调用LLM都重新握手
+# httpx的连接绑定在创建它的事件循环上，所以按事件循环分别缓存
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取当前事件循环共用的HTTP客户端，第一次调用时创建"""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=h2 is not None,
+            timeout=60.0,
+            limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+        )
+        _http_clients[loop] = client
+    return client
+
+
+async def close_http_clients():
+    """关闭当前事件循环上共用的HTTP客户端（服务关闭时调用）"""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
 
 @dataclass
 class AnalysisResult:
@@ -524,36 +557,36 @@ class DataAnalyzer:
             return self._mock_analysis(context, user_requirement)
         
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.llm_api_url}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.llm_api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.llm_model,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.3
-                    }
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result["choices"][0]["message"]["content"]
-                    # 提取JSON
-                    content = content.strip()
-                    if content.startswith("```"):
-                        content = content.split("```")[1]
-                        if content.startswith("json"):
-                            content = content[4:]
-                    return json.loads(content)
-                else:
-                    print(f"LLM API错误: {response.status_code}")
-                    return self._mock_analysis(context, user_requirement)
+            client = get_http_client()
+            response = await client.post(
+                f"{self.llm_api_url}/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {self.llm_api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": self.llm_model,
+                    "messages": [
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt}
+                    ],
+                    "temperature": 0.3
+                }
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                content = result["choices"][0]["message"]["content"]
+                # 提取JSON
+                content = content.strip()
+                if content.startswith("```"):
+                    content = content.split("```")[1]
+                    if content.startswith("json"):
+                        content = content[4:]
+                return json.loads(content)
+            else:
+                print(f"LLM API错误: {response.status_code}")
+                return self._mock_analysis(context, user_requirement)
                     
         except Exception as e:
             print(f"LLM分析失败: {e}")
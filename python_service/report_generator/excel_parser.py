@@ -4,13 +4,15 @@ Excel多Sheet数据解析器
 """
 
 import pandas as pd
-import openpyxl
 from openpyxl.utils import get_column_letter
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, field
 import json
+import os
 import re
 
+from .cache import file_fingerprint, redis_memoize
+
 
 @dataclass
 class SheetInfo:
@@ -59,40 +61,47 @@ class ExcelData:
 class ExcelParser:
     """Excel文件解析器"""
     
-    def __init__(self):
+    def __init__(self, engine: str = "calamine"):
+        """
+        Args:
+            engine: pd.read_excel的读取引擎，默认calamine（Rust实现）；
+                None表示使用pandas按扩展名选择的默认引擎（xlsx/xlsm为openpyxl）
+        """
         self.supported_extensions = ['.xlsx', '.xls', '.xlsm']
+        self.engine = engine
     
-    def parse(self, filepath: str) -> ExcelData:
+    # 按文件内容、文件名、读取引擎和读取范围缓存解析结果，同一文件被多个接口解析时只解析一次
+    @redis_memoize(
+        "excel_parser.parse",
+        key_fn=lambda self, filepath, usecols=None, max_rows=None: (
+            f"{file_fingerprint(filepath)}:{os.path.basename(filepath)}:{self.engine}:{usecols!r}:{max_rows!r}"
+        ),
+    )
+    def parse(self, filepath: str, usecols: Any = None, max_rows: Optional[int] = None) -> ExcelData:
         """
         解析Excel文件
         
         Args:
             filepath: Excel文件路径
+            usecols: 只读取这些列（与pd.read_excel的usecols相同，如"A:G"或[5, 6]），None表示全部列
+            max_rows: 每个工作表最多读取的行数，None表示全部行
             
         Returns:
             ExcelData: 解析后的数据结构
         """
-        # 使用openpyxl读取工作簿信息
-        wb = openpyxl.load_workbook(filepath, data_only=True)
-        sheet_names = wb.sheetnames
+        # 一次读出所有工作表（每个工作表单独read_excel会把整个文件重复解析多次）；
+        # 列和行的范围直接交给读取引擎，不需要的单元格不会被转换成Python对象
+        all_sheets = self._read_all_sheets(filepath, usecols=usecols, nrows=max_rows)
         
         sheets = {}
         raw_dataframes = {}
         
-        for sheet_name in sheet_names:
-            ws = wb[sheet_name]
-            
-            # 跳过空工作表
-            if ws.max_row is None or ws.max_row < 1:
-                continue
-            
-            # 使用pandas读取数据
+        for sheet_name, df in all_sheets.items():
             try:
-                df = pd.read_excel(filepath, sheet_name=sheet_name, header=None)
-                
                 # 清理空行空列
                 df = self._clean_dataframe(df)
                 
+                # 跳过空工作表
                 if df.empty:
                     continue
                 
@@ -136,10 +145,7 @@ class ExcelParser:
                 print(f"解析工作表 {sheet_name} 时出错: {e}")
                 continue
         
-        wb.close()
-        
         # 提取文件名
-        import os
         filename = os.path.basename(filepath)
         
         return ExcelData(
@@ -149,6 +155,28 @@ class ExcelParser:
             raw_dataframes=raw_dataframes
         )
     
+    def _read_all_sheets(self, filepath: str, usecols: Any = None, nrows: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+        """
+        读取所有工作表的单元格值（不含表头），返回 {工作表名: DataFrame}
+        
+        默认使用calamine引擎（Rust实现，比openpyxl逐个解析单元格XML快一个数量级，
+        xlsm中的宏不影响读取单元格值），没有安装python-calamine时退回pandas默认引擎（openpyxl）
+        
+        Args:
+            filepath: Excel文件路径
+            usecols: 只读取这些列，None表示全部列
+            nrows: 每个工作表最多读取的行数，None表示全部行
+        """
+        kwargs = dict(sheet_name=None, header=None, usecols=usecols, nrows=nrows)
+        if self.engine is None:
+            return pd.read_excel(filepath, **kwargs)
+        try:
+            return pd.read_excel(filepath, engine=self.engine, **kwargs)
+        except ImportError:
+            if self.engine != "calamine":
+                raise
+            return pd.read_excel(filepath, **kwargs)
+    
     def _clean_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         """清理DataFrame，移除全空的行和列"""
         # 移除全空行
@@ -855,6 +855,30 @@ class GeneEditingProcessor:
         }
 
 
+def _read_column_widths(ws) -> Dict[str, float]:
+    """
+    读取只读模式工作表的列宽，返回 {列字母: 宽度}
+    
+    只读模式的工作表没有column_dimensions，直接解析工作表XML开头的<cols>元素
+    （位于<sheetData>之前）。<cols>结束或<sheetData>开始时就停止，不解析单元格数据。
+    """
+    from xml.etree.ElementTree import iterparse
+    from openpyxl.utils import get_column_letter
+    
+    widths = {}
+    with ws._get_source() as src:
+        for event, elem in iterparse(src, events=('start', 'end')):
+            tag = elem.tag.rsplit('}', 1)[-1]
+            if event == 'start':
+                if tag == 'sheetData':
+                    break
+            elif tag == 'col' and elem.get('width') is not None:
+                widths[get_column_letter(int(elem.get('min')))] = float(elem.get('width'))
+            elif tag == 'cols':
+                break
+    return widths
+
+
 # 便捷函数
 def sort_gene_editing_file(input_path: str, output_path: str = None) -> Dict[str, Any]:
     """
@@ -866,88 +890,90 @@ def sort_gene_editing_file(input_path: str, output_path: str = None) -> Dict[str
     3. 保持行顺序不变，只将序号依次重新编号为001, 002, 003...
     4. 生成处理后的Excel文件，保留原始格式和高亮
     
+    源文件用只读模式流式读取、结果用只写模式流式写入，
+    不在内存中为每个单元格建立完整的单元格对象，只遍历源文件一次。
+    样式按源文件的样式编号转换，每种样式只在新工作簿中登记一次。
+    
     Returns:
         Dict: 包含处理结果信息
     """
     import re
-    from openpyxl import load_workbook, Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
     from copy import copy
+    from openpyxl import load_workbook, Workbook
+    from openpyxl.cell import WriteOnlyCell
     
     # 检查文件
     if not os.path.exists(input_path):
         raise FileNotFoundError(f"文件不存在: {input_path}")
     
-    # 读取源文件
+    # 读取源文件（只读模式）
     try:
-        wb_src = load_workbook(input_path, data_only=False)
+        wb_src = load_workbook(input_path, read_only=True, data_only=False)
     except Exception as e:
         raise ValueError(f"无法读取Excel文件: {e}")
     
     ws_src = wb_src.active
     
-    # 解析序列组，记录每个序号行的位置和原始序号
-    sequence_pattern = re.compile(r'^(\d+)-ref(\w+)$')
-    sequence_id_rows = []  # [(row_idx, orig_num, ref_name), ...] 记录序号行
+    # 创建新工作簿（只写模式）
+    wb_dst = Workbook(write_only=True)
+    ws_dst = wb_dst.create_sheet("重编号数据")
     
-    for row_idx, row in enumerate(ws_src.iter_rows(min_row=1), 1):
-        first_cell = str(row[0].value).strip() if row[0].value else ""
-        match = sequence_pattern.match(first_cell)
-        
-        if match:
-            orig_num = match.group(1)  # 原始序号（如007）
-            ref_name = match.group(2)  # 参考序列名称（如GmACC3HiTom）
-            sequence_id_rows.append((row_idx, orig_num, ref_name))
+    # 复制列宽（只写模式下必须在写入行之前设置）
+    for col_letter, width in _read_column_widths(ws_src).items():
+        ws_dst.column_dimensions[col_letter].width = width
     
-    # 创建序号组到新序号的映射
     # 按文件中出现的顺序分配新序号，保持行顺序不变
     # 规则：连续相同的序号为一组，每组分配一个新序号
     # 例如: 007, 007, 008, 009, 007 → 001, 001, 002, 003, 004（注意最后的007是新组）
-    
-    # 创建新工作簿
-    wb_dst = Workbook()
-    ws_dst = wb_dst.active
-    ws_dst.title = "重编号数据"
-    
-    # 创建序号行到新序号的映射（按连续组分配）
-    row_to_new_seq = {}
+    # 新序号只取决于前一个序号行，所以识别序号和复制数据可以在同一次遍历中完成
+    sequence_pattern = re.compile(r'^(\d+)-ref(\w+)$')
     new_seq_counter = 0
     prev_orig_num = None
+    sequence_id_rows = 0
     
-    for row_idx, orig_num, ref_name in sequence_id_rows:
-        # 如果序号和前一行不同，则是新的序号组，分配新序号
-        if orig_num != prev_orig_num:
-            new_seq_counter += 1
-            prev_orig_num = orig_num
-        
-        row_to_new_seq[row_idx] = f"{new_seq_counter:03d}-ref{ref_name}"
+    # 源样式编号 -> 新工作簿中的样式数组
+    # 给单元格设置font/fill等属性时，openpyxl要在样式表中查找（计算哈希）该样式对象，
+    # 文件中的样式种类很少，每种只转换一次，其余单元格直接复制样式数组
+    style_map = {}
     
-    # 复制所有数据，保持原顺序，只修改序号
-    for src_row_idx, src_row in enumerate(ws_src.iter_rows(min_row=1), 1):
+    for src_row in ws_src.iter_rows(min_row=1):
+        new_seq_id = None
+        first_value = src_row[0].value if src_row else None
+        first_cell = str(first_value).strip() if first_value else ""
+        match = sequence_pattern.match(first_cell)
+        
+        if match:
+            orig_num = match.group(1)  # 原始序号（如007）
+            ref_name = match.group(2)  # 参考序列名称（如GmACC3HiTom）
+            # 如果序号和前一个序号行不同，则是新的序号组，分配新序号
+            if orig_num != prev_orig_num:
+                new_seq_counter += 1
+                prev_orig_num = orig_num
+            new_seq_id = f"{new_seq_counter:03d}-ref{ref_name}"
+            sequence_id_rows += 1
+        
+        # 复制整行，保持原顺序，只修改序号
+        dst_row = []
         for col_idx, src_cell in enumerate(src_row, 1):
-            dst_cell = ws_dst.cell(row=src_row_idx, column=col_idx)
-            
             # 如果是序号行的第一列，使用新序号
-            if col_idx == 1 and src_row_idx in row_to_new_seq:
-                dst_cell.value = row_to_new_seq[src_row_idx]
-            else:
-                dst_cell.value = src_cell.value
-            
-            # 复制样式
-            if src_cell.font:
-                dst_cell.font = copy(src_cell.font)
-            if src_cell.fill:
-                dst_cell.fill = copy(src_cell.fill)
-            if src_cell.border:
-                dst_cell.border = copy(src_cell.border)
-            if src_cell.alignment:
-                dst_cell.alignment = copy(src_cell.alignment)
-            if src_cell.number_format:
-                dst_cell.number_format = src_cell.number_format
-    
-    # 复制列宽
-    for col_letter, col_dim in ws_src.column_dimensions.items():
-        ws_dst.column_dimensions[col_letter].width = col_dim.width
+            value = new_seq_id if (col_idx == 1 and new_seq_id) else src_cell.value
+            dst_cell = WriteOnlyCell(ws_dst, value=value)
+            
+            # 复制样式（缺失的空单元格没有样式编号）
+            style_id = getattr(src_cell, "_style_id", None)
+            if style_id is not None:
+                style = style_map.get(style_id)
+                if style is None:
+                    dst_cell.font = src_cell.font
+                    dst_cell.fill = src_cell.fill
+                    dst_cell.border = src_cell.border
+                    dst_cell.alignment = src_cell.alignment
+                    dst_cell.number_format = src_cell.number_format
+                    style_map[style_id] = copy(dst_cell._style)
+                else:
+                    dst_cell._style = copy(style)
+            dst_row.append(dst_cell)
+        ws_dst.append(dst_row)
     
     # 生成输出路径
     if not output_path:
@@ -956,14 +982,13 @@ def sort_gene_editing_file(input_path: str, output_path: str = None) -> Dict[str
     
     wb_dst.save(output_path)
     wb_src.close()
-    wb_dst.close()
     
     return {
         "success": True,
         "output_file": output_path,
         "total_groups": new_seq_counter,
-        "total_rows": len(sequence_id_rows),
-        "message": f"已重新编号，共{new_seq_counter}个序号组（001-{new_seq_counter:03d}），{len(sequence_id_rows)}个序号行"
+        "total_rows": sequence_id_rows,
+        "message": f"已重新编号，共{new_seq_counter}个序号组（001-{new_seq_counter:03d}），{sequence_id_rows}个序号行"
     }
 
 
@@ -28,6 +28,7 @@
 
 import os
 import re
+from functools import lru_cache
 from typing import Dict, List, Any, Optional, Tuple
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill, Font
@@ -51,6 +52,39 @@ MUTATION_COLOR_MAP = {
     'T->C': 'orange',
 }
 
+# F/G列中的单个突变写法（C->T、C-T等）和分隔符
+MUTATION_PATTERN = re.compile(r'([ATCG])[-–>]+([ATCG])')
+MUTATION_SEPARATORS = re.compile(r'[,;\s]+')
+
+# 判断是否高亮只需要A~H列（序号、变异类型D/E、变异详情F/G、序列H）
+ANALYZED_COLUMNS = 8
+
+
+@lru_cache(maxsize=1024)
+def _parse_mutations(value: str) -> Tuple[str, ...]:
+    """
+    解析F/G列的突变描述，结果按单元格文本缓存
+    
+    F/G列的取值只有少数几种（如 "C-T"、"A-G, C-T"），
+    每种文本只用正则解析一次，其余行直接查表
+    """
+    if not value or value.strip() == '-':
+        return ()
+    
+    mutations = []
+    # 按逗号或空格分割
+    for part in MUTATION_SEPARATORS.split(value):
+        part = part.strip().upper()
+        if not part or part == '-':
+            continue
+        
+        # 匹配突变格式: X->Y 或 X-Y
+        match = MUTATION_PATTERN.match(part)
+        if match:
+            mutations.append(f"{match.group(1)}->{match.group(2)}")
+    
+    return tuple(mutations)
+
 
 @dataclass
 class HighlightResult:
@@ -205,14 +239,8 @@ class MutationHighlighter:
         if not mutation_type:
             return None
         
-        # 标准化突变类型格式
-        normalized = mutation_type.upper().replace(' ', '')
-        
-        for mut_type, color in MUTATION_COLOR_MAP.items():
-            if mut_type.upper() == normalized:
-                return color
-        
-        return None
+        # 标准化突变类型格式后直接查表（MUTATION_COLOR_MAP的键都是大写的 X->Y）
+        return MUTATION_COLOR_MAP.get(mutation_type.upper().replace(' ', ''))
     
     def _parse_mutations_from_column(self, value: str) -> List[str]:
         """
@@ -225,25 +253,7 @@ class MutationHighlighter:
         Returns:
             解析出的突变类型列表（标准化为 X->Y 格式）
         """
-        if not value or value.strip() == '-':
-            return []
-        
-        mutations = []
-        # 按逗号或空格分割
-        parts = re.split(r'[,;\s]+', value)
-        
-        for part in parts:
-            part = part.strip().upper()
-            if not part or part == '-':
-                continue
-            
-            # 匹配突变格式: X->Y 或 X-Y
-            match = re.match(r'([ATCG])[-–>]+([ATCG])', part)
-            if match:
-                normalized = f"{match.group(1)}->{match.group(2)}"
-                mutations.append(normalized)
-        
-        return mutations
+        return list(_parse_mutations(value))
     
     def _find_matching_mutation(self, mutations: List[str], sequence: str, 
                                  target_pos: Tuple[int, int]) -> Optional[Tuple[str, str]]:
@@ -385,6 +395,8 @@ class MutationHighlighter:
             raise ValueError(f"无法读取Excel文件: {e}")
         
         ws = wb.active
+        # ws.max_column每次访问都会扫描所有单元格，只计算一次
+        max_column = ws.max_column
         
         # 处理结果
         highlight_results: List[HighlightResult] = []
@@ -393,8 +405,8 @@ class MutationHighlighter:
         current_target_pos = (-1, -1)  # WT行中目标序列的位置
         current_highlighted_mutations = set()  # 当前序号已高亮的突变类型（避免重复）
         
-        # 遍历所有行
-        for row_idx, row in enumerate(ws.iter_rows(min_row=1), 1):
+        # 遍历所有行；判断只用到A~H列，只取这8列的值（宽表的其余列不逐个读取）
+        for row_idx, row in enumerate(ws.iter_rows(min_row=1, max_col=ANALYZED_COLUMNS), 1):
             row_data = [cell.value for cell in row]
             
             # 检查是否为序列标题行
@@ -483,8 +495,9 @@ class MutationHighlighter:
             # 应用高亮（仅验证通过的行）
             fill = HIGHLIGHT_COLORS.get(highlight_color)
             if fill:
-                for cell in row:
-                    cell.fill = fill
+                # 高亮整行（包括H列之后的列）
+                for col_idx in range(1, max_column + 1):
+                    ws.cell(row=row_idx, column=col_idx).fill = fill
                 
                 # 将H列中整个20bp区域标红
                 self._apply_red_font_to_20bp(ws, row_idx, 8, h_value, current_target_pos)
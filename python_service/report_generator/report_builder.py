@@ -227,8 +227,8 @@ class WordReportBuilder(ReportBuilder):
         """添加关键指标章节"""
         self.doc.add_heading('三、关键指标', level=1)
         
-        # 创建指标表格
-        table = self.doc.add_table(rows=1, cols=2)
+        # 创建指标表格（数据行一次建好，不逐行add_row）
+        table = self.doc.add_table(rows=1 + len(metrics), cols=2)
         table.style = 'Table Grid'
         
         # 表头
@@ -241,8 +241,8 @@ class WordReportBuilder(ReportBuilder):
             cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
         
         # 数据行
-        for name, value in metrics.items():
-            row_cells = table.add_row().cells
+        for row, (name, value) in zip(table.rows[1:], metrics.items()):
+            row_cells = row.cells
             row_cells[0].text = str(name)
             row_cells[1].text = str(value)
         
@@ -263,7 +263,8 @@ class WordReportBuilder(ReportBuilder):
         
         self.doc.add_heading(title, level=2)
         
-        table = self.doc.add_table(rows=1, cols=max_cols)
+        data_rows = rows[:max_rows]
+        table = self.doc.add_table(rows=1 + len(data_rows), cols=max_cols)
         table.style = 'Table Grid'
         
         # 表头
@@ -274,8 +275,8 @@ class WordReportBuilder(ReportBuilder):
             header_cells[i].paragraphs[0].runs[0].font.size = Pt(9)
         
         # 数据行
-        for row in rows[:max_rows]:
-            row_cells = table.add_row().cells
+        for table_row, row in zip(table.rows[1:], data_rows):
+            row_cells = table_row.cells
             for i, value in enumerate(row[:max_cols]):
                 row_cells[i].text = str(value)[:30] if value else ""
                 row_cells[i].paragraphs[0].runs[0].font.size = Pt(9)
@@ -449,10 +450,11 @@ class WordReportBuilder(ReportBuilder):
                 ("根因分析", root_cause)
             ]
             
-            for row_idx, (label, value) in enumerate(rows_data):
-                table.rows[row_idx].cells[0].text = label
-                table.rows[row_idx].cells[0].paragraphs[0].runs[0].font.bold = True
-                table.rows[row_idx].cells[1].text = str(value)
+            for row, (label, value) in zip(table.rows, rows_data):
+                row_cells = row.cells
+                row_cells[0].text = label
+                row_cells[0].paragraphs[0].runs[0].font.bold = True
+                row_cells[1].text = str(value)
             
             self.doc.add_paragraph()
         
@@ -463,23 +465,23 @@ class WordReportBuilder(ReportBuilder):
         self.doc.add_heading('四、经营目标', level=1)
         
         # 创建目标汇总表格
-        table = self.doc.add_table(rows=1, cols=5)
+        table = self.doc.add_table(rows=1 + len(business_goals), cols=5)
         table.style = 'Table Grid'
         
         # 表头
         headers = ["目标名称", "目标值", "当前值", "达成时间", "优先级"]
-        for i, header in enumerate(headers):
-            table.rows[0].cells[i].text = header
-            table.rows[0].cells[i].paragraphs[0].runs[0].font.bold = True
+        for cell, header in zip(table.rows[0].cells, headers):
+            cell.text = header
+            cell.paragraphs[0].runs[0].font.bold = True
         
         # 数据行
-        for goal in business_goals:
-            row = table.add_row()
-            row.cells[0].text = goal.get('goal_name', '')
-            row.cells[1].text = str(goal.get('target_value', ''))
-            row.cells[2].text = str(goal.get('current_value', ''))
-            row.cells[3].text = goal.get('timeline', '')
-            row.cells[4].text = goal.get('priority', '')
+        for row, goal in zip(table.rows[1:], business_goals):
+            row_cells = row.cells
+            row_cells[0].text = goal.get('goal_name', '')
+            row_cells[1].text = str(goal.get('target_value', ''))
+            row_cells[2].text = str(goal.get('current_value', ''))
+            row_cells[3].text = goal.get('timeline', '')
+            row_cells[4].text = goal.get('priority', '')
         
         self.doc.add_paragraph()
         
@@ -0,0 +1,91 @@
+"""
+数据分析Agent工具测试：numba内核接受只读数组
+
+pandas写时复制（copy-on-write）得到的DataFrame，to_numpy()返回的是只读视图；
+内核签名只接受可写数组时，工具会因 No matching definition 失败（并被工具自己吞掉，
+只返回ToolResult(False)）。
+
+运行: python -m pytest test_agent_tools.py
+"""
+
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加当前目录到路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from main import CorrelationAnalysisTool, DescribeNumericTool, OutlierDetectionTool
+
+
+DATA = [
+    [1.0, 2.0, 3.5],
+    [2.0, np.nan, 1.5],
+    [3.0, 6.0, 2.5],
+    [4.0, 8.0, 100.0],
+    [5.0, 10.0, 0.5],
+]
+
+
+def load_frame() -> pd.DataFrame:
+    """
+    所有列在同一个float64块中的DataFrame（与合并后的CSV数据相同）
+
+    写时复制模式下，to_numpy()和按列取子集得到的都是只读视图
+    """
+    return pd.DataFrame(np.array(DATA), columns=["a", "b", "c"])
+
+
+def run(tool, **kwargs):
+    return asyncio.run(tool.execute(**kwargs))
+
+
+@pytest.fixture(params=[1, 2], ids=["serial", "parallel"])
+def kernel_threads(request, monkeypatch):
+    """两个分支都测：KERNEL_THREADS > 1 时describe和异常值检测也走numba内核"""
+    monkeypatch.setattr(main, "KERNEL_THREADS", request.param)
+    return request.param
+
+
+@pytest.mark.skipif(not main.HAVE_NUMBA, reason="没有安装numba")
+def test_kernels_accept_readonly_arrays():
+    import agent_kernels
+    
+    X = np.asfortranarray(load_frame().to_numpy())
+    X.flags.writeable = False
+    rows = np.ascontiguousarray(X)
+    rows.flags.writeable = False
+    bounds = np.zeros(X.shape[1])
+    
+    assert agent_kernels.column_stats(X)[0].tolist() == [5, 4, 5]
+    assert agent_kernels.column_summary(X)[0].tolist() == [5, 4, 5]
+    assert agent_kernels.nan_pearson(X).shape == (3, 3)
+    assert agent_kernels.outlier_counts(rows, bounds, bounds).tolist() == [5, 4, 5]
+
+
+def test_correlation_with_nan(kernel_threads):
+    result = run(CorrelationAnalysisTool(), df=load_frame())
+    assert result.success, result.output
+
+
+def test_describe_numeric(kernel_threads):
+    df = load_frame()
+    result = run(DescribeNumericTool(), df=df)
+    assert result.success, result.output
+    expected = df.describe()
+    assert np.allclose(pd.DataFrame(result.data).loc[expected.index, expected.columns], expected.round(4))
+
+
+def test_outliers_single_column(kernel_threads):
+    result = run(OutlierDetectionTool(), df=load_frame()[["c"]])
+    assert result.success, result.output
+
+
+def test_outliers(kernel_threads):
+    result = run(OutlierDetectionTool(), df=load_frame())
+    assert result.success, result.output